@@ -4,42 +4,69 @@
 # V0.1 06/03/2024: First working version
 # V0.2 26/03/2025: Amended to build all versions with all caves in one SSD
 # V1.0 28/03/2025: Amended with changes to folder structure
+# V1.1 18/10/2026: Cave groups and sprites prepared in Python, versions built in parallel
+# V1.2 18/10/2026: Build cache, only changed steps and files are rebuilt (use -full to rebuild everything)
+# V1.3 18/10/2026: Full builds lay out the SSD in memory and write it once
 #
 
 import os
+import sys
+import subprocess
+import hashlib
 from os import path
-from distutils.dir_util import copy_tree
+from concurrent.futures import ThreadPoolExecutor
 import json
 import image
 
+#Cave files in each of the 2 groups per version (two files are needed to allow them to fit into memory)
+CAVE_GROUPS = ["ABCDEFGHQR", "IJKLMNOPST"]
+
+#Sprite set files and their names in the SSD
+SPRITE_FILES = {
+    "ORISPR": "Original_sprites.bin",
+    "BUBBOB": "Bubble_Bobble_sprites.bin",
+    "BIRDSP": "Bird_sprites.bin",
+    "PACMAN": "Pacman_sprites.bin",
+    "ROBOTS": "Robo_Tech_sprites.bin",
+    "SPRING": "Spring_sprites.bin"
+}
+
 ################################################################################
 #region Helper functions
 
-def create_ssd(disk_title, ssd_filepath, tracks, boot_option):
-    #boot_option 0=None, 1=Load, 2=Run, 3=Exec
-    disk_type = 0  # 0=Acorn DFS or Watford DFS <= 256K
-    num_sectors = tracks * 10  # 40 or 80 tracks, 10 sectors per track
-    split_title = [disk_title[0:8],disk_title[8:12]]
+def read_file(file_path):
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+def read_cave_group(group_filepath, cave_letters):
 
-    # Add the first 8 characters of the title, then pad to 256 bytes
-    ssd_bytes = bytearray(split_title[0], 'Latin-1')
-    for i in range(len(split_title[0]), 0x100):
-        ssd_bytes.append(0)
+    #Group file written by the cave generator, the game loads the caves alone so any "BDCG" index header
+    #(the number of caves and their letters) is removed
+    data = read_file(group_filepath)
+    if data[0:4] == b"BDCG":
+        header_letters = data[5:5+data[4]].decode("ascii")
+        if header_letters != cave_letters:
+            raise ValueError(f"{group_filepath} has caves {header_letters}, not {cave_letters}")
+        data = data[5+data[4]:]
+    return data
 
-    # Add the next 4 (max) characters of the title, then pad to 262 bytes
-    ssd_bytes.extend(bytearray(split_title[1], 'Latin-1'))
-    for i in range(len(ssd_bytes), 0x106):
-        ssd_bytes.append(0)
+def create_cave_groups(caves_folder, prefix):
 
-    # Add the boot and related information, then pad to 512 bytes
-    ssd_bytes.append((boot_option * 16) + (disk_type * 4) + (num_sectors // 256))
-    ssd_bytes.append(num_sectors & 255)
-    for i in range(0x108, 0x200):
-        ssd_bytes.append(0)
+    #Merge the individual cave binary files for a version into 2 groups, e.g. BD01-1 and BD01-2
+    #Group files written by the cave generator are used instead if there are any, e.g. BoulderDash01-1 and BoulderDash01-2
+    cave_groups = {}
+    for i, cave_letters in enumerate(CAVE_GROUPS):
+        group_name = f"{prefix}-{i+1}"
+        group_filepath = path.join(caves_folder, f"{path.basename(caves_folder)}-{i+1}")
+        if path.exists(group_filepath):
+            cave_groups[group_name] = read_cave_group(group_filepath, cave_letters)
+        else:
+            cave_groups[group_name] = b"".join([read_file(path.join(caves_folder, c)) for c in cave_letters])
 
-    # Write the empty ssd file
-    with open(ssd_filepath, 'wb') as f:
-        f.write(ssd_bytes)
+    return cave_groups
 
 #endregion
 
@@ -56,55 +83,101 @@ if __name__ == '__main__':
     config_file.close()
 
     build_folder = path.join(base_path, "build")
-
-    #Copy existing program binaries to build folder
-    copy_tree(path.join(base_path, "code_bin"), build_folder)
-
-    #Compile the main program asm code using acme, this overwrites the existing main program "BDSH3"
-    print(f"Compile main.asm code using acme.exe")
-    os.system(".\\bin\\acme.exe -l .\\build\\symbols -o .\\build\\BDSH3 main.asm")
-
-    #Loop through the caves folder for each version and merge individual cave binary files into 2 groups
-    for version in versions:
-        print(f"Creating cave groups for {version}")
-        values = versions[version]
-
-        os.chdir(path.join(base_path, "caves_bin", values["folder"]))
-        os.system('copy /b A+B+C+D+E+F+G+H+Q+R "' + build_folder + '\\' + values["prefix"] + '-1" >nul')
-        os.system('copy /b I+J+K+L+M+N+O+P+S+T "' + build_folder + '\\' + values["prefix"] + '-2" >nul')
-
-    #Copy and rename sprites into build folder
-    os.chdir(path.join(base_path, "sprites"))
-    os.system('copy /b Original_sprites.bin "' + build_folder + '\\ORISPR" >nul')
-    os.system('copy /b Bubble_Bobble_sprites.bin "' + build_folder + '\\BUBBOB" >nul')
-    os.system('copy /b Bird_sprites.bin "' + build_folder + '\\BIRDSP" >nul')
-    os.system('copy /b Pacman_sprites.bin "' + build_folder + '\\PACMAN" >nul')
-    os.system('copy /b Robo_Tech_sprites.bin "' + build_folder + '\\ROBOTS" >nul')
-    os.system('copy /b Spring_sprites.bin "' + build_folder + '\\SPRING" >nul')
-
-    #Build SSD usiing files prepared above
-    os.chdir(build_folder)
-
-    #Create INF files for each file using config data (INF files needed for inserting into SSD)
+    if not path.exists(build_folder):
+        os.mkdir(build_folder)
+
+    #Content hashes of the inputs from the last build, steps and files with unchanged hashes are skipped
+    cache_filepath = path.join(build_folder, "build_cache.json")
+    build_cache = {"asm": "", "config": "", "ssd": "", "files": {}}
+    if path.exists(cache_filepath) and "-full" not in sys.argv[1:]:
+        with open(cache_filepath) as f:
+            build_cache = json.load(f)
+    new_build_cache = {"asm": "", "config": content_hash(read_file(path.join(base_path, "config", "config.json"))), "ssd": "", "files": {}}
+
+    #Existing program binaries, main program "BDSH3" is replaced by the compiled version if available
+    ssd_files = {}
+    for file in os.listdir(path.join(base_path, "code_bin")):
+        if file in ssd_file_settings:
+            ssd_files[file] = read_file(path.join(base_path, "code_bin", file))
+
+    #Compile the main program asm code using acme if any asm source has changed since the last build
+    asm_hash = content_hash(b"".join([read_file(path.join(base_path, f)) for f in sorted(os.listdir(base_path)) if f.endswith(".asm")]))
+    compiled_filepath = path.join(build_folder, "BDSH3")
+    if asm_hash == build_cache["asm"] and path.exists(compiled_filepath):
+        print(f"main.asm unchanged, using compiled BDSH3")
+        new_build_cache["asm"] = asm_hash
+    else:
+        print(f"Compile main.asm code using acme")
+        acme = path.join(base_path, "bin", "acme.exe") if sys.platform == "win32" else "acme"
+        try:
+            if subprocess.run([acme, "-l", path.join(build_folder, "symbols"), "-o", compiled_filepath, "main.asm"], cwd=base_path).returncode == 0:
+                new_build_cache["asm"] = asm_hash
+        except FileNotFoundError:
+            print(f"  {acme} not found, using existing BDSH3")
+    if new_build_cache["asm"] != "":
+        ssd_files["BDSH3"] = read_file(compiled_filepath)
+
+    #Merge individual cave binary files into 2 groups for each version, versions are processed in parallel
+    cave_groups = {}
+    with ThreadPoolExecutor() as executor:
+        futures = [executor.submit(create_cave_groups, path.join(base_path, "caves_bin", values["folder"]), values["prefix"]) for values in versions.values()]
+        for future in futures:
+            cave_groups.update(future.result())
+    ssd_files.update(cave_groups)
+
+    #Sprites are added under their SSD names
+    for file in SPRITE_FILES:
+        ssd_files[file] = read_file(path.join(base_path, "sprites", SPRITE_FILES[file]))
+
+    #Find the files which have changed since the last build, changed cave groups are also written to the build folder
+    changed_files = []
     for file in ssd_file_settings:
-        if path.exists(file):
-            values = ssd_file_settings[file]
-            with open(file + ".inf", 'w') as f:
-                f.write("$.{: <9} {:0>8} {:0>8} L {:0>8}".format(file, values['load'], values['exec'], values['size']))
-
-    #Create empty SSD file
-    print(f"Creating Boulder Dash SSD")
+        if file in ssd_files:
+            new_build_cache["files"][file] = content_hash(ssd_files[file])
+            if new_build_cache["files"][file] != build_cache["files"].get(file):
+                changed_files.append(file)
+                if file in cave_groups:
+                    print(f"Creating cave group {file}")
+                    with open(path.join(build_folder, file), 'wb') as f:
+                        f.write(ssd_files[file])
+
+    #The SSD is ssd_updated with just the changed files if it is the one from the last build and the config is the same,
+    #otherwise it is built from scratch
     ssd_filepath = path.join(base_path, "ssd", "BoulderDash.ssd")
-    create_ssd("BoulderDash", ssd_filepath, 40, 3)  #SSD with file name as title, 40 tracks and bootable
-
-    #Insert each file into the SSD in order per the config file
     disk_image = image.DiskImage()
-    disk_image.set_disk(ssd_filepath)
-
-    for file in ssd_file_settings:
-        if path.exists(file):
-#            print(f"  Inserting {file}")
-            disk_image.insert(file)
+    ssd_updated = False
+    if new_build_cache["config"] == build_cache["config"] and path.exists(ssd_filepath) and content_hash(read_file(ssd_filepath)) == build_cache["ssd"]:
+        if len(changed_files) == 0:
+            print(f"Boulder Dash SSD is up to date")
+            ssd_updated = True
+        else:
+            #Insert each changed file into the SSD, using the config for load / exec addresses and writing the SSD once at the end
+            #If a file has grown and there is no space big enough for it, nothing is written and the SSD is built from scratch
+            print(f"Updating Boulder Dash SSD with {', '.join(changed_files)}")
+            disk_image.set_disk(ssd_filepath)
+            try:
+                with disk_image.batch():
+                    for file in changed_files:
+                        values = ssd_file_settings[file]
+                        disk_image.insert_data(file, ssd_files[file], int(values['load'], 16), int(values['exec'], 16), "L", overwrite=True, ignore_lock=True)
+                ssd_updated = True
+            except image.DiskFullError as e:
+                print(f"  {e}, rebuilding the SSD")
+
+    if not ssd_updated:
+        #Lay out all files in order per the config file, using the config for load / exec addresses
+        #SSD with file name as title, 40 tracks and bootable (boot option 3=Exec)
+        print(f"Creating Boulder Dash SSD")
+        files = []
+        for file in ssd_file_settings:
+            if file in ssd_files:
+                values = ssd_file_settings[file]
+                files.append((file, int(values['load'], 16), int(values['exec'], 16), "L", ssd_files[file]))
+        disk_image.create(ssd_filepath, "BoulderDash", 3, 40, files)
+
+    #Save the content hashes for the next build
+    new_build_cache["ssd"] = content_hash(read_file(ssd_filepath))
+    with open(cache_filepath, 'w') as f:
+        json.dump(new_build_cache, f, indent=4)
 
-    os.chdir("../../")
     print(f"Build complete")
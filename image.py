@@ -24,7 +24,8 @@
 # a file it looks for a .inf file with the same name to get the load & execution addresses and
 # if it doesn't find one prompts the user to enter them instead.
 
-# Richard Russell's tokenise utility is used to re-tokenise BASIC programs - thanks RR!
+# BASIC programs are re-tokenised in the script using the same rules as BBC BASIC, this replaces
+# Richard Russell's tokenise utility used in earlier versions - thanks RR!
 
 # Check you have python 3 installed, and python is included in your PATH. Python 3 can be installed
 # alongside older versions without changing the default version.
@@ -37,9 +38,11 @@
 # COMMANDS
 # catalogue: image.py -d <disk> [-t <type> -s <side>] -cat
 # extract:   image.py -d <disk> [-t <type> -s <side>] -e <file>
+# extract all: image.py -d <disk> [-t <type> -s <side>] -x [<directory>]
 # insert:    image.py -d <disk> [-t <type> -s <side>] -i <file>
 # delete:    image.py -d <disk> [-t <type> -s <side>] -del <file>
 # compact:   image.py -d <disk> [-t <type> -s <side>] -compact
+# verify:    image.py -d <disk> [-t <type> -s <side>] -verify
 
 # Parameters in [square brackets] are optional.
 
@@ -48,6 +51,8 @@
 
 # side = 0 (default), 2
 
+# alloc = first (default), best - how insert chooses between free spaces on the disk
+
 # -extract and -insert process raw files without modification.
 # use -extract* (or -e*) to de-tokenise files, and -insert* (or -i*) to re-tokenise them.
 
@@ -57,13 +62,18 @@
 # -disk	    -d
 # -type	    -t
 # -side	    -s
+# -alloc    -a
+# -readonly -ro (maps the disk image for -cat and -extract, no changes allowed)
 # -cat	    -c
 # -extract  -e
 # -extract* -e*
+# -extractall  -x  (every file, into the current directory unless one is given)
+# -extractall* -x*
 # -insert   -i
 # -insert*  -i*
 # -delete   -del
 # -compact  -com
+# -verify   -ver (checks the catalogue for overlapping files, files outside the disk etc.)
 
 # Commands can be combined:
 
@@ -77,12 +87,96 @@
 # e.g. image.py -d foo.dsd -s 2 -cat -e file1 -e* file2
 #               ^^^^^^^^^^
 
+# LIBRARY
+# DiskImage can also be imported and used without the command line, errors raise DiskImageError
+# subclasses (DiskFileNotFoundError, DiskFullError etc.) and nothing is asked of the user:
+#   insert / insert_data only replace a file if overwrite=True, and locked files need ignore_lock=True
+#   insert takes load_addr / exec_addr / lock for files without a .inf, MetadataError if missing
+#   delete needs ignore_lock=True for locked files
+#   read returns a file's contents and insert_data takes them as bytes
+#   exists checks if a file is on the disk
+#   verify returns a report of any problems with the catalogue instead of raising errors
+#   extents gives where a file's data is in the disk image file, e.g. to read it without loading the image
+
 
 
 import sys
 import os.path
-import subprocess
-import shutil
+import contextlib
+import bisect
+import mmap
+import re
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+# errors raised by DiskImage, the command line reports them as "ERROR: <message>"
+class DiskImageError(Exception):
+    pass
+
+class InvalidOptionError(DiskImageError, ValueError):     # bad type, side, allocation, tracks etc.
+    pass
+
+class DiskNotFoundError(DiskImageError, FileNotFoundError):
+    pass
+
+class HostFileNotFoundError(DiskImageError, FileNotFoundError):
+    pass
+
+class UnsupportedDiskError(DiskImageError):               # not a DFS disk
+    pass
+
+class ReadOnlyError(DiskImageError):
+    pass
+
+class DiskFileNotFoundError(DiskImageError):              # file not in the disk catalogue
+    pass
+
+class DiskFileExistsError(DiskImageError):                # insert without overwrite
+    pass
+
+class DiskFileLockedError(DiskImageError):                # replace or delete a locked file without ignore_lock
+    pass
+
+class DiskFullError(DiskImageError):
+    pass
+
+class CatalogueFullError(DiskFullError):                  # 31 files maximum
+    pass
+
+class MetadataError(DiskImageError, ValueError):          # missing or invalid load / exec addresses
+    pass
+
+class TokeniseError(DiskImageError, ValueError):
+    pass
+
+
+# catalogue records, 8 bytes per file in each of sectors 0 & 1
+#   sector 0: filename (7 bytes), directory (top bit = locked)
+#   sector 1: load, exec, length (low 16 bits), high bits (exec, length, load, sector), start sector
+CATALOGUE_NAME = struct.Struct("<7sB")
+CATALOGUE_INFO = struct.Struct("<HHHBB")
+
+# filename characters only use the bottom 7 bits
+SEVEN_BIT = bytes(i & 0b01111111 for i in range(256))
+
+# valid d.filename and disk title (printable characters, the title padded with spaces or nulls)
+VALID_NAME  = re.compile(r"[!-~]\.[!-~]{1,7}")
+VALID_TITLE = re.compile(rb"[ -~]*[ \0]*")
+
+
+class CatalogueEntry:
+
+    # a file in the disk catalogue
+    __slots__ = ("name", "lock", "load", "exec", "length", "sector")
+
+    def __init__(self, name, lock, load, exec, length, sector):
+        self.name   = name   # d.filename
+        self.lock   = lock   # "L" or " "
+        self.load   = load
+        self.exec   = exec
+        self.length = length
+        self.sector = sector
+
 
 class DiskImage:
 
@@ -222,11 +316,50 @@ class DiskImage:
                          (254,"WIDTH"),     \
                          (255,"OSCLI")]
 
+        # token text indexed by token value, for de-tokenising
+        self.TOKEN_TABLE = [b""] * 256
+        for token in self.TOKENS:
+            self.TOKEN_TABLE[token[0]] = token[1].encode('Latin-1')
+
+        # tokeniser behaviour for keywords, as the flags in the BBC BASIC keyword table
+        self.TOKENISE_CONDITIONAL = ["BGET", "BPUT", "CLEAR", "CLOSE", "CLG", "CLS", "COUNT", "EDIT", "END",
+                                     "ENDPROC", "EOF", "ERL", "ERR", "EXT", "FALSE", "HIMEM", "LOMEM", "NEW",
+                                     "OLD", "PAGE", "PI", "POS", "PTR", "REPORT", "RETURN", "RND", "RUN", "STOP",
+                                     "TIME", "TRUE", "VPOS"] # not a keyword if followed by a letter or digit
+        self.TOKENISE_MIDDLE      = ["BPUT", "CALL", "CHAIN", "CLOSE", "COLOUR", "DIM", "DRAW", "ENVELOPE",
+                                     "FOR", "GCOL", "GOSUB", "GOTO", "HIMEM", "IF", "INPUT", "LOAD", "LOCAL",
+                                     "LOMEM", "MODE", "MOVE", "NEXT", "ON", "OSCLI", "PAGE", "PLOT", "PRINT",
+                                     "PROC", "PTR", "READ", "SAVE", "SOUND", "TIME", "TRACE", "UNTIL", "VDU",
+                                     "WIDTH"] # no longer the start of a statement
+        self.TOKENISE_START       = ["ELSE", "ERROR", "LET", "THEN"] # start of a statement follows
+        self.TOKENISE_FNPROC      = ["FN", "PROC"] # name follows, not tokenised
+        self.TOKENISE_LINE        = ["AUTO", "DELETE", "ELSE", "GOSUB", "GOTO", "LIST", "RENUMBER", "RESTORE",
+                                     "THEN", "TRACE"] # line numbers follow
+        self.TOKENISE_REST        = ["DATA", "REM"] # rest of line not tokenised
+        self.TOKENISE_PSEUDO      = ["HIMEM", "LOMEM", "PAGE", "PTR", "TIME"] # +0x40 at start of a statement
+
+        # keyword trie for tokenising, keyed by character with the (token, keyword) at None
+        self.TOKEN_TRIE = {}
+        for token in self.TOKENS:
+            if token[0] < 0xCF or token[0] > 0xD3: # statement forms of pseudo-variables are added when tokenising
+                node = self.TOKEN_TRIE
+                for c in token[1].encode('Latin-1'):
+                    node = node.setdefault(c, {})
+                node[None] = token
+
+        # bytes needing attention when de-tokenising, everything between them is copied as-is
+        self.DETOKENISE_TEXT   = re.compile(b'[\r"\x80-\xff]') # outside quotes
+        self.DETOKENISE_QUOTED = re.compile(b'[\r"]')            # inside quotes
+
         # attributes
         self.disk  = ""
         self.type  = "ssd" # "ssd" single-sided, "dsd" double-sided interleaved, "dss" double-sided sequential
         self.side  = "0"   # "0" or "2"
         self.verbose_level = 0
+        self.allocation = "first" # "first" fit or "best" fit when finding space for a file
+        self.readonly = False     # True maps the disk image instead of reading it, no changes allowed
+        self._batch = False
+        self._image = None
 
 
     def help(self):
@@ -235,9 +368,11 @@ class DiskImage:
         print("")
         print("catalogue: image.py -d <disk> [-t <type> -s <side>] -cat")
         print("extract:   image.py -d <disk> [-t <type> -s <side>] -e <file>")
+        print("extract all: image.py -d <disk> [-t <type> -s <side>] -x [<directory>]")
         print("insert:    image.py -d <disk> [-t <type> -s <side>] -i <file>")
         print("delete:    image.py -d <disk> [-t <type> -s <side>] -del <file>")
         print("compact:   image.py -d <disk> [-t <type> -s <side>] -compact")
+        print("verify:    image.py -d <disk> [-t <type> -s <side>] -verify")
         print("")
         print("type = ssd (single-sided), dsd (interleaved), dss (sequential)")
         print("")
@@ -249,9 +384,11 @@ class DiskImage:
         print("")
         print("-extract* (or -e*) to de-tokenise, -insert* (or -i*) to tokenise.")
         print("")
+        print("alloc = first (default), best")
+        print("")
         print("Commands:")
-        print("-help -?, -disk -d, -type -t, -side -s, -cat -c, -extract -e")
-        print("-extract* -e*, -insert -i, -insert* -i*, -delete -del, -compact -com\n")
+        print("-help -?, -disk -d, -type -t, -side -s, -alloc -a, -readonly -ro, -cat -c, -extract -e")
+        print("-extract* -e*, -extractall -x, -extractall* -x*, -insert -i, -insert* -i*, -delete -del, -compact -com, -verify -ver\n")
 
     def verbose(self, i):
         self.verbose_level = i
@@ -260,12 +397,19 @@ class DiskImage:
 
         # error checks
         if not(os.path.exists(disk)):
-            print("ERROR: disk image not found")
-            sys.exit()
+            raise DiskNotFoundError("disk image not found: " + disk)
 
         self.disk = disk
 
         # use extension to guess type
+        self._guess_type(disk)
+
+        # select default side
+        self.set_side("0")
+
+
+    def _guess_type(self, disk):
+
         i = disk.rfind(".")
 
         if disk[i:] == ".ssd":
@@ -280,16 +424,12 @@ class DiskImage:
         else:
             self.set_type("ssd")
 
-        # select default side
-        self.set_side("0")
-
 
     def set_type(self, type):
 
         # error checks
         if type !="ssd" and type != "dsd" and type != "dss":
-            print("ERROR: invalid type (valid = ssd, dsd, dss")
-            sys.exit()
+            raise InvalidOptionError("invalid type (valid = ssd, dsd, dss)")
 
         self.type = type
 
@@ -298,22 +438,93 @@ class DiskImage:
 
         # error checks
         if self.type == "ssd" and side != "0":
-            print("ERROR: invalid side (disk is single-sided)")
-            sys.exit()
+            raise InvalidOptionError("invalid side (disk is single-sided)")
 
         if side != "0" and side != "2":
-            print("ERROR: invalid side (use 0 or 2)")
-            sys.exit()
+            raise InvalidOptionError("invalid side (use 0 or 2)")
 
         self.side = side
 
 
+    @contextlib.contextmanager
+    def batch(self):
+
+        # load the disk image once, apply any number of insert/delete/compact
+        # operations in memory, then write the result back in a single pass
+        # e.g. with disk_image.batch():
+        #          disk_image.insert("file1")
+        #          disk_image.insert("file2")
+        if self._batch:
+            yield self
+            return
+
+        try:
+            self._scan()
+            self._batch = True
+            yield self
+        finally:
+            self._batch = False
+
+            # the mapping of a read-only disk image is only used within the batch
+            if self.readonly:
+                self._close_image()
+
+        # only reached if every operation succeeded
+        if not self.readonly:
+            self._write_to_disk()
+
+
+    def _load(self):
+
+        # disk data is already held in memory during a batch
+        if not self._batch:
+            self._scan()
+
+
+    def _commit(self):
+
+        # writes are deferred until the end of a batch
+        if not self._batch:
+            self._write_to_disk()
+            self._scan()
+
+
+    def _close_image(self):
+
+        # release the mapping of the disk image, if slices of it are still held
+        # it is closed when the last of them is dropped instead
+        if self._image is None:
+            return
+
+        mapping = self._image.obj
+        self._image.release()
+        self._image = None
+        try:
+            mapping.close()
+        except BufferError:
+            pass
+
+
+    def set_readonly(self, readonly):
+        self.readonly = readonly
+
+
+    def set_allocation(self, allocation):
+
+        # error checks
+        if allocation != "first" and allocation != "best":
+            raise InvalidOptionError("invalid allocation (use first or best)")
+
+        self.allocation = allocation
+
+
     def _scan(self):
 
         # disk arrays
         self._side0     = bytearray()
         self._side2     = bytearray()
         self._disk_data = bytearray() # acts as a pointer to selected side data
+        self._close_image()           # any mapping of the disk image (read-only mode) from an earlier scan
 
         # disk data
         self.disk_sectors = 0
@@ -324,66 +535,71 @@ class DiskImage:
         self.disk_type    = 0
 
         # file data (for all files on disk)
-        self.file_name    = []
-        self.file_lock    = []
-        self.file_load    = []
-        self.file_exec    = []
-        self.file_length  = []
-        self.file_sector  = []
-        self.sectors_used = []
+        self.files        = [] # CatalogueEntry per file in catalogue (descending sector) order
+        self._index       = {} # upper-cased d.filename to CatalogueEntry
+        self.free_extents = [] # sorted (start sector, sectors) runs of free space
 
         # error checks
         if self.disk == "":
-            print("ERROR: no disk image specified")
-            sys.exit()
+            raise InvalidOptionError("no disk image specified")
 
         if not(os.path.exists(self.disk)):
-            print("ERROR: disk image not found")
-            sys.exit()
+            raise DiskNotFoundError("disk image not found: " + self.disk)
+
+        if self.readonly:
+
+            # map the disk image, the catalogue and files are read straight from the mapping
+            with open(self.disk, 'rb') as f:
+                self._image = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+            self.disk_sectors = (self._image[0x106] & 0b00000011) * 0x100 + self._image[0x107]
+
+            # catalogue data (sectors 0 & 1 are on the first track of the side)
+            p = self._sector_offset(0)
+            data = self._image[p : p + 512]
+
+        else:
 
-        # need to know number of sectors to read disk
-        with open(self.disk, 'rb') as f:
-            data = f.read(512)
-            self.disk_sectors = (data[0x106] & 0b00000011) * 0x100 + data[0x107]
+            # read disk data
+            with open(self.disk, 'rb') as f:
+                image = f.read()
 
-        # read disk data
-        with open(self.disk, 'rb') as f:
+            # need to know number of sectors to split disk into sides
+            self.disk_sectors = (image[0x106] & 0b00000011) * 0x100 + image[0x107]
+            side_size = self.disk_sectors * 256
 
             if self.type == "ssd":
 
                 # single-sided
-                self._side0 += f.read(self.disk_sectors * 256)
+                self._side0 = bytearray(image[0 : side_size])
 
             elif self.type == "dsd":
 
-                # double-sided interleaved
-                i = 0
-                while i < self.disk_sectors:
-                    self._side0 += f.read(10 * 256)
-                    self._side2 += f.read(10 * 256)
-                    i += 10
+                # double-sided interleaved, tracks of 10 sectors alternate between sides
+                self._side0 = bytearray(b"".join([image[i : i + 2560] for i in range(0, side_size * 2, 5120)]))
+                self._side2 = bytearray(b"".join([image[i + 2560 : i + 5120] for i in range(0, side_size * 2, 5120)]))
 
             elif self.type == "dss":
 
                 # double-sided sequential
-                self._side0 += f.read(self.disk_sectors * 256)
-                self._side2 += f.read(self.disk_sectors * 256)
+                self._side0 = bytearray(image[0 : side_size])
+                self._side2 = bytearray(image[side_size : side_size * 2])
 
-        # expand if clipped
-        self._side0.extend([0] * (self.disk_sectors * 256 - len(self._side0)))
-        self._side2.extend([0] * (self.disk_sectors * 256 - len(self._side2)))
+            # expand if clipped
+            self._side0.extend(bytes(side_size - len(self._side0)))
+            self._side2.extend(bytes(side_size - len(self._side2)))
 
-        # select side and catalogue
-        if self.side == "0":
-            self._disk_data = self._side0 # bytearray is mutable... changes to disk_data ALSO change side0
-        else:
-            self._disk_data = self._side2 # as above
+            # select side and catalogue
+            if self.side == "0":
+                self._disk_data = self._side0 # bytearray is mutable... changes to disk_data ALSO change side0
+            else:
+                self._disk_data = self._side2 # as above
 
-        # catalogue data
-        data = self._disk_data[0:512]
+            # catalogue data
+            data = self._disk_data[0:512]
 
         # parse catalogue data
-        self.disk_title   = (data[0:7 + 1] + data[0x100:0x103 + 1]).decode('Latin-1').strip()
+        self.disk_title   = (bytes(data[0:7 + 1]) + bytes(data[0x100:0x103 + 1])).decode('Latin-1').strip()
         self.disk_cycle   = data[0x104]
         self.disk_files   = data[0x105] >> 3
         self.disk_boot    = (data[0x106] >> 4) & 0b00000011
@@ -392,66 +608,198 @@ class DiskImage:
 
         # abort if not DFS disk
         if self.disk_type > 0:
-            print("ERROR: cannot process this disk type")
-            sys.exit()
+            raise UnsupportedDiskError("cannot process this disk type")
 
         # parse file data
-        for i in range(0, self.disk_files):
+        end = (self.disk_files + 1) * 8
+        names = CATALOGUE_NAME.iter_unpack(bytes(data[8 : end]))
+        infos = CATALOGUE_INFO.iter_unpack(bytes(data[0x108 : 0x100 + end]))
+        for (name, directory), (load, exec, length, high_bits, sector) in zip(names, infos):
+
+            # load & exec addresses, high bits of 3 are the i/o processor (&FFFFxxxx)
+            hb = (high_bits >> 2) & 0b00000011
+            load += 0xFFFF0000 if hb == 3 else hb * 0x10000
+            hb = (high_bits >> 6) & 0b00000011
+            exec += 0xFFFF0000 if hb == 3 else hb * 0x10000
+
+            entry = CatalogueEntry((chr(directory & 0b01111111) + "." + name.translate(SEVEN_BIT).decode('Latin-1')).strip(),
+                                   "L" if directory >> 7 else " ",
+                                   load,
+                                   exec,
+                                   length + ((high_bits >> 4) & 0b00000011) * 0x10000,
+                                   (high_bits & 0b00000011) * 0x100 + sector)
+            self.files.append(entry)
+            self._index.setdefault(entry.name.upper(), entry) # Beeb does not distinguish case
+
+        # free space is the gaps between files, sectors 0 & 1 hold the catalogue
+        # zero length files take no sectors so don't split the free space around them
+        s = 2
+        for start, sectors in sorted((entry.sector, -(-entry.length // 256)) for entry in self.files if entry.length > 0): # round up
+            if start > s:
+                self.free_extents.append((s, start - s))
+            s = max(s, start + sectors)
+        if s < self.disk_sectors:
+            self.free_extents.append((s, self.disk_sectors - s))
 
-            p = (i + 1) * 8
 
-            # d.filename
-            s = chr(data[p + 7] & 0b01111111) + "."
-            for i2 in range(0, 7):
-                s += chr(data[p + i2] & 0b01111111)
-            self.file_name.append(s.strip())
+    def _find(self, file):
 
-            # lock
-            if (data[p + 7] >> 7):
-                self.file_lock.append("L")
-            else:
-                self.file_lock.append(" ")
+        # catalogue entry for a d.filename, None if not on the disk (Beeb does not distinguish case)
+        return self._index.get(file.upper())
 
-            # load address
-            addr = data[p + 0x101] * 0x100 + data[p + 0x100]
-            hb   = (data[p + 0x106] >> 2) & 0b00000011
-            if hb == 3:
-                addr += 0xFFFF0000
-            else:
-                addr += hb * 0x10000
-            self.file_load.append(addr)
-
-            # exec address
-            addr = data[p + 0x103] * 0x100 + data[p + 0x102]
-            hb   = (data[p + 0x106] >> 6) & 0b00000011
-            if hb == 3:
-                addr += 0xFFFF0000
+
+    def _add_entry(self, entry):
+
+        # catalogue must be in descending sector order
+        i = bisect.bisect_left(self.files, -entry.sector, key=lambda e: -e.sector)
+        self.files.insert(i, entry)
+        self._index[entry.name.upper()] = entry
+
+
+    def _remove_entry(self, entry):
+
+        # files are found by sector, skipping any other (zero length) files in the same sector
+        # a catalogue not in descending sector order (see verify) is searched in full
+        i = bisect.bisect_left(self.files, -entry.sector, key=lambda e: -e.sector)
+        while i < len(self.files) and self.files[i] is not entry and self.files[i].sector == entry.sector:
+            i += 1
+        if i == len(self.files) or self.files[i] is not entry:
+            i = next((i for i, e in enumerate(self.files) if e is entry), None)
+            if i is None:
+                raise DiskFileNotFoundError(f"file not in catalogue: {entry.name}")
+        del self.files[i]
+        if self._index.get(entry.name.upper()) is entry:
+            del self._index[entry.name.upper()]
+
+
+    def _sector_offset(self, sector):
+
+        # position of a sector of the selected side within the disk image
+        if self.type == "dsd":
+            # tracks of 10 sectors alternate between sides
+            return ((sector // 10) * 2 + (self.side == "2")) * 2560 + (sector % 10) * 256
+
+        if self.type == "dss" and self.side == "2":
+            return (self.disk_sectors + sector) * 256
+
+        return sector * 256
+
+
+    def _file_segments(self, entry):
+
+        # file data from the selected side as a list of slices, read-only mode returns
+        # memoryviews of the mapped image with one slice per track for dsd images
+        if self._image is None:
+            return [self._disk_data[entry.sector * 256 : entry.sector * 256 + entry.length]]
+
+        return [self._image[p : p + size] for p, size in self._file_extents(entry)]
+
+
+    def _file_extents(self, entry):
+
+        # (offset, length) runs of the file data within the disk image file,
+        # one per track for dsd images as the tracks of the two sides alternate
+        start  = entry.sector
+        length = entry.length
+
+        extents = []
+        while length > 0:
+            if self.type == "dsd":
+                size = min(length, (10 - start % 10) * 256) # to end of track
             else:
-               addr += hb * 0x10000
-            self.file_exec.append(addr)
+                size = length
+            extents.append((self._sector_offset(start), size))
+            start += size // 256
+            length -= size
 
-            # file length
-            length = data[p + 0x105] * 0x100 + data[p + 0x104]
-            hb     = (data[p + 0x106] >> 4) & 0b00000011
-            length += hb * 0x10000
-            self.file_length.append(length)
+        return extents
 
-            # start sector
-            self.file_sector.append((data[p + 0x106] & 0b00000011) * 0x100 + data[p + 0x107])
 
-        # sectors used
-        self.sectors_used = ["X","X"] + ["-"] * (self.disk_sectors - 2)
-        for i in range(self.disk_files):
+    def _check_writable(self):
+
+        # error checks
+        if self.readonly:
+            raise ReadOnlyError("disk image is read-only")
 
-            for i2 in range(-(-self.file_length[i] // 256)): # round up
 
-                self.sectors_used[self.file_sector[i] + i2] = "X"
+    def _allocate(self, sectors):
+
+        # find a free run of sectors using the allocation policy, -1 if none big enough
+        found = -1
+        for i, (start, length) in enumerate(self.free_extents):
+            if length >= sectors:
+                if self.allocation == "first":
+                    found = i
+                    break
+                if found == -1 or length < self.free_extents[found][1]:
+                    found = i
+
+        if found == -1:
+            return -1
+
+        # take the sectors from the start of the run
+        start, length = self.free_extents[found]
+        if length == sectors:
+            del self.free_extents[found]
+        else:
+            self.free_extents[found] = (start + sectors, length - sectors)
+
+        return start
+
+
+    def _allocate_at(self, start, sectors):
+
+        # take a run of sectors starting at a given sector, it must be within free space
+        if sectors == 0:
+            return start
+
+        i = bisect.bisect_left(self.free_extents, (start + 1,)) - 1
+        extent_start, length = self.free_extents[i]
+        del self.free_extents[i]
+
+        if extent_start + length > start + sectors:
+            self.free_extents.insert(i, (start + sectors, extent_start + length - start - sectors))
+        if extent_start < start:
+            self.free_extents.insert(i, (extent_start, start - extent_start))
+
+        return start
+
+
+    def _release(self, start, sectors):
+
+        # return a run of sectors to free space, merging with neighbouring runs
+        if sectors == 0:
+            return
+
+        i = bisect.bisect(self.free_extents, (start,))
+
+        if i < len(self.free_extents) and self.free_extents[i][0] == start + sectors:
+            sectors += self.free_extents[i][1]
+            del self.free_extents[i]
+
+        if i > 0 and sum(self.free_extents[i - 1]) == start:
+            start = self.free_extents[i - 1][0]
+            sectors += self.free_extents[i - 1][1]
+            i -= 1
+            del self.free_extents[i]
+
+        self.free_extents.insert(i, (start, sectors))
+
+
+    def _sectors_used(self):
+
+        # sector map for display, "X" used and "-" free
+        sectors_used = ["X"] * self.disk_sectors
+        for start, sectors in self.free_extents:
+            sectors_used[start : start + sectors] = ["-"] * sectors
+
+        return sectors_used
 
 
     def catalogue(self):
 
         # scan disk-image
-        self._scan()
+        self._load()
 
         # print summary
         if self.type != "ssd":
@@ -468,130 +816,186 @@ class DiskImage:
         # print("Disk type    : " + self.DISKTYPES[self.disk_type])
         print("\r\nFILENAME     LOAD     EXEC     SIZE     SEC\r\n")
 
-        for i in range(self.disk_files):
-            print(self.file_name[i].ljust(10) + " " \
-                + self.file_lock[i] + " " \
-                + '{:08X}'.format(self.file_load[i]) + " " \
-                + '{:08X}'.format(self.file_exec[i]) + " " \
-                + '{:08X}'.format(self.file_length[i]) + " " \
-                + '{:03X}'.format(self.file_sector[i]))
+        for entry in self.files:
+            print(entry.name.ljust(10) + " " \
+                + entry.lock + " " \
+                + '{:08X}'.format(entry.load) + " " \
+                + '{:08X}'.format(entry.exec) + " " \
+                + '{:08X}'.format(entry.length) + " " \
+                + '{:03X}'.format(entry.sector))
 
         print("\nSectors used:")
-        matrix = [self.sectors_used[i : i + 40] for i in range(0, len(self.sectors_used), 40)]
+        sectors_used = self._sectors_used()
+        matrix = [sectors_used[i : i + 40] for i in range(0, len(sectors_used), 40)]
         for r in matrix:
             print(",".join(r).replace(",", ""))
 
-    def extract_all(self, detokenise = False):
+    def verify(self):
+
+        # check the catalogue and file layout, problems are reported rather than raised so a
+        # report is returned for any disk image, as a dict with a list of problems found
+        problems = []
+        report = {"disk": self.disk, "side": self.side, "ok": True, "problems": problems}
 
         # scan disk-image
-        self._scan()
+        try:
+            self._load()
+        except UnsupportedDiskError as e:
+            problems.append({"check": "disk type", "file": None, "message": str(e)})
+        except (IndexError, ValueError):
+            problems.append({"check": "image size", "file": None, "message": "disk image too short for a catalogue"})
+        if len(problems) > 0:
+            report["ok"] = False
+            return report
+
+        report["title"] = self.disk_title
+        report["files"] = self.disk_files
+        report["sectors"] = self.disk_sectors
 
-        for i in range(self.disk_files):
-            self.extract(self.file_name[i], detokenise=detokenise)
+        # catalogue data
+        if self._image is None:
+            data = self._disk_data[0:512]
+        else:
+            p = self._sector_offset(0)
+            data = self._image[p : p + 512]
 
-    def extract(self, file, detokenise = False):
+        # title is printable characters padded with spaces or nulls
+        title = bytes(data[0:8]) + bytes(data[0x100:0x104])
+        if not VALID_TITLE.fullmatch(title):
+            problems.append({"check": "title", "file": None, "message": "invalid disk title " + repr(title)})
 
-        # scan disk-image
-        self._scan()
+        # file count is held as files * 8
+        if data[0x105] & 0b00000111:
+            problems.append({"check": "file count", "file": None, "message": "invalid file count byte " + hex(data[0x105])})
 
-        # error checks
-        if file == "":
-            print("ERROR: file not specified")
-            sys.exit()
+        if self.disk_sectors < 2:
+            problems.append({"check": "sectors", "file": None, "message": "invalid number of sectors " + str(self.disk_sectors)})
+
+        # files, sectors 0 & 1 hold the catalogue
+        image_size = os.path.getsize(self.disk)
+        names = set()
+        extents = []
+        for i, entry in enumerate(self.files):
+
+            if not VALID_NAME.fullmatch(entry.name):
+                problems.append({"check": "name", "file": entry.name, "message": "invalid file name " + repr(entry.name)})
+
+            if entry.name.upper() in names:
+                problems.append({"check": "name", "file": entry.name, "message": "file name used more than once"})
+            names.add(entry.name.upper())
+
+            # catalogue is in descending sector order
+            if i > 0 and entry.sector > self.files[i - 1].sector:
+                problems.append({"check": "order", "file": entry.name, "message": "catalogue not in descending sector order"})
+
+            sectors = -(-entry.length // 256) # round up
+            if entry.length > (self.disk_sectors - 2) * 256:
+                problems.append({"check": "length", "file": entry.name, "message": "length " + hex(entry.length) + " larger than the disk"})
+            elif entry.sector < 2 or entry.sector + sectors > self.disk_sectors:
+                problems.append({"check": "bounds", "file": entry.name, "message": "sectors " + hex(entry.sector) + "-" + hex(entry.sector + sectors - 1) + " outside the disk"})
+            elif entry.length > 0 and sum(self._file_extents(entry)[-1]) > image_size:
+                problems.append({"check": "image size", "file": entry.name, "message": "file data past the end of the disk image"})
+
+            if sectors > 0:
+                extents.append((entry.sector, entry.sector + sectors, entry.name))
+
+        # files overlap if one starts before the furthest end of the files before it
+        end = 0
+        for start, file_end, name in sorted(extents):
+            if start < end:
+                problems.append({"check": "overlap", "file": name, "message": "overlaps " + end_name})
+            if file_end > end:
+                end = file_end
+                end_name = name
+
+        report["ok"] = len(problems) == 0
+        return report
+
+
+    def extract_all(self, detokenise = False, target_dir = "."):
+
+        # scan disk-image once, every file is sliced from the same disk data
+        self._load()
+
+        if not os.path.isdir(target_dir):
+            os.makedirs(target_dir)
+
+        if self.verbose_level > 0:
+            print("extracting " + str(self.disk_files) + " files from " + self.disk + "...")
+
+        # host writes are independent of each other so run them in parallel
+        with ThreadPoolExecutor() as executor:
+            futures = [executor.submit(self._write_host_file, target_dir, entry, self._file_data(entry, detokenise)) for entry in self.files]
+            for future in futures:
+                future.result()
+
+    def read(self, file, detokenise = False):
+
+        # scan disk-image
+        self._load()
 
         # assume dir $ if none specified
         if (len(file) < 2) or (file[1] != "."):
             file = "$." + file
 
         # find the file
-        try:
-            # Beeb does not distinguish case
-            file_name_ucase = [item.upper() for item in self.file_name]
-            file_index = file_name_ucase.index(file.upper())
-            if self.verbose_level > 0:
-                print("extracting " + file + " from " + self.disk + "...")
-        except:
-            print("ERROR: file not found")
-            sys.exit()
+        entry = self._find(file)
+        if entry is None:
+            raise DiskFileNotFoundError("file not found: " + file)
 
-        # get the file data
-        start = self.file_sector[file_index] * 256
-        data  = self._disk_data[start : start + self.file_length[file_index]]
+        # file contents as a memoryview, in read-only mode this is a slice of the
+        # mapped image unless it is de-tokenised or a dsd file crosses a track and has to be joined
+        segments = self._file_data(entry, detokenise)
+        if len(segments) == 1:
+            return memoryview(segments[0])
+        return memoryview(b"".join(segments))
 
-        # check for BASIC file
-        bas_file = (self.file_exec[file_index] & 0xFFFF > 0x8000 and self.file_exec[file_index] & 0xFFFF < 0x80FF)
-        if detokenise:
-            if not bas_file:
-                print("WARNING: " + file + " does not have a typical exec address for a BASIC file...")
-            if self.verbose_level > 0:
-                print("de-tokenising file...")
 
-        # container for file
-        file_data = bytearray()
+    def extract(self, file, detokenise = False, target_dir = "."):
 
-        # extract file and de-tokenise if required
-        in_quotes = False
-        i = 0
-        while i < len(data):
-            if detokenise:
-
-                # new line is followed by line number (hb/lb)
-                if data[i] == 13:
-                    if i + 3 < len(data):
-                        file_data += (chr(13) + str(data[i+1]*256 + data[i+2])).encode('Latin-1')
-                        # extra byte for line length can be skipped
-                        i += 3
-                    else:
-                        # eof
-                        file_data += chr(13).encode('Latin-1')
-                        i = len(data)
-                    in_quotes = False
+        # scan disk-image
+        self._load()
 
-                # ignore special chrs inside quotes
-                elif data[i] == 34:
+        # error checks
+        if file == "":
+            raise InvalidOptionError("file not specified")
 
-                    in_quotes = not(in_quotes)
-                    file_data += chr(34).encode('Latin-1')
+        # assume dir $ if none specified
+        if (len(file) < 2) or (file[1] != "."):
+            file = "$." + file
 
-                # line number token
-                elif data[i] == 141:
+        # find the file
+        entry = self._find(file)
+        if entry is None:
+            raise DiskFileNotFoundError("file not found: " + file)
+        if self.verbose_level > 0:
+            print("extracting " + file + " from " + self.disk + "...")
 
-                    # calc line number
-                    target = data[i+2] - 64 + (data[i+3] - 64) * 256
-                    if data[i+1] == 68:
-                        target += 64
-                    elif data[i+1] == 100:
-                        target += 192
-                    elif data[i+1] == 116:
-                        target += 128
+        self._write_host_file(target_dir, entry, self._file_data(entry, detokenise))
 
-                    file_data += str(target).encode('Latin-1')
-                    i += 3
 
-                # keyword tokens
-                elif not(in_quotes) and data[i] >= 128 and data[i] <= 255:
+    def _file_data(self, entry, detokenise):
 
-                    # retrieve token text
-                    t = ""
-                    for token in self.TOKENS:
-                        if token[0] == data[i]:
-                            t = token[1]
+        # get the file data
+        segments = self._file_segments(entry)
+
+        # check for BASIC file
+        bas_file = (entry.exec & 0xFFFF > 0x8000 and entry.exec & 0xFFFF < 0x80FF)
+        if detokenise:
+            if not bas_file:
+                print("WARNING: " + entry.name + " does not have a typical exec address for a BASIC file...")
+            if self.verbose_level > 0:
+                print("de-tokenising file...")
 
-                    file_data += t.encode('Latin-1')
+            # de-tokenise, otherwise the file is written straight from the disk data
+            segments = [self._detokenise(segments[0] if len(segments) == 1 else b"".join(segments))]
 
-                # standard text
-                else:
-                    file_data += chr(data[i]).encode('Latin-1')
+        return segments
 
-            # generic file data
-            else:
-                file_data += chr(data[i]).encode('Latin-1')
 
-            # loop until eof
-            i += 1
+    def _host_filename(self, entry):
 
-        # write file on host
-        filename = self.file_name[file_index]
+        filename = entry.name
         if filename.startswith("$."):
             filename = filename[2:]
         # Replace the illegal characters for NTFS (Windows) filenames with something legal:  / ? < > \ : * | "
@@ -605,33 +1009,283 @@ class DiskImage:
         filename = filename.replace("|",  "#bar")
         filename = filename.replace("\"", "#quote")
 
+        return filename
+
+
+    def _write_host_file(self, target_dir, entry, segments):
+
+        # write file on host, only reads the catalogue so is safe to run on several threads
+        filename = os.path.join(target_dir, self._host_filename(entry))
+
         if self.verbose_level > 0:
             print("writing " + filename + " on host...")
         with open(filename, "wb") as f:
-            f.write(file_data)
+            for segment in segments:
+                f.write(segment)
 
         # write .inf file on host
         if self.verbose_level > 0:
             print("writing " + filename + ".inf on host...")
-        t = (self.file_name[file_index]).ljust(12) \
-                + '{:08X}'.format(self.file_load[file_index]) + "  " \
-                + '{:08X}'.format(self.file_exec[file_index]) + "  " \
-                + self.file_lock[file_index].ljust(3) \
-                + '{:08X}'.format(self.file_length[file_index])
+        t = entry.name.ljust(12) \
+                + '{:08X}'.format(entry.load) + "  " \
+                + '{:08X}'.format(entry.exec) + "  " \
+                + entry.lock.ljust(3) \
+                + '{:08X}'.format(entry.length)
 
         with open(filename + ".inf", "wb") as f:
             f.write(t.encode('Latin-1'))
 
 
-    def insert(self, file, tokenise = False):
+    def _detokenise(self, data):
+
+        # worst case every byte is a token for an 8 character keyword
+        file_data = bytearray(len(data) * 8)
+        p = 0
+
+        in_quotes = False
+        i = 0
+        while i < len(data):
+
+            # copy standard text up to the next byte needing attention
+            if in_quotes:
+                m = self.DETOKENISE_QUOTED.search(data, i)
+            else:
+                m = self.DETOKENISE_TEXT.search(data, i)
+            i2 = m.start() if m else len(data)
+            file_data[p : p + i2 - i] = data[i : i2]
+            p += i2 - i
+            i = i2
+            if i == len(data):
+                break
+
+            # new line is followed by line number (hb/lb)
+            if data[i] == 13:
+                if i + 3 < len(data):
+                    t = b"\r" + str(data[i+1]*256 + data[i+2]).encode('Latin-1')
+                    # extra byte for line length can be skipped
+                    i += 4
+                else:
+                    # eof
+                    t = b"\r"
+                    i = len(data)
+                in_quotes = False
+
+            # ignore special chrs inside quotes
+            elif data[i] == 34:
+                t = b'"'
+                in_quotes = not(in_quotes)
+                i += 1
+
+            # line number token, the top two bits of each byte are packed into the first byte
+            elif data[i] == 141 and i + 3 < len(data):
+                lb = ((data[i+1] << 2) & 0xC0) ^ data[i+2]
+                hb = ((data[i+1] << 4) & 0xC0) ^ data[i+3]
+                t = str(hb * 256 + lb).encode('Latin-1')
+                i += 4
+
+            # keyword tokens
+            else:
+                t = self.TOKEN_TABLE[data[i]]
+                i += 1
+
+            file_data[p : p + len(t)] = t
+            p += len(t)
+
+        del file_data[p:]
+        return file_data
+
+
+    def _tokenise(self, text):
+
+        # program text is lines of <line number><statements>, the tokenised program
+        # is lines of CR, line number (hb/lb), line length, tokens, ending with CR 0xFF
+        program = bytearray()
+        for line in text.splitlines():
+
+            line = line.lstrip(b" ")
+            if line == b"":
+                continue
+
+            # line number
+            i = 0
+            while i < len(line) and 48 <= line[i] <= 57:
+                i += 1
+            if i == 0 or int(line[0:i]) > 32767:
+                raise TokeniseError("invalid line number: " + line.decode('Latin-1'))
+            number = int(line[0:i])
+
+            # statements, spaces after the line number are kept as BASIC does
+            data = self._tokenise_line(line[i:])
+            if len(data) > 251:
+                raise TokeniseError("line " + str(number) + " too long")
+
+            program += bytes([13, number >> 8, number & 0xFF, len(data) + 4]) + data
+
+        program += b"\r\xff"
+        return program
+
+
+    def _tokenise_line(self, line):
+
+        data = bytearray()
+        start_of_statement = True
+        line_numbers = False
+        i = 0
+        while i < len(line):
+
+            c = line[i]
+
+            # strings are not tokenised
+            if c == 34:
+                i2 = line.find(b'"', i + 1)
+                i2 = len(line) if i2 == -1 else i2 + 1
+                data += line[i : i2]
+                start_of_statement = False
+                line_numbers = False
+                i = i2
+
+            # new statement
+            elif c == 58:
+                data.append(c)
+                start_of_statement = True
+                line_numbers = False
+                i += 1
+
+            # star commands are not tokenised
+            elif c == 42 and start_of_statement:
+                data += line[i:]
+                i = len(line)
+
+            # line number token, the top two bits of each byte are packed into the first byte
+            elif 48 <= c <= 57 and line_numbers:
+                i2 = i
+                while i2 < len(line) and 48 <= line[i2] <= 57:
+                    i2 += 1
+                number = int(line[i : i2]) & 0xFFFF
+                lb = number & 0xFF
+                hb = number >> 8
+                data += bytes([141, (((lb & 0xC0) >> 2) | ((hb & 0xC0) >> 4)) ^ 0x54, (lb & 0x3F) | 0x40, (hb & 0x3F) | 0x40])
+                i = i2
+
+            # hex numbers, skip the digits so they are not read as keywords
+            elif c == 38:
+                i2 = i + 1
+                while i2 < len(line) and (48 <= line[i2] <= 57 or 65 <= line[i2] <= 70):
+                    i2 += 1
+                data += line[i : i2]
+                start_of_statement = False
+                line_numbers = False
+                i = i2
+
+            # keywords and variable names
+            elif 65 <= c <= 90 or 97 <= c <= 122 or c == 95:
+
+                # longest keyword at this position
+                token = None
+                node = self.TOKEN_TRIE
+                i2 = i
+                while i2 < len(line) and line[i2] in node:
+                    node = node[line[i2]]
+                    i2 += 1
+                    if None in node:
+                        token = node[None]
+                        length = i2 - i
+
+                # conditional keywords followed by a letter or digit are part of a variable name
+                if token is not None and token[1] in self.TOKENISE_CONDITIONAL and i + length < len(line):
+                    c = line[i + length]
+                    if 48 <= c <= 57 or 65 <= c <= 90 or 97 <= c <= 122 or c == 95:
+                        token = None
+
+                if token is None:
+
+                    # variable name, skip it so keywords within it are not tokenised
+                    i2 = i
+                    while i2 < len(line) and (48 <= line[i2] <= 57 or 65 <= line[i2] <= 90 or 97 <= line[i2] <= 122 or line[i2] == 95):
+                        i2 += 1
+                    data += line[i : i2]
+                    start_of_statement = False
+                    line_numbers = False
+                    i = i2
+
+                else:
+
+                    keyword = token[1]
+                    if keyword in self.TOKENISE_PSEUDO and start_of_statement:
+                        data.append(token[0] + 0x40)
+                    else:
+                        data.append(token[0])
+                    i += length
+
+                    if keyword in self.TOKENISE_REST:
+                        data += line[i:]
+                        i = len(line)
+
+                    elif keyword in self.TOKENISE_FNPROC:
+                        i2 = i
+                        while i2 < len(line) and (48 <= line[i2] <= 57 or 65 <= line[i2] <= 90 or 97 <= line[i2] <= 122 or line[i2] == 95):
+                            i2 += 1
+                        data += line[i : i2]
+                        i = i2
+
+                    if keyword in self.TOKENISE_MIDDLE:
+                        start_of_statement = False
+                    if keyword in self.TOKENISE_START:
+                        start_of_statement = True
+                    line_numbers = keyword in self.TOKENISE_LINE
+
+            # everything else is copied, line numbers continue after commas and spaces
+            else:
+                data.append(c)
+                if c != 32:
+                    start_of_statement = False
+                    if c != 44:
+                        line_numbers = False
+                i += 1
+
+        return data
+
+
+    def extents(self, file):
 
         # scan disk-image
-        self._scan()
+        self._load()
+
+        # assume dir $ if none specified
+        if (len(file) < 2) or (file[1] != "."):
+            file = "$." + file
+
+        # find the file
+        entry = self._find(file)
+        if entry is None:
+            raise DiskFileNotFoundError("file not found: " + file)
+
+        # where the file is in the disk image file, so it can be read without loading the image
+        return self._file_extents(entry)
+
+
+    def exists(self, file):
+
+        # scan disk-image
+        self._load()
+
+        # assume dir $ if none specified
+        if (len(file) < 2) or (file[1] != "."):
+            file = "$." + file
+
+        return self._find(file) is not None
+
+
+    def insert(self, file, tokenise = False, load_addr = None, exec_addr = None, lock = None, overwrite = False, ignore_lock = False):
+
+        # insert a file from the host, the load & exec addresses and lock come from the
+        # file's .inf unless given, the name on the disk is also taken from the .inf
+        self._load()
+        self._check_writable()
 
         # error checks
         if not(os.path.exists(file)):
-            print("ERROR: file not found", file)
-            sys.exit()
+            raise HostFileNotFoundError("file not found: " + file)
 
         # assume dir $ if none specified
         if (len(file) < 2) or (file[1] != "."):
@@ -639,198 +1293,157 @@ class DiskImage:
         else:
             target = file
 
-        # tokenise BASIC file
+        # get file from host, tokenising BASIC programs
         if tokenise:
-            print("tokenising file...")
-
-            # files are tokenised using separate utility written by Richard Russell - thanks RR!
-            if not (os.path.exists("tokenise.exe") or os.path.exists("tokenise")):
-                print("ERROR: 'tokenise' utility required to tokenise BASIC programs")
-                print("This can be downloaded from stardot.org.uk")
-                sys.exit()
-
-            # tokenise will produce file called "abb"
-            f = file[0:2] + "abb"
-            if os.path.exists(f):
-                os.remove(f)
-
-            # call tokenise utility
-            if sys.platform == "win32":
-
-                # windows
-                info = subprocess.STARTUPINFO()
-                info.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                info.wShowWindow = subprocess.SW_HIDE
-                cmd = ['tokenise', file]
-                with subprocess.Popen(cmd, stdout=subprocess.PIPE, startupinfo=info) as proc:
-                    print(proc.stdout.read().strip(b'').decode('ascii'))
-            else:
+            if self.verbose_level > 0:
+                print("tokenising file...")
+            with open(file, 'rb') as f:
+                file_data = self._tokenise(f.read())
+        else:
+            with open(file, 'rb') as f:
+                file_data = f.read()
 
-                # linux ("linux" or "linux2") or OS X ("darwin")
-                cmd = ['./tokenise', file]
-                with subprocess.Popen(cmd, stdout=subprocess.PIPE) as proc:
-                    print(proc.stdout.read().strip(b'').decode('ascii'))
+        # get file attributes
+        if (os.path.exists(file + ".inf")):
+            if (self.verbose_level > 0):
+                print("found " + file + ".inf...")
 
-            if not os.path.exists(f):
-                print("ERROR: failed to tokenise file")
-                sys.exit()
+            target, inf_load, inf_exec, inf_lock = self._read_inf(file + ".inf")
+            load_addr = inf_load if load_addr is None else load_addr
+            exec_addr = inf_exec if exec_addr is None else exec_addr
+            lock = inf_lock if lock is None else lock
 
-            # copy .inf file matching original filename
-            if os.path.exists(file + ".inf"):
-                print("using " + file + ".inf as " + f + ".inf")
-                shutil.copyfile(file + ".inf", f + ".inf")
+        if load_addr is None or exec_addr is None:
+            raise MetadataError("no load / exec address for " + file + " (no .inf file)")
 
-            # insert tokenised file
-            file = f
+        # check for BASIC file
+        bas_file = (exec_addr & 0xFFFF > 0x8000 and exec_addr & 0xFFFF < 0x80FF)
+        if bas_file and not tokenise and (self.verbose_level > 0):
+            print("NOTE: BASIC program not tokenised (*exec and save)")
+
+        self._insert_data(target, file_data, load_addr, exec_addr, lock or " ", overwrite, ignore_lock)
+
+
+    def _read_inf(self, inf_file):
+
+        # d.filename, load & exec addresses and lock from a .inf file
+        with open(inf_file, "r") as f:
+            s = f.read()
 
-        # check if file already exists on disk image
         try:
-            # Beeb does not distinguish case
-            file_name_ucase = [item.upper() for item in self.file_name]
-            file_index = file_name_ucase.index(target.upper())
-        except:
-            file_index = -1
-
-        if file_index != -1:
-            print("WARNING: file already exists in disk image")
-            s = input("are you sure? ")
-            if s.find("Y") == -1 and s.find("y") == -1:
-                print("aborted")
-                sys.exit()
+            # file
+            i = s.find(" ")
+            f = s[0:i]
+            if (len(f) < 2) or (f[1] != "."):
+                f = "$." + f
+
+            # load
+            while s[i] == " ":
+                i += 1
+            i2 = i
+            i = s.find(" ",i)
+            load_addr = int(s[i2:i], 16)
+
+            # exec
+            while s[i] == " ":
+                i += 1
+            i2 = i
+            i = s.find(" ",i)
+            exec_addr = int(s[i2:i], 16)
+
+        except (IndexError, ValueError):
+            raise MetadataError("invalid load / exec address in " + inf_file)
+
+        # lock
+        i = s.find("L",i)
+        if i != -1:
+            lock = "L"
+        else:
+            lock = " "
 
-        # check sufficient space on disk
-        size = os.path.getsize(file)
-        sectors = -(-size // 256) # round up
+        return f, load_addr, exec_addr, lock
 
-        # reset used sectors to empty if replacing file (re-scan after)
-        if file_index != -1:
-            i = self.file_sector[file_index] # start sector
-            s = -(-self.file_length[file_index] // 256) # round up
-            for i in range(i, i + s):
-                self.sectors_used[i] = "-"
 
-        if self.sectors_used.count("-") < sectors:
-            print("ERROR: insufficient space")
-            sys.exit()
+    def insert_data(self, file, file_data, load_addr, exec_addr, lock = " ", overwrite = False, ignore_lock = False):
 
-        # find the first space big enough
-        start_sector = (''.join(self.sectors_used)).find("-" * sectors)
-        if start_sector == -1:
-            print("ERROR: disk needs compacting first")
-            sys.exit()
+        # insert file contents held in memory, a file with the same name is only replaced if overwrite is set
+        self._load()
+        self._check_writable()
 
-        # get file attributes
-        if (os.path.exists(file + ".inf")):
-            if (self.verbose_level > 0):
-                print("found " + file + ".inf...")
+        # assume dir $ if none specified
+        if (len(file) < 2) or (file[1] != "."):
+            file = "$." + file
 
-            with open(file + ".inf", "r") as f:
-                s = f.read()
+        self._insert_data(file, file_data, load_addr, exec_addr, lock, overwrite, ignore_lock)
 
-                # file
-                i = s.find(" ")
-                f = s[0:i]
-                if (len(f) < 2) or (f[1] != "."):
-                    f = "$." + f
 
-                #if f.upper() != target.upper():
-                #    print("ERROR: .inf does not refer to the same file", f.upper(), target.upper())
-                #    sys.exit()
-                #else:
-                target = f # match case
+    def _check_metadata(self, load_addr, exec_addr, lock):
 
-                # load
-                while s[i] == " ":
-                    i += 1
-                i2 = i
-                i = s.find(" ",i)
-                s1 = s[i2:i]
+        # error checks, addresses are 18 bits or &FFFFxxxx for the i/o processor
+        for name, addr in (("load", load_addr), ("exec", exec_addr)):
+            if not (0 <= addr <= 0x3FFFF or 0xFFFF0000 <= addr <= 0xFFFFFFFF):
+                raise MetadataError("invalid " + name + " address: " + hex(addr))
 
-                # exec
-                while s[i] == " ":
-                    i += 1
-                i2 = i
-                i = s.find(" ",i)
-                s2 = s[i2:i]
+        if lock != "L" and lock != " ":
+            raise MetadataError("invalid lock (use \"L\" or \" \")")
 
-                # lock
-                i = s.find("L",i)
-                if i != -1:
-                    lock = "L"
-                else:
-                    lock = " "
 
-        else:
+    def _insert_data(self, target, file_data, load_addr, exec_addr, lock, overwrite, ignore_lock):
 
-            s1 = input("Enter load address (hex): 0x")
-            s2 = input("Enter exec address (hex): 0x")
-            s3 = input("Lock (y/n)?")
+        self._check_metadata(load_addr, exec_addr, lock)
 
-            if s3.find("Y") != -1 or s3.find("y") != -1:
-                lock = "L"
-            else:
-                lock = " "
+        # check if file already exists on disk image
+        old_entry = self._find(target)
 
-        try:
-            load_addr = int(s1, 16)
-        except:
-            print("ERROR: invalid load address")
-            sys.exit()
+        if old_entry is not None:
+            if not overwrite:
+                raise DiskFileExistsError("file already exists in disk image: " + target)
+            if old_entry.lock == "L" and not ignore_lock:
+                raise DiskFileLockedError("file locked: " + target)
+        elif self.disk_files >= 31:
+            raise CatalogueFullError("catalogue full (31 files maximum)")
 
-        try:
-            exec_addr = int(s2, 16)
-        except:
-            print("ERROR: invalid exec address")
-            sys.exit()
+        # check sufficient space on disk
+        size = len(file_data)
+        sectors = -(-size // 256) # round up
 
-        if (self.verbose_level > 0):
-            print("load: " + hex(load_addr), "exec: " + hex(exec_addr),
-                  "length: " + hex(size), "sector: " + hex(start_sector))
+        # release used sectors if replacing file
+        if old_entry is not None:
+            old_sector = old_entry.sector
+            old_sectors = -(-old_entry.length // 256) # round up
+            self._release(old_sector, old_sectors)
 
-        # check for BASIC file
-        bas_file = (exec_addr & 0xFFFF > 0x8000 and exec_addr & 0xFFFF < 0x80FF)
-        if bas_file and not tokenise and (self.verbose_level > 0):
-            print("NOTE: BASIC program not tokenised (*exec and save)")
+        # replace file in place if it still fits, otherwise find a space big enough
+        if old_entry is not None and sectors <= old_sectors:
+            start_sector = self._allocate_at(old_sector, sectors)
+        else:
+            start_sector = self._allocate(sectors)
 
-        # get file from host
-        with open(file, 'rb') as f:
-            file_data = f.read()
+        if start_sector == -1:
 
-        # insert into disk data
-        i = 0
-        for b in file_data:
-            self._disk_data[start_sector * 256 + i] = b
-            i += 1
+            # nothing has changed, the replaced file keeps its sectors
+            if old_entry is not None:
+                self._allocate_at(old_sector, old_sectors)
 
-        # update catalogue
-        if file_index == -1:
+            if sum(length for start, length in self.free_extents) + (old_sectors if old_entry is not None else 0) < sectors:
+                raise DiskFullError("insufficient space")
+            raise DiskFullError("disk needs compacting first")
 
-            # catalogue must be in ascending sector order
-            i = 0
-            if self.disk_files > 0:
-                while start_sector < self.file_sector[i]:
-                    i += 1
-                    if i == len(self.file_sector):
-                        break
-
-            # insert file
-            self.file_name.insert(i, target)
-            self.file_lock.insert(i, lock)
-            self.file_load.insert(i, load_addr)
-            self.file_exec.insert(i, exec_addr)
-            self.file_length.insert(i, size)
-            self.file_sector.insert(i, start_sector)
-            self.disk_files += 1
+        if (self.verbose_level > 0):
+            print("load: " + hex(load_addr), "exec: " + hex(exec_addr),
+                  "length: " + hex(size), "sector: " + hex(start_sector))
 
-        else:
+        # insert into disk data
+        self._disk_data[start_sector * 256 : start_sector * 256 + len(file_data)] = file_data
+
+        # update catalogue, a replaced file is removed then added back as it may have moved
+        if old_entry is not None:
+            self._remove_entry(old_entry)
+            self.disk_files -= 1
 
-            # replace file
-            self.file_name[file_index] = target
-            self.file_lock[file_index] = lock
-            self.file_load[file_index] = load_addr
-            self.file_exec[file_index] = exec_addr
-            self.file_length[file_index] = size
-            self.file_sector[file_index] = start_sector
+        # insert file
+        self._add_entry(CatalogueEntry(target, lock, load_addr, exec_addr, size, start_sector))
+        self.disk_files += 1
 
         # update disk data
         self.disk_cycle += 1
@@ -841,47 +1454,32 @@ class DiskImage:
         self._update_catalogue()
 
         # write changes to disk image
-        self._write_to_disk()
-
-        # refresh
-        self._scan()
+        self._commit()
 
 
-    def delete(self, file):
+    def delete(self, file, ignore_lock = False):
 
         # scan disk-image
-        self._scan()
+        self._load()
+        self._check_writable()
 
         # assume dir $ if none specified
         if (len(file) < 2) or (file[1] != "."):
             file = "$." + file
-        else:
-            file = file
 
         # check file exists on disk image
-        try:
-            # Beeb does not distinguish case
-            file_name_ucase = [item.upper() for item in self.file_name]
-            file_index = file_name_ucase.index(file.upper())
-        except:
-            file_index = -1
-
-        if file_index == -1:
-            print("ERROR: file not found")
-            sys.exit()
-        else:
-            s = input("WARNING: Delete " + file + " from " + self.disk + " - are you sure (y/n)?")
-            if s.find("Y") == -1 and s.find("y") == -1:
-                print("aborted")
-                sys.exit()
+        entry = self._find(file)
+
+        if entry is None:
+            raise DiskFileNotFoundError("file not found: " + file)
+        if entry.lock == "L" and not ignore_lock:
+            raise DiskFileLockedError("file locked: " + file)
+
+        # release sectors used
+        self._release(entry.sector, -(-entry.length // 256)) # round up
 
         # delete file from file data
-        del self.file_name[file_index]
-        del self.file_lock[file_index]
-        del self.file_load[file_index]
-        del self.file_exec[file_index]
-        del self.file_length[file_index]
-        del self.file_sector[file_index]
+        self._remove_entry(entry)
         self.disk_files -= 1
 
         # update disk data
@@ -893,142 +1491,165 @@ class DiskImage:
         self._update_catalogue()
 
         # write changes to disk image
-        self._write_to_disk()
-
-        # refresh
-        self._scan()
+        self._commit()
 
 
     def compact(self):
 
         # scan disk-image
-        self._scan()
+        self._load()
+        self._check_writable()
 
-        if self.type == "ssd":
-            print("compacting " + self.disk + "...")
-        else:
-            print("compacting " + self.disk + " (side " + str(self.side) + ")...")
-
-        # calculate relocation sectors
-        new_file_sector = []
+        # compact, files move towards the start of the disk so work through them
+        # from the lowest sector up and each move only overwrites free space or
+        # the file itself (memoryview assignment handles the overlap), the
+        # catalogue order is kept as it is as it may not be in sector order
         s = 2
-        new_file_sector.append(s)
-
-        for i in range(self.disk_files, 0, -1):
-            s += -(-self.file_length[i - 1] // 256) # round up
-            new_file_sector.append(s)
+        disk_view = memoryview(self._disk_data)
+        for entry in sorted(self.files, key=lambda e: e.sector):
 
-        new_file_sector = new_file_sector[:-1]
-        new_file_sector.reverse()
-
-        # make copy of disk data
-        disk_copy = bytearray()
-        for b in self._disk_data:
-            disk_copy.append(b)
-
-        # compact
-        for i in range(0, self.disk_files):
+            # move file to new location
+            source = entry.sector * 256
+            target = s * 256
 
-            p = (i + 1) * 8
+            if source != target:
+                disk_view[target : target + entry.length] = disk_view[source : source + entry.length]
 
-            # start sector
-            hb = new_file_sector[i] // 256
-            lb = new_file_sector[i] - hb * 256
+            entry.sector = s
+            s += -(-entry.length // 256) # round up
 
-            # modify bits 0 & 1
-            self._disk_data[p + 0x106] = (self._disk_data[p + 0x106] & 0b11111100) | (hb & 0b00000011)
-            self._disk_data[p + 0x107] = lb
+        disk_view.release()
 
-            # move file to new location
-            source = self.file_sector[i] * 256
-            target = new_file_sector[i] * 256
+        # free space is now a single run at the end of the disk
+        self.free_extents = [(s, self.disk_sectors - s)] if s < self.disk_sectors else []
 
-            for b in range(0, self.file_length[i]):
-                self._disk_data[target + b] = disk_copy[source + b]
+        # update _disk_data from file data
+        self._update_catalogue()
 
         # update disk data
         self.disk_cycle += 1
         self._disk_data[0x104] = self.disk_cycle
 
         # write changes to disk image
+        self._commit()
+
+
+    def create(self, disk, title, boot_option, tracks, files, side2_files = None):
+
+        # create a new disk image with the files laid out in order from sector 2 and write it in one go
+        # files are lists of (name, load address, exec address, lock "L" or " ", data)
+        # the type is set from the extension, side2_files are for double-sided (dsd, dss) images
+        self._check_writable()
+
+        if side2_files is None:
+            side2_files = []
+
+        self.disk = disk
+        self._guess_type(disk)
+
+        # error checks
+        if tracks != 40 and tracks != 80:
+            raise InvalidOptionError("invalid number of tracks (use 40 or 80)")
+
+        if boot_option not in range(0, 4):
+            raise InvalidOptionError("invalid boot option (use 0-3)")
+
+        if self.type == "ssd" and len(side2_files) > 0:
+            raise InvalidOptionError("invalid side (disk is single-sided)")
+
+        for file, load_addr, exec_addr, lock, file_data in [*files, *side2_files]:
+            self._check_metadata(load_addr, exec_addr, lock)
+
+        if self.type != "ssd":
+            self.set_side("2")
+            self._side2 = self._layout(title, boot_option, tracks * 10, side2_files)
+
+        self.set_side("0")
+        self._side0 = self._layout(title, boot_option, tracks * 10, files)
+
+        # write disk image
         self._write_to_disk()
 
-        # refresh
-        self._scan()
 
+    def _layout(self, title, boot_option, sectors, files):
 
-    def _update_catalogue(self):
+        # disk arrays
+        self._disk_data = bytearray(sectors * 256)
 
-        # update catalogue entries in _disk_data before writing to disk
-        for i in range(0, self.disk_files):
+        # disk data
+        self.disk_sectors = sectors
+        self.disk_title   = title[0:12]
+        self.disk_cycle   = len(files) # as if each file had been inserted in turn
+        self.disk_files   = len(files)
+        self.disk_boot    = boot_option
+        self.disk_type    = 0
 
-            p = (i + 1) * 8
+        # file data
+        self.files        = []
+        self._index       = {}
 
-            # filename
-            for i2 in range(0, 7):
-                if i2 < len(self.file_name[i]) - 2:
-                    self._disk_data[p + i2] = ord(self.file_name[i][i2 + 2])
-                else:
-                    self._disk_data[p + i2] = 32 # pad with spaces
+        # error checks
+        if len(files) > 31:
+            raise CatalogueFullError("too many files (31 maximum)")
 
-            # directory
-            self._disk_data[p + 7] = ord(self.file_name[i][0])
+        # lay out files one after another
+        start_sector = 2
+        for file, load_addr, exec_addr, lock, file_data in files:
 
-            # lock
-            if self.file_lock[i] == "L":
-                self._disk_data[p + 7] = self._disk_data[p + 7] | 0b10000000 # set top bit
-            else:
-                self._disk_data[p + 7] = self._disk_data[p + 7] & 0b01111111 # clear top bit
+            # assume dir $ if none specified
+            if (len(file) < 2) or (file[1] != "."):
+                file = "$." + file
 
-            # load address
-            if self.file_load[i] & 0xFFFF0000 == 0xFFFF0000:
-                hhb = 3
-            else:
-                hhb = self.file_load[i] // 0x10000
+            if start_sector + -(-len(file_data) // 256) > sectors: # round up
+                raise DiskFullError("insufficient space")
 
-            # modify bits 2 & 3
-            self._disk_data[p + 0x106] = (self._disk_data[p + 0x106] & 0b11110011) | ((hhb << 2) & 0b00001100)
+            self._disk_data[start_sector * 256 : start_sector * 256 + len(file_data)] = file_data
 
-            x = self.file_load[i] & 0xFFFF
-            hb = x // 256
-            lb = x - hb * 0x100
-            self._disk_data[p + 0x100] = lb
-            self._disk_data[p + 0x101] = hb
+            # catalogue is in descending sector order
+            self._add_entry(CatalogueEntry(file, lock, load_addr, exec_addr, len(file_data), start_sector))
 
-            # exec address
-            if self.file_exec[i] & 0xFFFF0000 == 0xFFFF0000:
-                hhb = 3
-            else:
-                hhb = self.file_exec[i] // 0x10000
+            start_sector += -(-len(file_data) // 256) # round up
+
+        self.free_extents = [(start_sector, sectors - start_sector)] if start_sector < sectors else []
+
+        # title (8 characters in sector 0, 4 in sector 1), boot option and sectors
+        title = title.encode('Latin-1')
+        self._disk_data[0 : len(title[0:8])] = title[0:8]
+        self._disk_data[0x100 : 0x100 + len(title[8:12])] = title[8:12]
+        self._disk_data[0x104] = self.disk_cycle
+        self._disk_data[0x105] = self.disk_files << 3
+        self._disk_data[0x106] = (boot_option << 4) | (sectors >> 8)
+        self._disk_data[0x107] = sectors & 0xFF
+
+        # update _disk_data from file data
+        self._update_catalogue()
 
-            # modify bits 6 & 7
-            self._disk_data[p + 0x106] = (self._disk_data[p + 0x106] & 0b00111111) | ((hhb << 6) & 0b11000000)
+        return self._disk_data
 
-            x = self.file_exec[i] & 0xFFFF
-            hb = x // 256
-            lb = x - hb * 0x100
-            self._disk_data[p + 0x102] = lb
-            self._disk_data[p + 0x103] = hb
 
-            # file length
-            hhb = self.file_length[i] // 0x10000
+    def _update_catalogue(self):
 
-            # modify bits 4 & 5
-            self._disk_data[p + 0x106] = (self._disk_data[p + 0x106] & 0b11001111) | ((hhb << 4) & 0b00110000)
+        # update catalogue entries in _disk_data before writing to disk
+        names = []
+        infos = []
+        for entry in self.files:
 
-            x = self.file_length[i] & 0xFFFF
-            hb = x // 256
-            lb = x - hb * 0x100
-            self._disk_data[p + 0x104] = lb
-            self._disk_data[p + 0x105] = hb
+            # filename (padded with spaces), directory and lock (top bit)
+            directory = ord(entry.name[0]) | (0b10000000 if entry.lock == "L" else 0)
+            names.append(CATALOGUE_NAME.pack(entry.name[2:9].encode('Latin-1').ljust(7), directory))
 
-            # start sector
-            hb = self.file_sector[i] // 256
-            lb = self.file_sector[i] - hb * 256
+            # high bits of load & exec addresses are 3 for the i/o processor (&FFFFxxxx)
+            load_hb = 3 if entry.load & 0xFFFF0000 == 0xFFFF0000 else entry.load // 0x10000
+            exec_hb = 3 if entry.exec & 0xFFFF0000 == 0xFFFF0000 else entry.exec // 0x10000
+            high_bits = ((exec_hb << 6) & 0b11000000) \
+                      | (((entry.length // 0x10000) << 4) & 0b00110000) \
+                      | ((load_hb << 2) & 0b00001100) \
+                      | ((entry.sector // 256) & 0b00000011)
+            infos.append(CATALOGUE_INFO.pack(entry.load & 0xFFFF, entry.exec & 0xFFFF, entry.length & 0xFFFF, high_bits, entry.sector & 0xFF))
 
-            # modify bits 0 & 1
-            self._disk_data[p + 0x106] = (self._disk_data[p + 0x106] & 0b11111100) | (hb & 0b00000011)
-            self._disk_data[p + 0x107] = lb
+        end = (len(self.files) + 1) * 8
+        self._disk_data[8 : end] = b"".join(names)
+        self._disk_data[0x108 : 0x100 + end] = b"".join(infos)
 
 
     def _write_to_disk(self):
@@ -1045,18 +1666,66 @@ class DiskImage:
             elif self.type == "dsd":
 
                 # double-sided interleaved
-                i = 0
-                while i < self.disk_sectors:
-
-                    f.write(self._side0[i*256 : (i+10)*256])
-                    f.write(self._side2[i*256 : (i+10)*256])
-                    i += 10
+                f.write(b"".join([self._side0[i*256 : (i+10)*256] + self._side2[i*256 : (i+10)*256] for i in range(0, self.disk_sectors, 10)]))
 
             elif self.type == "dss":
 
                 # double-sided sequential
-                f.write(self._side0)
-                f.write(self._side2)
+                f.write(self._side0 + self._side2)
+
+
+def confirm(prompt):
+
+    # ask the user, anything other than yes aborts
+    s = input(prompt)
+    if s.find("Y") == -1 and s.find("y") == -1:
+        print("aborted")
+        sys.exit()
+
+
+def insert_file(disk_image, file, tokenise = False):
+
+    # check before replacing a file and ask for the addresses if there is no .inf file
+    if disk_image.exists(file):
+        print("WARNING: file already exists in disk image")
+        confirm("are you sure? ")
+
+    load_addr = None
+    exec_addr = None
+    lock = None
+    if os.path.exists(file) and not os.path.exists(file + ".inf"):
+
+        s1 = input("Enter load address (hex): 0x")
+        s2 = input("Enter exec address (hex): 0x")
+        s3 = input("Lock (y/n)?")
+
+        try:
+            load_addr = int(s1, 16)
+        except ValueError:
+            raise MetadataError("invalid load address")
+
+        try:
+            exec_addr = int(s2, 16)
+        except ValueError:
+            raise MetadataError("invalid exec address")
+
+        if s3.find("Y") != -1 or s3.find("y") != -1:
+            lock = "L"
+        else:
+            lock = " "
+
+    disk_image.insert(file, tokenise, load_addr, exec_addr, lock, overwrite=True, ignore_lock=True)
+
+
+def delete_file(disk_image, file):
+
+    # check before deleting a file
+    if disk_image.exists(file):
+        if (len(file) < 2) or (file[1] != "."):
+            file = "$." + file
+        confirm("WARNING: Delete " + file + " from " + disk_image.disk + " - are you sure (y/n)?")
+
+    disk_image.delete(file, ignore_lock=True)
 
 
 def main(args):
@@ -1068,6 +1737,15 @@ def main(args):
     if len(args) == 0:
         disk_image.help()
 
+    try:
+        run_commands(disk_image, args)
+    except DiskImageError as e:
+        print("ERROR: " + str(e))
+        sys.exit()
+
+
+def run_commands(disk_image, args):
+
     i=0
     while i < len(args):
 
@@ -1083,31 +1761,54 @@ def main(args):
         elif args[i] == "-side" or args[i] == "-s":
             disk_image.set_side(args[i + 1])
 
+        elif args[i] == "-alloc" or args[i] == "-a":
+            disk_image.set_allocation(args[i + 1])
+
+        elif args[i] == "-readonly" or args[i] == "-ro":
+            disk_image.set_readonly(True)
+
         elif args[i] == "-cat" or args[i] == "-c":
             disk_image.catalogue()
 
+        elif args[i] == "-verify" or args[i] == "-ver":
+            report = disk_image.verify()
+            if report["ok"]:
+                print(disk_image.disk + ": ok")
+            for problem in report["problems"]:
+                print(disk_image.disk + ": " + problem["check"] + ": " + (problem["file"] + ": " if problem["file"] else "") + problem["message"])
+
         elif args[i] == "-extract" or args[i] == "-e":
             disk_image.extract(args[i + 1])
 
         elif args[i] == "-extract*" or args[i] == "-e*": # de-tokenises BASIC programs
             disk_image.extract(args[i + 1], True)
 
-        elif args[i] == "-extractall" or args[i] == "-x":
-            disk_image.extract()
+        elif args[i] == "-extractall" or args[i] == "-x": # optional target directory
+            if i + 1 < len(args) and not args[i + 1].startswith("-"):
+                disk_image.extract_all(target_dir=args[i + 1])
+            else:
+                disk_image.extract_all()
 
         elif args[i] == "-extractall*" or args[i] == "-x*": # de-tokenises BASIC programs
-            disk_image.extract(detokenise=True)
+            if i + 1 < len(args) and not args[i + 1].startswith("-"):
+                disk_image.extract_all(True, args[i + 1])
+            else:
+                disk_image.extract_all(True)
 
         elif args[i] == "-insert" or args[i] == "-i":
-            disk_image.insert(args[i + 1])
+            insert_file(disk_image, args[i + 1])
 
         elif args[i] == "-insert*" or args[i] == "-i*": # re-tokenises BASIC programs
-            disk_image.insert(args[i + 1], True)
+            insert_file(disk_image, args[i + 1], True)
 
         elif args[i] == "-delete" or args[i] == "-del":
-            disk_image.delete(args[i + 1])
+            delete_file(disk_image, args[i + 1])
 
         elif args[i] == "-compact" or args[i] == "-com":
+            if disk_image.type == "ssd":
+                print("compacting " + disk_image.disk + "...")
+            else:
+                print("compacting " + disk_image.disk + " (side " + str(disk_image.side) + ")...")
             disk_image.compact()
 
         elif args[i] == "-verbose" or args[i] == "-v":
@@ -0,0 +1,346 @@
+################################################################################
+# image_server.py - Serve disk image catalogues and files to local tools over HTTP
+#
+# V1.0 18/10/2026: First working version
+#
+# Catalogues are read with image.DiskImage and kept in an LRU cache, an image is only parsed again
+# when its modification time or size changes. Cold images are parsed on a thread pool and files are
+# streamed from the disk image file in chunks, so the images themselves are never held in memory.
+#
+# GET /cat?disk=<path>[&side=0|2]                  catalogue as JSON
+# GET /extract?disk=<path>&file=<name>[&side=0|2]  file contents, a Range: bytes=<start>-<end> header selects part of it
+#
+# Disk paths are relative to the root folder (the current folder unless given).
+# python image_server.py [-root <folder>] [-host 127.0.0.1] [-port 8021] [-socket <path>] [-cache 256] [-workers 4]
+#
+
+import os
+import sys
+import json
+import asyncio
+from os import path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import image
+
+#Bytes read from a disk image file at a time when streaming a file
+CHUNK_SIZE = 65536
+
+#HTTP status for disk image errors, any others are bad requests
+ERROR_STATUS = [(image.DiskNotFoundError, 404), (image.DiskFileNotFoundError, 404), (image.UnsupportedDiskError, 422)]
+
+#HTTP status for disk images that can't be opened (a folder or no permission), any others are server errors
+OS_ERROR_STATUS = [(IsADirectoryError, 404), (FileNotFoundError, 404), (PermissionError, 403)]
+
+REASONS = {200: "OK", 206: "Partial Content", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+           416: "Range Not Satisfiable", 422: "Unprocessable Entity", 500: "Internal Server Error"}
+
+################################################################################
+#region Parsed images
+
+class ParsedImage:
+
+    #Catalogue of one side of a disk image, the JSON is prepared once so it can be sent as it is
+    #Files are looked up by upper-cased name to their length and (offset, length) runs in the image file
+    __slots__ = ("catalogue_json", "files")
+
+    def __init__(self, catalogue_json, files):
+        self.catalogue_json = catalogue_json
+        self.files = files
+
+def parse_image(disk, side):
+
+    #Read-only mode maps the disk image, only the catalogue sectors are read
+    disk_image = image.DiskImage()
+    disk_image.set_disk(disk)
+    disk_image.set_side(side)
+    disk_image.set_readonly(True)
+    try:
+        with disk_image.batch():
+            catalogue = {
+                "title": disk_image.disk_title,
+                "boot": disk_image.disk_boot,
+                "sectors": disk_image.disk_sectors,
+                "cycle": disk_image.disk_cycle,
+                "files": [{"name": entry.name, "lock": entry.lock == "L", "load": entry.load, "exec": entry.exec,
+                           "length": entry.length, "sector": entry.sector} for entry in disk_image.files]
+            }
+            files = {}
+            for entry in disk_image.files:
+                files.setdefault(entry.name.upper(), (entry.length, disk_image.extents(entry.name)))
+    except image.DiskImageError:
+        raise
+    except (IndexError, ValueError): # image too short for its catalogue
+        raise image.UnsupportedDiskError(f"cannot read disk image: {disk}")
+
+    return ParsedImage(json.dumps(catalogue).encode(), files)
+
+class CatalogueCache:
+
+    #LRU cache of parsed images by path and side, entries are stamped with the modification time and size
+    #of the image file and parsed again if either changes
+    def __init__(self, size, executor):
+        self.size = size
+        self.executor = executor
+        self.images = OrderedDict()
+        self.pending = {}
+
+    async def get(self, disk, side):
+
+        try:
+            stat = os.stat(disk)
+        except OSError:
+            raise image.DiskNotFoundError(f"disk image not found: {disk}")
+
+        key = (disk, side)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = self.images.get(key)
+        if cached is not None and cached[0] == stamp:
+            self.images.move_to_end(key)
+            return cached[1]
+
+        #Cold image, parse it on the thread pool with any other requests for it waiting on the same parse
+        pending = self.pending.get((key, stamp))
+        if pending is None:
+            pending = asyncio.get_running_loop().run_in_executor(self.executor, parse_image, disk, side)
+            self.pending[(key, stamp)] = pending
+            pending.add_done_callback(lambda future: self._parsed(key, stamp, future))
+
+        return await asyncio.shield(pending)
+
+    def _parsed(self, key, stamp, future):
+
+        del self.pending[(key, stamp)]
+        if future.cancelled() or future.exception() is not None:
+            return
+
+        self.images[key] = (stamp, future.result())
+        self.images.move_to_end(key)
+        while len(self.images) > self.size:
+            self.images.popitem(last=False)
+
+#endregion
+
+################################################################################
+#region HTTP requests
+
+def query_value(query, name, default=None):
+
+    values = query.get(name)
+    if values:
+        return values[0]
+    if default is None:
+        raise image.InvalidOptionError(f"{name} not specified")
+    return default
+
+def disk_path(root, disk):
+
+    #Disk images must be inside the root folder
+    disk = path.realpath(path.join(root, disk))
+    if path.commonpath([root, disk]) != root:
+        raise image.InvalidOptionError(f"disk image outside {root}")
+    return disk
+
+def byte_range(range_header, length):
+
+    #Single byte range from a Range header as (start, end) with the end excluded, the whole file
+    #if there is no usable header and None if the range is outside the file
+    units, _, spec = range_header.partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return 0, length
+
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            start, end = max(0, length - int(last)), length
+        else:
+            start, end = int(first), min(length, int(last) + 1) if last else length
+    except ValueError:
+        return 0, length
+
+    if start >= end:
+        return None
+    return start, end
+
+def read_at(f, offset, size):
+    f.seek(offset)
+    return f.read(size)
+
+def response_head(status, content_type, length, keep_alive, extra_headers=""):
+    return (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {length}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"{extra_headers}\r\n").encode('Latin-1')
+
+async def send_file(writer, method, disk, parsed, file, range_header, keep_alive, executor):
+
+    #Assume dir $ if none specified
+    if (len(file) < 2) or (file[1] != "."):
+        file = "$." + file
+    if file.upper() not in parsed.files:
+        raise image.DiskFileNotFoundError(f"file not found: {file}")
+    length, extents = parsed.files[file.upper()]
+
+    selected = byte_range(range_header, length) if range_header else (0, length)
+    if selected is None:
+        writer.write(response_head(416, "application/octet-stream", 0, keep_alive, f"Content-Range: bytes */{length}\r\n"))
+        return keep_alive
+
+    start, end = selected
+    if range_header and (start, end) != (0, length):
+        head = response_head(206, "application/octet-stream", end - start, keep_alive,
+                             f"Content-Range: bytes {start}-{end - 1}/{length}\r\nAccept-Ranges: bytes\r\n")
+    else:
+        head = response_head(200, "application/octet-stream", end - start, keep_alive, "Accept-Ranges: bytes\r\n")
+    if method == "HEAD":
+        writer.write(head)
+        return keep_alive
+
+    #The image is opened before the response starts so an image that can't be opened is still answered
+    #Stream the selected part of each run of the file, a short or failed read means the image has changed
+    #since it was parsed and the connection is closed as the response can't be completed
+    loop = asyncio.get_running_loop()
+    with open(disk, 'rb') as f:
+        writer.write(head)
+        position = 0
+        for offset, size in extents:
+            first, last = max(start, position), min(end, position + size)
+            while first < last:
+                chunk_size = min(CHUNK_SIZE, last - first)
+                try:
+                    chunk = await loop.run_in_executor(executor, read_at, f, offset + first - position, chunk_size)
+                except OSError:
+                    return False
+                if len(chunk) < chunk_size:
+                    return False
+                writer.write(chunk)
+                await writer.drain()
+                first += chunk_size
+            position += size
+
+    return keep_alive
+
+async def handle_request(writer, request_line, headers, root, cache, executor):
+
+    #Returns whether the connection can be kept open for another request
+    try:
+        method, target, version = request_line.decode('Latin-1').split()
+    except ValueError:
+        method, target, version = "", "", "HTTP/1.0"
+    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+    try:
+        if method != "GET" and method != "HEAD":
+            body = json.dumps({"error": "only GET and HEAD are supported"}).encode()
+            writer.write(response_head(405, "application/json", len(body), keep_alive, "Allow: GET, HEAD\r\n") + body)
+            return keep_alive
+
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        if url.path != "/cat" and url.path != "/extract":
+            raise image.DiskFileNotFoundError(f"unknown request: {url.path}")
+
+        disk = disk_path(root, query_value(query, "disk"))
+        parsed = await cache.get(disk, query_value(query, "side", "0"))
+
+        if url.path == "/cat":
+            writer.write(response_head(200, "application/json", len(parsed.catalogue_json), keep_alive)
+                         + (parsed.catalogue_json if method == "GET" else b""))
+            return keep_alive
+
+        return await send_file(writer, method, disk, parsed, query_value(query, "file"), headers.get("range", ""), keep_alive, executor)
+
+    except image.DiskImageError as e:
+        status = next((status for error, status in ERROR_STATUS if isinstance(e, error)), 400)
+        body = json.dumps({"error": str(e)}).encode()
+        writer.write(response_head(status, "application/json", len(body), keep_alive) + (body if method != "HEAD" else b""))
+        return keep_alive
+
+    except ConnectionError:
+        raise
+
+    except OSError as e: # the disk image is a folder or can't be read
+        status = next((status for error, status in OS_ERROR_STATUS if isinstance(e, error)), 500)
+        body = json.dumps({"error": f"cannot read disk image: {disk} ({e.strerror or e})"}).encode()
+        writer.write(response_head(status, "application/json", len(body), keep_alive) + (body if method != "HEAD" else b""))
+        return keep_alive
+
+async def handle_connection(reader, writer, root, cache, executor):
+
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode('Latin-1').partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            keep_alive = await handle_request(writer, request_line, headers, root, cache, executor)
+            await writer.drain()
+            if not keep_alive:
+                break
+
+    except (ConnectionError, ValueError): # ValueError if a line is too long
+        pass
+
+    finally:
+        writer.close()
+
+async def serve(root, host, port, socket_path, cache_size, workers):
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    cache = CatalogueCache(cache_size, executor)
+    client = lambda reader, writer: handle_connection(reader, writer, root, cache, executor)
+
+    if socket_path != "":
+        server = await asyncio.start_unix_server(client, path=socket_path)
+        print(f"Serving disk images in {root} on {socket_path}")
+    else:
+        server = await asyncio.start_server(client, host, port)
+        print(f"Serving disk images in {root} on http://{host}:{port}")
+
+    async with server:
+        await server.serve_forever()
+
+#endregion
+
+################################################################################
+# Main Routine
+if __name__ == '__main__':
+
+    root = os.getcwd()
+    host = "127.0.0.1"
+    port = 8021
+    socket_path = ""
+    cache_size = 256
+    workers = 4
+
+    args = sys.argv[1:]
+    i = 0
+    while i < len(args):
+        if args[i] == "-root":
+            root = args[i + 1]
+        elif args[i] == "-host":
+            host = args[i + 1]
+        elif args[i] == "-port":
+            port = int(args[i + 1])
+        elif args[i] == "-socket":
+            socket_path = args[i + 1]
+        elif args[i] == "-cache":
+            cache_size = int(args[i + 1])
+        elif args[i] == "-workers":
+            workers = int(args[i + 1])
+        i += 1
+
+    try:
+        asyncio.run(serve(path.realpath(root), host, port, socket_path, cache_size, workers))
+    except KeyboardInterrupt:
+        pass
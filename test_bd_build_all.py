@@ -0,0 +1,75 @@
+################################################################################
+# test_bd_build_all.py - Tests for the cave groups in bd_build_all.py
+#
+#   Usage: python -m unittest test_bd_build_all (or pytest) from the repository folder
+#
+
+### Imports
+import os
+import sys
+import tempfile
+import unittest
+from os import path
+
+from bd_build_all import CAVE_GROUPS, create_cave_groups
+
+base_path = path.dirname(path.abspath(__file__))
+sys.path.insert(0, path.join(base_path, "utilities"))
+import BDcavegen
+
+################################################################################
+#region Tests
+
+class CaveGroupTest(unittest.TestCase):
+
+    BD_FILE = path.join(base_path, "bdcff_conversions", "done", "ArnoDash01.bd")
+
+    @classmethod
+    def setUpClass(cls):
+        cls.config = BDcavegen.load_config(base_path)
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def generate_caves(self, subfolder, group_index_header):
+
+        #Cave group files from the cave generator, with or without the index header
+        caves_folder = path.join(self.folder.name, subfolder, "ArnoDash01")
+        os.makedirs(caves_folder)
+        write_group_index_header = BDcavegen.WRITE_GROUP_INDEX_HEADER
+        BDcavegen.WRITE_GROUP_INDEX_HEADER = group_index_header
+        try:
+            with open(self.BD_FILE, "r") as input_file:
+                BDcavegen.generate_caves(input_file, caves_folder, self.config)
+        finally:
+            BDcavegen.WRITE_GROUP_INDEX_HEADER = write_group_index_header
+        return caves_folder
+
+    def test_group_index_header_removed(self):
+        with_header = self.generate_caves("header", True)
+        without_header = self.generate_caves("no_header", False)
+        with open(path.join(with_header, "ArnoDash01-1"), "rb") as f:
+            self.assertEqual(f.read(4), b"BDCG")
+
+        cave_groups = create_cave_groups(with_header, "AD01")
+        self.assertEqual(cave_groups, create_cave_groups(without_header, "AD01"))
+        for i, cave_letters in enumerate(CAVE_GROUPS):
+            self.assertEqual(len(cave_groups[f"AD01-{i+1}"]), BDcavegen.CAVE_SIZE * len(cave_letters))
+
+    def test_individual_cave_files(self):
+        caves_folder = path.join(base_path, "caves_bin", "ArnoDash01")
+        cave_groups = create_cave_groups(caves_folder, "AD01")
+        for i, cave_letters in enumerate(CAVE_GROUPS):
+            cave_files = []
+            for c in cave_letters:
+                with open(path.join(caves_folder, c), "rb") as f:
+                    cave_files.append(f.read())
+            self.assertEqual(cave_groups[f"AD01-{i+1}"], b"".join(cave_files))
+
+#endregion
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+################################################################################
+# test_image.py - Tests for DiskImage in image.py
+#
+#   Usage: python -m unittest test_image (or pytest) from the repository folder
+#
+
+### Imports
+import os
+import tempfile
+import unittest
+
+from image import DiskImage, MetadataError
+
+################################################################################
+#region Helper functions
+
+def file_data(fill, length):
+    return bytes((fill + i) & 0xFF for i in range(length))
+
+def create_image(disk, files):
+
+    disk_image = DiskImage()
+    disk_image.create(disk, "TEST", 0, 40, [(name, 0x1900, 0x8023, " ", data) for name, data in files])
+    return disk_image
+
+#endregion
+
+################################################################################
+#region Tests
+
+class CompactTest(unittest.TestCase):
+
+    FILES = [("A", file_data(0x10, 700)), ("B", file_data(0x40, 600)), ("C", file_data(0x80, 900))]
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.disk = os.path.join(self.folder.name, "test.ssd")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def reopen(self):
+        disk_image = DiskImage()
+        disk_image.set_disk(self.disk)
+        return disk_image
+
+    def test_compact(self):
+        create_image(self.disk, self.FILES)
+        self.reopen().delete("B")
+        self.reopen().compact()
+
+        disk_image = self.reopen()
+        self.assertEqual(bytes(disk_image.read("A")), self.FILES[0][1])
+        self.assertEqual(bytes(disk_image.read("C")), self.FILES[2][1])
+        self.assertEqual(disk_image.extents("A"), [(2 * 256, 700)])
+        self.assertEqual(disk_image.extents("C"), [(5 * 256, 900)])
+        self.assertTrue(disk_image.verify()["ok"])
+
+    def test_compact_out_of_order_catalogue(self):
+        create_image(self.disk, self.FILES)
+        self.reopen().delete("B")
+
+        #Swap the two catalogue records so the catalogue is no longer in descending sector order
+        with open(self.disk, 'r+b') as f:
+            image = bytearray(f.read())
+            image[8:16], image[16:24] = image[16:24], image[8:16]
+            image[0x108:0x110], image[0x110:0x118] = image[0x110:0x118], image[0x108:0x110]
+            f.seek(0)
+            f.write(image)
+        self.assertIn("order", [problem["check"] for problem in self.reopen().verify()["problems"]])
+
+        self.reopen().compact()
+
+        disk_image = self.reopen()
+        self.assertEqual(bytes(disk_image.read("A")), self.FILES[0][1])
+        self.assertEqual(bytes(disk_image.read("C")), self.FILES[2][1])
+        self.assertEqual(disk_image.extents("A"), [(2 * 256, 700)])
+        self.assertEqual(disk_image.extents("C"), [(5 * 256, 900)])
+
+class CreateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_invalid_metadata(self):
+        data = file_data(0x10, 300)
+        for disk, files, side2_files in [
+                ("lock.ssd", [("A", 0x1900, 0x8023, "X", data)], None),
+                ("load.ssd", [("A", 0x40000, 0x8023, " ", data)], None),
+                ("exec.dsd", [("A", 0x1900, 0x8023, "L", data)], [("B", 0x1900, 0xFFFE0000, " ", data)])]:
+            with self.subTest(disk = disk):
+                disk = os.path.join(self.folder.name, disk)
+                with self.assertRaises(MetadataError):
+                    DiskImage().create(disk, "TEST", 0, 40, files, side2_files)
+                self.assertFalse(os.path.exists(disk))
+
+#endregion
+
+if __name__ == '__main__':
+    unittest.main()
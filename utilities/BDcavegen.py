@@ -2,8 +2,10 @@
 # BDcavegen.py - For the Acorn Electron Boulder Dash game
 #   Python program to read BDCFF files and convert into playable cave files. 
 #
-#   Each cave file is self-contained and just needs the Boulder Dash game 'engine'
+#   Each cave is self-contained and just needs the Boulder Dash game 'engine'
 #   to be played. It holds the cave parameters (48 bytes) and map (400 bytes).
+#   The caves are written as the 2 group files loaded by the game, caves A-H,Q,R and I-P,S,T,
+#   e.g. BoulderDash01-1 and BoulderDash01-2 for BoulderDash01.bd
 #
 #   A cave definition JSON file is also created in this process which is a more 
 #   structured and readable BD file.
@@ -29,10 +31,77 @@
 import os
 from os import path
 import json
+import io
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 
 ATTEMPT_BD_COLOUR_MAP = True  #Attempt to map the colours in the BDCFF or use the config file scheme per cave
 MOVE_BD_TO_DONE_FOLDER = True  #True move to "done" folder, False leaves the source BDCFF file where it is
+WRITE_GROUP_INDEX_HEADER = False  #True adds an index header to the group files for tools, the game needs them without
+
+CAVE_GROUPS = ["ABCDEFGHQR", "IJKLMNOPST"]  #Caves in each group file, two files are needed to allow them to fit into memory
+CAVE_SIZE = 448  #Cave parameters (48 bytes) and map (400 bytes)
+
+################################################################################
+#region Config
+
+class CaveConfig:
+    #Element and parameter lookups from the config file, used to generate caves
+    __slots__ = ("parameters", "element_map", "colour_schemes", "colour_map", "element_no_map", "object_element_map",
+                 "element_values", "unsupported_symbols", "addresses", "initial_cave_params")
+
+def load_config(base_path):
+
+    #Read the config file and create the element and parameter lookups used to generate caves
+    config = CaveConfig()
+    with open(path.join(base_path, "config", "config.json")) as config_file:
+        config_settings = json.load(config_file)
+    config.parameters = config_settings["parameters"]
+    config.element_map = element_map = config_settings["element_map"]
+    config.colour_schemes = config_settings["colour_schemes"]
+    config.colour_map = config_settings["colour_map"]
+
+    #Create unsupported element list from element_map (where substitute values are being used)
+    config.element_no_map = element_no_map = {e for e in element_map if "substitute" in element_map[e]}
+
+    #Create object_element_map from element_map by making the element name the key, using substitute values if available
+    config.object_element_map = object_element_map = {}
+    for e in element_map:
+        new_key = element_map[e]["element"]
+        object_element_map[new_key] = {}
+        if "substitute" in element_map[e]:
+            sub = element_map[e]["substitute"]
+            object_element_map[new_key]["symbol"] = sub
+            object_element_map[new_key]["value"] = element_map[sub]["value"]
+            object_element_map[new_key]["original"] = e
+        else:
+            object_element_map[new_key]["symbol"] = e
+            object_element_map[new_key]["value"] = element_map[e]["value"]
+
+    #Create lookups for tile symbol codes, the element value (unmapped symbols become space (0)) and whether
+    #the symbol is unsupported (substituted or unmapped)
+    #Rockford start and exit are cave parameters so their tiles are space too
+    config.element_values = np.zeros(256, dtype = np.uint8)
+    config.unsupported_symbols = np.ones(256, dtype = bool)
+    for e in element_map:
+        if e not in ["P", "X"]:
+            config.element_values[ord(e)] = element_map[e]["value"]
+        if e not in element_no_map:
+            config.unsupported_symbols[ord(e)] = False
+
+    #Create addresses where parameters will be stored in the output cave file
+    config.addresses = addresses = {}
+    for a in config.parameters:
+        addresses[a] = config.parameters[a]["address"]
+
+    #Create the initial cave parameter bytes, with the initial fill dirt "." and border steelwall "W"
+    config.initial_cave_params = bytearray(48)
+    config.initial_cave_params[addresses["InitialFill"]] = element_map["."]["value"]
+    config.initial_cave_params[addresses["BorderTile"]] = element_map["W"]["value"]
+    return config
+
+#endregion
 
 ################################################################################
 #region Helper functions
@@ -46,475 +115,457 @@ def safe_byte(value):
     else:
         return value
 
-def get_object_map_value(element):
+def get_object_map_value(config, element):
 
-    if element in object_element_map:
-        value = object_element_map[element]["value"]
+    if element in config.object_element_map:
+        value = config.object_element_map[element]["value"]
         value_int = int(value)
     else:
         print(f"No element value found for {element}")
         value_int = 99
     return value_int
 
-def get_object_map_symbol(element):
+def get_object_map_symbol(config, element, unsupported_elements):
 
-    if element in object_element_map:
-        symbol = object_element_map[element]['symbol']
+    if element in config.object_element_map:
+        symbol = config.object_element_map[element]['symbol']
+
+        #Add substituted elements to unsupported elements for the cave, by their own symbol
+        original_symbol = config.object_element_map[element].get('original')
+        if original_symbol != None and original_symbol not in unsupported_elements:
+            unsupported_elements.append(original_symbol)
     else:
         print(f"No element symbol found for {element}")
         symbol = "?"
     return symbol
 
-def plot_diagonal_line(object_cave_map, row1, col1, row2, col2, value):
-
-    #Plot repeated points from start to end of diagonal line
-    y = 1  #Assume step from top row to bottom
-    if row1 > row2:
-        y = -1  #Step from bottom row to top
-
-    x = 1  #Assume step from left col to right
-    if col1 > col2:
-        x = -1  #Step from right col to left
-    
-    while row1 != row2:
-        while col1 != col2:
-            object_cave_map[row1:row1+1,col1:col1+1] = value  #Draw single point
-            col1 += x
-            row1 += y
-    object_cave_map[row1:row1+1,col1:col1+1] = value  #Draw single point for last point, values are equal
-
-def add_cave_parameter(output_cave_json, output_cave_params, param_name, value):
+def describe_substitution(config, e):
+
+    if e in config.element_no_map:
+        sub_element = config.element_map[e]['substitute']
+        return f"'{e}' {config.element_map[e]['element']} becomes '{sub_element}' {config.element_map[sub_element]['element']}"
+    else:
+        return f"'{e}' becomes ' ' space"
+
+def plot_line(object_cave_map, row1, col1, row2, col2, value):
+
+    #Plot all points of a line from start to end in any direction, stepping one row or column at a time along
+    #the longer axis and rounding the other axis to the nearest tile (Bresenham's line)
+    #Halves always round down the cave, so the same points are drawn whichever end the line starts from
+    #Points outside the cave are not drawn
+    steps = max(abs(row2 - row1), abs(col2 - col1))
+    if steps == 0:
+        rows, cols = np.array([row1]), np.array([col1])  #Single point
+    else:
+        t = np.arange(steps + 1)
+        rows = (2 * row1 * steps + 2 * (row2 - row1) * t + steps) // (2 * steps)
+        cols = (2 * col1 * steps + 2 * (col2 - col1) * t + steps) // (2 * steps)
+    inside = (rows >= 0) & (rows < object_cave_map.shape[0]) & (cols >= 0) & (cols < object_cave_map.shape[1])
+    object_cave_map[rows[inside], cols[inside]] = value  #Draw all points
+
+def add_cave_parameter(config, output_cave_json, output_cave_params, param_name, value):
     if param_name not in ["Colors", "InitialFill", "BorderTile", "TileForProbability", "RandomFillBelow"]:   #Some parameters are added to JSON separately
         output_cave_json[param_name] = value
 
-    i = addresses.get(param_name)
+    i = config.addresses[param_name]
     if type(value) == bool:
         #Convert boolean parameter to 1 (true), or 0 (false)
         output_cave_params[i] = 1 if value == True else 0
     elif type(value) == list:
-        for j in range(len(value)):
-            output_cave_params[i] = value[j]
-            i += 1
+        output_cave_params[i:i+len(value)] = bytes(value)
     else:
         output_cave_params[i] = value
 
-def add_cave_map_row(cave_count, cave_line_count, line, output_cave_json, output_cave_params, output_cave_map_bytes, unsupported_elements):
-
-    last_value = 0
-    char_count = 0
-    for c in line.strip('\n'):
-
-        e = 0
-        if c in element_map:
-
-            if c == "P":  #Special element "P" Rockford starting point, needs to be a cave parameter
-                add_cave_parameter(output_cave_json, output_cave_params, "RockfordStart", [cave_line_count - 1, char_count])  #Is -1 because output caves don't need the top and botton lines
-            elif c == "X":  #Special element "X" Rockford exit, needs to be a cave parameter
-                add_cave_parameter(output_cave_json, output_cave_params, "RockfordExit", [cave_line_count - 1, char_count])  #Is -1 because output caves don't need the top and botton lines
-            else:
-                e = element_map[c]['value']
-
-            char_count += 1
-            if char_count % 2 == 0:  #New two mapped values (both nibbles) to combine into a single byte
-                output_cave_map_bytes.append(((last_value<<4) | e).to_bytes(1, byteorder='big'))
-            last_value = e
-        else:
-            if c not in unsupported_elements:  #Add to unsupported elements for the cave
+def fit_cave_map(cave_count, cave_letter, map_lines, intermission_cave, border_tile):
+
+    #Convert map lines to an array of tile symbol codes the size of the cave including its border, 22 lines of 40 tiles
+    #or 12 lines of 20 tiles for an intermission
+    #Short lines and missing lines are padded with the border tile, long lines and extra lines are truncated
+    height, width = (12, 20) if intermission_cave else (22, 40)
+    if len(map_lines) == height and all(len(line) == width for line in map_lines):
+        return np.frombuffer("".join(map_lines).encode("latin-1"), dtype = np.uint8).reshape(height, width)
+
+    print(f"*** Map for cave {cave_count} ({cave_letter}) is not {height} lines of {width} tiles, padded with '{border_tile}' or truncated to fit")
+    cave_map = np.full((height, width), ord(border_tile), dtype = np.uint8)
+    for row, line in enumerate(map_lines[:height]):
+        line_codes = np.frombuffer(line[:width].encode("latin-1"), dtype = np.uint8)
+        cave_map[row, :len(line_codes)] = line_codes
+    return cave_map
+
+def add_cave_map(config, cave_count, cave_map, output_cave_json, output_cave_params, unsupported_elements):
+
+    #The cave map is an array of tile symbol codes, e.g. ord("w") for a wall
+    #Special elements "P" Rockford starting point and "X" Rockford exit need to be cave parameters
+    for c, param_name in [("P", "RockfordStart"), ("X", "RockfordExit")]:
+        rows, cols = np.nonzero(cave_map == ord(c))
+        if len(rows) > 0:
+            add_cave_parameter(config, output_cave_json, output_cave_params, param_name, [int(rows[-1]), int(cols[-1])])  #Last row and column found
+
+    #Add substituted and unmapped symbols to unsupported elements for the cave, in the order they first appear
+    unsupported_tiles = cave_map[config.unsupported_symbols[cave_map]]
+    if len(unsupported_tiles) > 0:
+        codes, first_index = np.unique(unsupported_tiles, return_index=True)
+        for code in codes[np.argsort(first_index)]:
+            c = chr(code)
+            if c not in unsupported_elements:
                 unsupported_elements.append(c)
+                if c not in config.element_map:
+                    print(f"mapping for element {c} in cave {cave_count} not found, using space instead")
 
-            if c in element_no_map:  #Use the substitute element if possible
-                s = element_no_map[c]['substitute']
-                e = element_map[s]['value']
-                char_count += 1
-                if char_count % 2 == 0:  #New two mapped values (both nibbles) to combine into a single byte
-                    output_cave_map_bytes.append(((last_value<<4) | e).to_bytes(1, byteorder='big'))
-                last_value = e
-            else:
-                print(f"mapping for element {c} in cave {cave_count} not found, using space instead")
-
-
-def create_ssd(disk_title, ssd_filepath, tracks, boot_option):
-    #boot_option 0=None, 1=Load, 2=Run, 3=Exec
-    disk_type = 0  # 0=Acorn DFS or Watford DFS <= 256K
-    num_sectors = tracks * 10  # 40 or 80 tracks, 10 sectors per track
-    split_title = [disk_title[0:8],disk_title[8:12]]
-
-    # Add the first 8 characters of the title, then pad to 256 bytes
-    ssd_bytes = bytearray(split_title[0], 'Latin-1')
-    for i in range(len(split_title[0]), 0x100):
-        ssd_bytes.append(0)
+    #Map symbols to element values and combine each pair of values (both nibbles) into a single byte
+    values = config.element_values[cave_map]
+    return (values[:, 0::2] << 4) | values[:, 1::2]
 
-    # Add the next 4 (max) characters of the title, then pad to 262 bytes
-    ssd_bytes.extend(bytearray(split_title[1], 'Latin-1'))
-    for i in range(len(ssd_bytes), 0x106):
-        ssd_bytes.append(0)
+#endregion
 
-    # Add the boot and related information, then pad to 512 bytes
-    ssd_bytes.append((boot_option * 16) + (disk_type * 4) + (num_sectors // 256))
-    ssd_bytes.append(num_sectors & 255)
-    for i in range(0x108, 0x200):
-        ssd_bytes.append(0)
+################################################################################
+#region BDCFF parser
+
+def int_values(value):
+    return [int(x) for x in value.split()]
+
+def random_fill_values(value):
+    #Pairs of element and probability, e.g. "BOULDER 50 DIAMOND 9" becomes [("BOULDER", 50), ("DIAMOND", 9)]
+    values = value.split()
+    return [(values[i], int(values[i+1])) for i in range(0, len(values) - 1, 2)]
+
+#Conversion of each cave parameter's text to its value, other parameters (e.g. Name, InitialFill) are kept as text
+PARAMETER_TYPES = {
+    "DiamondValue": int_values,  #DiamondValue and optional DiamondExtraValue
+    "DiamondsRequired": int_values,  #Up to 5 values, one for each level
+    "CaveTime": int_values,
+    "RandSeed": int_values,
+    "DiamondExtraValue": int,
+    "AmoebaTime": int,
+    "MagicWallTime": int,
+    "Bombs": int,
+    "ZeroGravityTime": int,
+    "SlimePermeability": lambda value: int(float(value)),
+    "Intermission": lambda value: value.upper() == "TRUE",
+    "Colors": str.split,
+    "RandomFill": random_fill_values,
+}
+
+class BDCFFParameter:
+    #Cave parameter, e.g. CaveTime=150 110 70 40 30 has name "CaveTime" and value [150, 110, 70, 40, 30]
+    __slots__ = ("name", "value")
+
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+class BDCFFObject:
+    #Cave object, e.g. Line=1 7 30 7 WALL has name "Line" and values ["1", "7", "30", "7", "WALL"]
+    __slots__ = ("name", "values")
+
+    def __init__(self, name, values):
+        self.name = name
+        self.values = values
+
+class BDCFFCave:
+    #Cave from a BDCFF file, objects and map are None if the cave has no [objects] or [map] section
+    __slots__ = ("parameters", "objects", "map")
+
+    def __init__(self):
+        self.parameters = []
+        self.objects = None
+        self.map = None
+
+def parse_bdcff(bdcff_file):
+
+    #Read a BDCFF file line by line from any file-like object, yielding each cave as soon as it is complete
+    #so only one cave is held in memory at a time
+    cave = None
+    section = ""
+    for line in bdcff_file:
+
+        tag = line.strip()
+        if tag == "[cave]":
+            cave = BDCFFCave()
+            section = ""
+        elif cave is None:
+            continue  #Outside a cave, e.g. the [game] section
+
+        elif tag == "[/cave]":
+            yield cave
+            cave = None
+        elif tag == "[map]":
+            cave.map = []
+            section = "map"
+        elif tag == "[objects]":
+            cave.objects = []
+            section = "objects"
+        elif tag in ["[/map]", "[/objects]"]:
+            section = ""
+
+        #Map lines are kept as they are, e.g. "WWWW..."
+        elif section == "map":
+            cave.map.append(line.strip('\n'))
+
+        #Objects, e.g. "FillRect=8 8 11 11 DIRT SPACE"
+        elif section == "objects":
+            if "=" in line:
+                values = line.replace("="," ").strip().split(" ")
+                cave.objects.append(BDCFFObject(values[0], values[1:]))
 
-    # Write the empty ssd file
-    with open(ssd_filepath, 'wb') as f:
-        f.write(ssd_bytes)
+        #Cave parameters, e.g. "CaveTime=120"
+        elif "=" in line:
+            name, value = tag.split("=")[0:2]
+            if name in PARAMETER_TYPES:
+                value = PARAMETER_TYPES[name](value)
+            cave.parameters.append(BDCFFParameter(name, value))
 
 #endregion
 
 ################################################################################
 #region Generate caves from BD definition
 
-def generate_caves(all_input_lines, output_subfolder):
+def generate_caves(bdcff_file, output_subfolder, config):
 
     #Every fifth cave has to be an intermission / bonus cave, with cave letters Q, R, S, T
     cave_letters = ['A','B','C','D','Q','E','F','G','H','R','I','J','K','L','S','M','N','O','P','T']
     output_all_caves_json = []
-    output_cave_map_bytes = []
+    substitutions = {}  #Cave letters where each unsupported element is substituted
+    cave_groups = [bytearray(CAVE_SIZE * len(cave_group)) for cave_group in CAVE_GROUPS]
 
-    within_cave = False
-    within_map = False
-    within_objects = False
-    intermission_cave = False
-    cave_count = 0
-    for line in all_input_lines:
+    for cave_count, cave in enumerate(parse_bdcff(bdcff_file), start=1):
 
         #Start of a cave
-        if line == "[cave]\n":
-            cave_count += 1
-            within_cave = True
-            within_map = False
-            within_objects = False
-            intermission_cave = False
-
-            output_cave_json = {}
-            output_cave_json["CaveLetter"] = cave_letters[cave_count-1]
-            output_cave_json["CaveNumber"] = cave_count
-            output_cave_json["Map"] = []
-
-            output_cave_params = []
-            output_cave_map_bytes = []
-            unsupported_elements = []
-            last_tile_for_probability = []
-
-            #Initialise the cave parameter bytes
-            for i in range(48):
-                output_cave_params.append(0)
-
-            #Set the parameter initial fill to dirt "." and border to steelwall "W", these paramters may be changed in some caves
-            output_cave_params[addresses.get("InitialFill")] = element_map["."]["value"]
-            output_cave_params[addresses.get("BorderTile")] = element_map["W"]["value"]
-
-            #The cave is filled with the null time, border with the steelwall
-            cave_fill_tile = "-"  #The game engine will replace null tiles with pseudo-random tiles or the initial fill time
-            border_tile = "W"
-
-        #End of a cave
-        elif line == "[/cave]\n":
-            within_cave = False
-            within_map = False
-            within_objects = False
-
-            #Check if any unsupported elements found and report them
-            if len(unsupported_elements) > 0:
-                print(f"*** Unsupported elements found for cave {cave_count} ({cave_letters[cave_count-1]})")
-                for e in [u for u in unsupported_elements if u in element_no_map]:
-                    sub_element = element_no_map[e]['substitute']
-                    print(f"    '{e}' {element_no_map[e]['element']} becomes '{sub_element}' {element_map[sub_element]['element']}")
-                for e in [u for u in unsupported_elements if u not in element_no_map]:
-                    print(f"    Remaining {unsupported_elements} become ' ' space")
-
-            #Write cave contents file
-            output_file_name = path.join(output_subfolder, cave_letters[cave_count-1])
-            output_file = open(output_file_name, "wb")
-
-            #Write cave parameters
-            for value in output_cave_params:
-                output_file.write(value.to_bytes(1, byteorder='big'))
-
-            #Write cave map
-            if intermission_cave:
-                skip_bytes = 9  #9 because intermissions are 20 tiles with each tile being one nibble, and zero based counting
-                for i, byte in enumerate(output_cave_map_bytes):
-                    if i % 10 == 0 and i > 10:
-                        output_file.write(b"3" * 10)  #Write out steelwall padding at the end of a line (every 10th byte)
-                    if i > skip_bytes:
-                        output_file.write(byte)
-                output_file.write(b"3" * 10)
-                for i in range(0,9):
-                    output_file.write(b"3" * 20)  #Write out steelwall padding lines (20 bytes)
-
-            else:  #standard cave
-                skip_bytes = 19  #19 because there are 40 tiles with each tile being one nibble, and zero based counting
-                for i, byte in enumerate(output_cave_map_bytes):
-                    if i > skip_bytes and i < len(output_cave_map_bytes) - skip_bytes -1:
-                        output_file.write(byte)
-
-            output_file.close()
-
-            #Add cave definition json to master list
-            output_all_caves_json.append(output_cave_json)
-
-        #Start of the map section within a cave
-        elif line == "[map]\n":
-            cave_line_count = 0
-            within_map = True
-
-        #End of the map section within a cave
-        elif line == "[/map]\n":
-            within_map = False
-
-        #Start of the objects section within a cave
-        elif line == "[objects]\n":
-            within_objects = True
-
-            if intermission_cave:
-                object_cave_map = np.full((12, 20), border_tile, dtype = np.str_)  #String datatype for tile symbols
-                object_cave_map[1:11,1:19] = cave_fill_tile
-            else:
-                object_cave_map = np.full((22, 40), border_tile, dtype = np.str_)  #String datatype for tile symbols
-                object_cave_map[1:21,1:39] = cave_fill_tile
-
-        #End of the objects section within a cave
-        elif line == "[/objects]\n":
-            within_objects = False
-
-            #Map numpy array integer values to tile symbols, write an output cave line and append line to JSON map
-            cave_line_count = 0
-            for object_map_line in object_cave_map:
-                map_line = ""
-                for tile in object_map_line:
-
-                    #If a null tile is used in a cave without pseudo-random cave parameters, replace null with dirt tile
-                    if tile == '-' and last_tile_for_probability == []:
-                        map_line += "."
+        intermission_cave = False
+
+        output_cave_json = {}
+        output_cave_json["CaveLetter"] = cave_letters[cave_count-1]
+        output_cave_json["CaveNumber"] = cave_count
+        output_cave_json["Map"] = []
+
+        output_cave_params = bytearray(config.initial_cave_params)  #Initial fill and border set, these paramters may be changed in some caves
+        output_cave_map = np.zeros((0, 20), dtype = np.uint8)
+        unsupported_elements = []
+        last_tile_for_probability = []
+
+        #The cave is filled with the null time, border with the steelwall
+        cave_fill_tile = "-"  #The game engine will replace null tiles with pseudo-random tiles or the initial fill time
+        border_tile = "W"
+
+        #Cave parameters
+        for parameter in cave.parameters:
+            if parameter.name in config.parameters or parameter.name == "RandomFill":  #RandomFill is a special case replaced with "TileProbability", "TileForProbability"
+
+                #DiamondValue may have 2 values, DiamondValue and DiamondExtraValue, space delimited
+                if parameter.name == "DiamondValue":
+                    line_values = parameter.value
+                    add_cave_parameter(config, output_cave_json, output_cave_params, "DiamondValue", safe_byte(line_values[0]))  #DiamondValue
+                    if len(line_values) > 1:
+                        add_cave_parameter(config, output_cave_json, output_cave_params, "DiamondExtraValue", safe_byte(line_values[1]))  #Use the extra value
                     else:
-                        if tile in element_map:
-                            map_line += tile
-                        else:
-                            map_line += "?"
-
-                cave_line_count += 1
-                add_cave_map_row(cave_count, cave_line_count, map_line, output_cave_json, output_cave_params, output_cave_map_bytes, unsupported_elements)
-                output_cave_json["Map"].append(map_line)  #Add line to json file
+                        add_cave_parameter(config, output_cave_json, output_cave_params, "DiamondExtraValue", safe_byte(line_values[0]))  #No extra value, use DiamondValue
+
+                #These parameters may have up to 5 values for each level, space delimited
+                elif parameter.name in ["DiamondsRequired", "CaveTime", "RandSeed"]:
+                    line_values = [safe_byte(x) for x in parameter.value]
+
+                    #If less than 5 line values, use the last value for the missing ones
+                    param_count = len(line_values)
+                    if param_count < 5:
+                        last_value = line_values[param_count-1]
+                        for n in range(param_count,5):
+                            line_values.append(last_value)
+
+                    add_cave_parameter(config, output_cave_json, output_cave_params, parameter.name, line_values)
+
+                elif parameter.name == "Intermission":
+                    intermission_cave = parameter.value
+                    add_cave_parameter(config, output_cave_json, output_cave_params, parameter.name, intermission_cave)
+
+                #Decode Initial fill element if present
+                elif parameter.name == "InitialFill":
+                    cave_fill_tile = get_object_map_symbol(config, parameter.value, unsupported_elements)
+                    add_cave_parameter(config, output_cave_json, output_cave_params, parameter.name, config.element_map[cave_fill_tile]["value"])
+                    output_cave_json[parameter.name] = config.element_map[cave_fill_tile]["element"]
+
+                #Decode Border tile element if present
+                elif parameter.name == "BorderTile":
+                    border_tile = get_object_map_symbol(config, parameter.value, unsupported_elements)
+                    add_cave_parameter(config, output_cave_json, output_cave_params, parameter.name, config.element_map[border_tile]["value"])
+                    output_cave_json[parameter.name] = config.element_map[border_tile]["element"]
+
+                elif parameter.name == "Colors":
+                    colour_codes = []
+                    colour_list = []
+                    if ATTEMPT_BD_COLOUR_MAP:
+                        for text_colour in parameter.value:
+                            if config.colour_map.get(text_colour.lower()) != None:  #Attempt to map the text values in Colors
+                                colour_codes.append(config.colour_map[text_colour.lower()])
+                                colour_list.append(text_colour.lower())
+                    if len(colour_codes) == 3:  #If exactly 3 mapped results, used the mapped scheme
+                        add_cave_parameter(config, output_cave_json, output_cave_params, parameter.name, colour_codes)
+                        output_cave_json[parameter.name] = colour_list
+                    else:  #Use the scheme from the config for the cave
+                        add_cave_parameter(config, output_cave_json, output_cave_params, parameter.name, config.colour_schemes[str(cave_count)]['code'])
+                        output_cave_json[parameter.name] = config.colour_schemes[str(cave_count)]['colours']
+
+                #Decode RandomFill with 1 to 4 pairs of values, e.g. SPACE 60 BOULDER 50 DIAMOND 9 FIREFLYl 2
+                elif parameter.name == "RandomFill":
+
+                    TileForProbability = []
+                    TileProbability = []
+                    TileForProbabilityJSON = []
+                    for element, probability in parameter.value:
+                        TileForProbability.append(get_object_map_value(config, element))
+                        TileForProbabilityJSON.append(element)
+                        TileProbability.append(probability)
+
+                    last_tile_for_probability = TileForProbability  #Potentially used later
+
+                    add_cave_parameter(config, output_cave_json, output_cave_params, "TileForProbability", TileForProbability)
+                    add_cave_parameter(config, output_cave_json, output_cave_params, "TileProbability", TileProbability)
+                    output_cave_json["TileForProbability"] = TileForProbabilityJSON
+
+                #Single value per cave, e.g. AmoebaTime and MagicWallTime are optionally present, if there use it
+                else:
+                    add_cave_parameter(config, output_cave_json, output_cave_params, parameter.name, safe_byte(parameter.value))
 
-        #Within the cave parameters section, but not the map or objects sections
-        elif within_cave and not within_map and not within_objects:
-            if "=" in line:
-                line_param = line.strip().split("=")  #e.g. CaveTime=120
-                if line_param[0] in config_settings["parameters"] or line_param[0] == "RandomFill":  #RandomFill is a special case replaced with "TileProbability", "TileForProbability"
-
-                    #DiamondValue may have 2 values, DiamondValue and DiamondExtraValue, space delimited
-                    if line_param[0] == "DiamondValue":
-                        line_values = line_param[1].strip().split(" ")
-                        add_cave_parameter(output_cave_json, output_cave_params, "DiamondValue", safe_byte(int(line_values[0])))  #DiamondValue
-                        if len(line_values) > 1:
-                            add_cave_parameter(output_cave_json, output_cave_params, "DiamondExtraValue", safe_byte(int(line_values[1])))  #Use the extra value
-                        else:
-                            add_cave_parameter(output_cave_json, output_cave_params, "DiamondExtraValue", safe_byte(int(line_values[0])))  #No extra value, use DiamondValue
-
-                    #These parameters may have up to 5 values for each level, space delimited
-                    elif line_param[0] in ["DiamondsRequired", "CaveTime", "RandSeed"]:
-                        line_values = [safe_byte(int(x)) for x in line_param[1].strip().split(" ")]
-
-                        #If less than 5 line values, use the last value for the missing ones
-                        param_count = len(line_values)
-                        if param_count < 5:
-                            last_value = line_values[param_count-1]
-                            for n in range(param_count,5):
-                                line_values.append(last_value)
-
-                        add_cave_parameter(output_cave_json, output_cave_params, f"{line_param[0]}", line_values)
-
-                    #AmoebaTime and MagicWallTime are optionally present, if there use it, single value per cave
-                    elif line_param[0] in ["AmoebaTime","MagicWallTime"]:
-                        add_cave_parameter(output_cave_json, output_cave_params, f"{line_param[0]}", safe_byte(int(line_param[1])))
-
-                    elif line_param[0] == "Intermission":
-                        intermission_cave = True if line_param[1].upper() == "TRUE" else False
-                        add_cave_parameter(output_cave_json, output_cave_params, f"{line_param[0]}", intermission_cave)
-
-                    #Decode Initial fill element if present
-                    elif line_param[0] == "InitialFill":
-                        cave_fill_tile = get_object_map_symbol(line_param[1])
-                        add_cave_parameter(output_cave_json, output_cave_params, f"{line_param[0]}", element_map[cave_fill_tile]["value"])
-                        output_cave_json[line_param[0]] = element_map[cave_fill_tile]["element"]
-
-                    #Decode Border tile element if present
-                    elif line_param[0] == "BorderTile":
-                        border_tile = get_object_map_symbol(line_param[1])
-                        add_cave_parameter(output_cave_json, output_cave_params, f"{line_param[0]}", element_map[border_tile]["value"])
-                        output_cave_json[line_param[0]] = element_map[border_tile]["element"]
-
-                    elif line_param[0] == "Colors":
-                        colour_codes = []
-                        colour_list = []
-                        if ATTEMPT_BD_COLOUR_MAP:
-                            for text_colour in line_param[1].split(" "):
-                                if colour_map.get(text_colour.lower()) != None:  #Attempt to map the text values in Colors
-                                    colour_codes.append(colour_map[text_colour.lower()])
-                                    colour_list.append(text_colour.lower())
-                        if len(colour_codes) == 3:  #If exactly 3 mapped results, used the mapped scheme
-                            add_cave_parameter(output_cave_json, output_cave_params, f"{line_param[0]}", colour_codes)
-                            output_cave_json[line_param[0]] = colour_list
-                        else:  #Use the scheme from the config for the cave
-                            add_cave_parameter(output_cave_json, output_cave_params, f"{line_param[0]}", colour_schemes[str(cave_count)]['code'])
-                            output_cave_json[line_param[0]] = colour_schemes[str(cave_count)]['colours']
-
-                    #Decode RandomFill with 1 to 4 pairs of values, e.g. SPACE 60 BOULDER 50 DIAMOND 9 FIREFLYl 2
-                    elif line_param[0] == "RandomFill":
-                        
-                        TileForProbability = []
-                        TileProbability = []
-                        TileForProbabilityJSON = []
-                        line_values = line_param[1].strip().split(" ")
-                        for i in range(len(line_values)):
-                            if i % 2 == 0:  #Even values are elements to decode
-                                value = get_object_map_value(line_values[i])
-                                TileForProbability.append(value)
-                                TileForProbabilityJSON.append(line_values[i])
-                            elif i > 0:  #Odd values are random integer values
-                                TileProbability.append(int(line_values[i]))
-
-                        last_tile_for_probability = TileForProbability  #Potentially used later
-
-                        add_cave_parameter(output_cave_json, output_cave_params, "TileForProbability", TileForProbability)
-                        add_cave_parameter(output_cave_json, output_cave_params, "TileProbability", TileProbability)
-                        output_cave_json["TileForProbability"] = TileForProbabilityJSON
-
-                    elif line_param[0] == "SlimePermeability":
-                        add_cave_parameter(output_cave_json, output_cave_params, f"{line_param[0]}", safe_byte(int(float(line_param[1]))))
+        #Objects section, drawn onto a cave filled with the fill tile inside a border
+        if cave.objects is not None:
 
+            if intermission_cave:
+                object_cave_map = np.full((12, 20), ord(border_tile), dtype = np.uint8)  #Tile symbol codes
+                object_cave_map[1:11,1:19] = ord(cave_fill_tile)
+            else:
+                object_cave_map = np.full((22, 40), ord(border_tile), dtype = np.uint8)  #Tile symbol codes
+                object_cave_map[1:21,1:39] = ord(cave_fill_tile)
+
+            #Note array co-ordinates are specified: object_cave_map[row1:row2,col1,col2], object values are col, row order
+            for cave_object in cave.objects:
+                v = cave_object.values
+                if cave_object.name == "Point":
+                    tile = ord(get_object_map_symbol(config, v[2], unsupported_elements))
+                    object_cave_map[int(v[1]):int(v[1])+1,int(v[0]):int(v[0])+1] = tile  #Draw single point
+                elif cave_object.name == "Line":
+                    tile = ord(get_object_map_symbol(config, v[4], unsupported_elements))
+                    plot_line(object_cave_map, int(v[1]),int(v[0]),int(v[3]),int(v[2]), tile)
+                elif cave_object.name == "FillRect":
+                    if len(v) > 5:
+                        tile = ord(get_object_map_symbol(config, v[4], unsupported_elements))
+                        fill_tile = ord(get_object_map_symbol(config, v[5], unsupported_elements))
+                        object_cave_map[int(v[1]):int(v[3])+1,int(v[0]):int(v[2])+1] = tile  #Draw outer filled rectangle
+                        object_cave_map[int(v[1])+1:int(v[3]),int(v[0])+1:int(v[2])] = fill_tile  #Draw inner filled rectangle
                     else:
-                        add_cave_parameter(output_cave_json, output_cave_params, f"{line_param[0]}", safe_byte(int(line_param[1])))
-
-        #Within the map section
-        elif within_map:
-
-            map_line = line.strip('\n')
-            cave_line_count += 1
-            add_cave_map_row(cave_count, cave_line_count, map_line, output_cave_json, output_cave_params, output_cave_map_bytes, unsupported_elements)
-            output_cave_json["Map"].append(map_line)  #Add line to json file
-
-        #Within the objects section
-        elif within_objects:
-            #Note array co-ordinates are specified: object_cave_map[row1:row2,col1,col2]
-            pl = line.replace("="," ").strip().split(" ")
-            if pl[0] == "Point":
-                tile = get_object_map_symbol(pl[3])
-                object_cave_map[int(pl[2]):int(pl[2])+1,int(pl[1]):int(pl[1])+1] = tile  #Draw single point
-            elif pl[0] == "Line":
-                tile = get_object_map_symbol(pl[5])
-                if pl[1] == pl[3] or pl[2] == pl[4]:
-                    object_cave_map[int(pl[2]):int(pl[4])+1,int(pl[1]):int(pl[3])+1] = tile  #Draw single line
-                else:
-                    plot_diagonal_line(object_cave_map, int(pl[2]),int(pl[1]),int(pl[4]),int(pl[3]), tile)
-            elif pl[0] == "FillRect":
-                if len(pl) > 6:
-                    tile = get_object_map_symbol(pl[5])
-                    fill_tile = get_object_map_symbol(pl[6])
-                    object_cave_map[int(pl[2]):int(pl[4])+1,int(pl[1]):int(pl[3])+1] = tile  #Draw outer filled rectangle
-                    object_cave_map[int(pl[2])+1:int(pl[4]),int(pl[1])+1:int(pl[3])] = fill_tile  #Draw inner filled rectangle
-                else:
-                    tile = get_object_map_symbol(pl[5])
-                    object_cave_map[int(pl[2]):int(pl[4])+1,int(pl[1]):int(pl[3])+1] = tile  #Draw filled rectangle
-            elif pl[0] == "Rectangle":
-                tile = get_object_map_symbol(pl[5])
-                object_cave_map[int(pl[2]):int(pl[2])+1,int(pl[1]):int(pl[3])+1] = tile  #Top line
-                object_cave_map[int(pl[2]):int(pl[4])+1,int(pl[1]):int(pl[1])+1] = tile  #Left line
-                object_cave_map[int(pl[2]):int(pl[4])+1,int(pl[3]):int(pl[3])+1] = tile  #Right line
-                object_cave_map[int(pl[4]):int(pl[4])+1,int(pl[1]):int(pl[3])+1] = tile  #Bottom line
-            elif pl[0] == "Raster":
-                tile = get_object_map_symbol(pl[7])
-                plot_row = int(pl[2])
-                for r in range(int(pl[4])):
-                    plot_col = int(pl[1])
-                    for c in range(int(pl[3])):
-                        object_cave_map[plot_row:plot_row+1,plot_col:plot_col+1] = tile  #Draw single point
-                        plot_col += int(pl[5])
-                    plot_row += int(pl[6])
-            elif pl[0] == "Add":
-                #Only seen in BoulderDash02.bd twice with values:
-                #  Add=0 1 FIREFLYl BOULDER   #means add BOULDER on row below FIREFLYl
-                #  Add=0 1 DIAMOND MAGICWALL  #means add MAGICWALL on row below DIAMOND
-                #These become cave parameters (max 4 values), with e.g. BOULDER element value (5) occupying parameter 3
-                #because FIREFLYl is the 3rd randomly generated tile. All other parameters are 0
-                find_tile = get_object_map_value(pl[3])  #e.g. FIREFLYl as above
-                apply_tile = get_object_map_value(pl[4])  #e.g. BOULDER as above
-                RandomFillBelow = [0,0,0,0]
-                i = last_tile_for_probability.index(find_tile)
-                RandomFillBelow[i] = apply_tile
-                add_cave_parameter(output_cave_json, output_cave_params, "RandomFillBelow", RandomFillBelow)
-
-                RandomFillBelowJSON = ["","","",""]
-                RandomFillBelowJSON[i] = pl[4]
-                output_cave_json["RandomFillBelow"] = RandomFillBelowJSON
+                        tile = ord(get_object_map_symbol(config, v[4], unsupported_elements))
+                        object_cave_map[int(v[1]):int(v[3])+1,int(v[0]):int(v[2])+1] = tile  #Draw filled rectangle
+                elif cave_object.name == "Rectangle":
+                    tile = ord(get_object_map_symbol(config, v[4], unsupported_elements))
+                    object_cave_map[int(v[1]):int(v[1])+1,int(v[0]):int(v[2])+1] = tile  #Top line
+                    object_cave_map[int(v[1]):int(v[3])+1,int(v[0]):int(v[0])+1] = tile  #Left line
+                    object_cave_map[int(v[1]):int(v[3])+1,int(v[2]):int(v[2])+1] = tile  #Right line
+                    object_cave_map[int(v[3]):int(v[3])+1,int(v[0]):int(v[2])+1] = tile  #Bottom line
+                elif cave_object.name == "Raster":
+                    tile = ord(get_object_map_symbol(config, v[6], unsupported_elements))
+                    raster_rows = int(v[1]) + np.arange(int(v[3])) * int(v[5])
+                    raster_cols = int(v[0]) + np.arange(int(v[2])) * int(v[4])
+                    raster_rows = raster_rows[(raster_rows >= 0) & (raster_rows < object_cave_map.shape[0])]  #Points outside the cave are not drawn
+                    raster_cols = raster_cols[(raster_cols >= 0) & (raster_cols < object_cave_map.shape[1])]
+                    object_cave_map[np.ix_(raster_rows, raster_cols)] = tile  #Draw all points
+                elif cave_object.name == "Add":
+                    #Only seen in BoulderDash02.bd twice with values:
+                    #  Add=0 1 FIREFLYl BOULDER   #means add BOULDER on row below FIREFLYl
+                    #  Add=0 1 DIAMOND MAGICWALL  #means add MAGICWALL on row below DIAMOND
+                    #These become cave parameters (max 4 values), with e.g. BOULDER element value (5) occupying parameter 3
+                    #because FIREFLYl is the 3rd randomly generated tile. All other parameters are 0
+                    find_tile = get_object_map_value(config, v[2])  #e.g. FIREFLYl as above
+                    apply_tile = get_object_map_value(config, v[3])  #e.g. BOULDER as above
+                    RandomFillBelow = [0,0,0,0]
+                    i = last_tile_for_probability.index(find_tile)
+                    RandomFillBelow[i] = apply_tile
+                    add_cave_parameter(config, output_cave_json, output_cave_params, "RandomFillBelow", RandomFillBelow)
+
+                    RandomFillBelowJSON = ["","","",""]
+                    RandomFillBelowJSON[i] = v[3]
+                    output_cave_json["RandomFillBelow"] = RandomFillBelowJSON
+
+            #If a null tile is used in a cave without pseudo-random cave parameters, replace null with dirt tile
+            if last_tile_for_probability == []:
+                object_cave_map[object_cave_map == ord("-")] = ord(".")
+
+            #Create the output cave map and add the lines to the JSON map
+            output_cave_map = add_cave_map(config, cave_count, object_cave_map, output_cave_json, output_cave_params, unsupported_elements)
+            output_cave_json["Map"] = [line.tobytes().decode("latin-1") for line in object_cave_map]
+
+        #Map section
+        if cave.map is not None:
+            cave_map = fit_cave_map(cave_count, cave_letters[cave_count-1], cave.map, intermission_cave, border_tile)
+            output_cave_map = add_cave_map(config, cave_count, cave_map, output_cave_json, output_cave_params, unsupported_elements)
+            output_cave_json["Map"] = cave.map
+
+        #End of a cave, check if any unsupported elements found and report them
+        if len(unsupported_elements) > 0:
+            print(f"*** Unsupported elements found for cave {cave_count} ({cave_letters[cave_count-1]})")
+            for e in unsupported_elements:
+                print(f"    {describe_substitution(config, e)}")
+                substitutions.setdefault(e, []).append(cave_letters[cave_count-1])
+
+        #Cave map
+        if intermission_cave:
+            #Intermissions are 20 tiles wide, lines are padded with steelwall to 40 tiles and the cave with 9 lines of steelwall
+            cave_map_bytes = np.full((20, 20), 0x33, dtype = np.uint8)
+            cave_map_bytes[0:11,0:10] = output_cave_map[1:12]
+        else:  #standard cave
+            cave_map_bytes = output_cave_map[1:21]  #Top and bottom lines are not needed
+
+        #Place the cave parameters and map in the cave's position in its group, written through a memoryview
+        #so the group can't grow or shrink and move the caves after it
+        cave_bytes = bytes(output_cave_params) + cave_map_bytes.tobytes()
+        if len(cave_bytes) != CAVE_SIZE:
+            raise ValueError(f"cave {cave_count} ({cave_letters[cave_count-1]}) is {len(cave_bytes)} bytes, not {CAVE_SIZE}")
+        for group, cave_group in enumerate(CAVE_GROUPS):
+            if cave_letters[cave_count-1] in cave_group:
+                offset = cave_group.index(cave_letters[cave_count-1]) * CAVE_SIZE
+                memoryview(cave_groups[group])[offset:offset+CAVE_SIZE] = cave_bytes
+
+        #Add cave definition json to master list
+        output_all_caves_json.append(output_cave_json)
+
+    #Write the cave group files, optionally with an index header of "BDCG", the number of caves and the cave letters
+    #followed by the caves
+    BD_filename = path.basename(output_subfolder)
+    for group, cave_group in enumerate(CAVE_GROUPS):
+        with open(path.join(output_subfolder, f"{BD_filename}-{group+1}"), "wb") as output_file:
+            if WRITE_GROUP_INDEX_HEADER:
+                output_file.write(b"BDCG" + bytes([len(cave_group)]) + cave_group.encode("ascii") + cave_groups[group])
+            else:
+                output_file.write(cave_groups[group])
 
     #Write all caves to json file
     output_file_name = path.join(output_subfolder, "cavedef.json")
     with open(output_file_name, "w") as outfile: 
         json.dump(output_all_caves_json, outfile, indent=4, sort_keys=True)
 
+    return substitutions
+
 #endregion
 
 ################################################################################
-# Main Routine
-if __name__ == '__main__':
+#region Batch conversion
 
-    ### Config and file paths
-    base_path = path.dirname(path.abspath(__file__))
-    base_path = path.join(base_path, "..")
-    config_file = open(path.join(base_path, "config", "config.json"))
-    config_settings = json.load(config_file)
-    element_map = config_settings["element_map"]
-    parameter_list = config_settings["parameters"]
-    colour_schemes = config_settings["colour_schemes"]
-    colour_map = config_settings["colour_map"]
-    ssd_file_settings = config_settings["ssd_file_settings"]
-    config_file.close()
+def convert_bd_file(config, base_path, BD_files_folder, filename):
 
-    #Create unsupported element list from element_map (where substitute values are being used)
-    element_no_map = [e for e in element_map if "substitute" in element_map[e]]
-        
-    #Create object_element_map from element_map by making the element name the key, using substitute values if available
-    object_element_map = {}
-    for e in element_map:
-        new_key = element_map[e]["element"]
-        object_element_map[new_key] = {}
-        if "substitute" in element_map[e]:
-            sub = element_map[e]["substitute"]
-            object_element_map[new_key]["symbol"] = sub
-            object_element_map[new_key]["value"] = element_map[sub]["value"]
-        else:
-            object_element_map[new_key]["symbol"] = e
-            object_element_map[new_key]["value"] = element_map[e]["value"]
-
-    #Create addresses where parameters will be stored in the output cave file
-    addresses = {}
-    for a in parameter_list:
-        addresses[a] = parameter_list[a]["address"]
-
-    BD_files_folder = path.join(base_path, "bdcff_conversions")
-
-    ### Process each BD file in the conversion folder
-    for filename in os.listdir(BD_files_folder):
-
-        if path.isfile(path.join(BD_files_folder, filename)) and filename[-2:].upper() == "BD":
-
-            BD_filename = filename.split('.')[0]  #e.g. ArnoDash01 without the ".bd" extension
+    #Convert a BD file in a worker process, the printed output and any error are returned rather than stopping the batch
+    BD_filename = filename.split('.')[0]  #e.g. ArnoDash01 without the ".bd" extension
+    output_log = io.StringIO()
+    substitutions = {}
+    error = None
+    with redirect_stdout(output_log):
+        try:
             output_subfolder = path.join(base_path, "build", BD_filename)
             if not os.path.exists(output_subfolder):
                 print(f"Creating output subfolder {output_subfolder}")
                 os.mkdir(output_subfolder)
 
-            #Read the BD file contents
+            #Use the BD file contents to generate caves, the file is read a cave at a time
             input_file_name = path.join(base_path, BD_files_folder, filename)
-            input_file = open(input_file_name, "r")
-            all_input_lines = input_file.readlines()
-            input_file.close()
-
-            #Use the BD file contents to generate caves
             print(f"Generating caves for {BD_filename}")
-            generate_caves(all_input_lines, output_subfolder)
+            with open(input_file_name, "r") as input_file:
+                substitutions = generate_caves(input_file, output_subfolder, config)
 
             #Move BD file and cave definition json file to completed folder
             print(f"Completing definitions for {BD_filename}")
@@ -524,3 +575,46 @@ if __name__ == '__main__':
             os.replace(path.join(output_subfolder, "cavedef.json"), path.join(BD_files_complete_folder, "json", BD_filename + ".json"))
             
             print(f"Completed {BD_filename}")
+
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+    return BD_filename, output_log.getvalue(), substitutions, error
+
+#endregion
+
+################################################################################
+# Main Routine
+if __name__ == '__main__':
+
+    ### Config and file paths
+    base_path = path.dirname(path.abspath(__file__))
+    base_path = path.join(base_path, "..")
+    BD_files_folder = path.join(base_path, "bdcff_conversions")
+
+    ### Process the BD files in the conversion folder in parallel, one worker process per CPU core
+    config = load_config(base_path)
+    filenames = [f for f in sorted(os.listdir(BD_files_folder)) if path.isfile(path.join(BD_files_folder, f)) and f[-2:].upper() == "BD"]
+    failed_files = []
+    all_substitutions = {}  #BD files and caves where each unsupported element is substituted
+    with ProcessPoolExecutor() as executor:
+        futures = [executor.submit(convert_bd_file, config, base_path, BD_files_folder, filename) for filename in filenames]
+
+        #Results are reported in file order, each with the output printed while converting that file
+        for future in futures:
+            BD_filename, output_log, substitutions, error = future.result()
+            print(output_log, end="")
+            if error != None:
+                print(f"*** Failed {BD_filename}: {error}")
+                failed_files.append(BD_filename)
+            for e in substitutions:
+                all_substitutions.setdefault(e, []).append(f"{BD_filename} ({''.join(substitutions[e])})")
+
+    ### Report the unsupported elements substituted across all files, and any files which failed
+    print(f"Converted {len(filenames) - len(failed_files)} of {len(filenames)} BD files")
+    if len(all_substitutions) > 0:
+        print(f"Unsupported elements substituted:")
+        for e in all_substitutions:
+            print(f"    {describe_substitution(config, e)} in {', '.join(all_substitutions[e])}")
+    if len(failed_files) > 0:
+        print(f"Failed: {', '.join(failed_files)}")
@@ -8,6 +8,8 @@ import json
 
 CAVE_FILE_FOLDER = "ArnoDash01"  #Specify folder in output to reverse engineer and create BD definition file
 UNUSED_PARAMS_FROM_POS = 43
+CAVE_GROUPS = ["ABCDEFGHQR", "IJKLMNOPST"]  #Caves in each group file written by BDcavegen.py
+CAVE_SIZE = 448  #Cave parameters (48 bytes) and map (400 bytes)
 
 ################################################################################
 def generate_BD_for_cave(cave_number, cave_bytes):
@@ -51,6 +53,20 @@ def generate_BD_for_cave(cave_number, cave_bytes):
     output_file.write(element_list[border_tile]*40)
     output_file.write("\n[/map]\n[/cave]\n\n")
 
+################################################################################
+def read_cave_group(group_filepath, group_letters):
+
+    #Caves in a group file by cave letter, after the "BDCG" index header if it has one (which names the caves)
+    input_group_file = open(group_filepath, "rb")
+    group_bytes = input_group_file.read()
+    input_group_file.close()
+
+    if group_bytes[0:4] == b"BDCG":
+        group_letters = group_bytes[5:5+group_bytes[4]].decode("ascii")
+        group_bytes = group_bytes[5+group_bytes[4]:]
+
+    return {c: group_bytes[i*CAVE_SIZE:(i+1)*CAVE_SIZE] for i, c in enumerate(group_letters) if len(group_bytes) >= (i+1)*CAVE_SIZE}
+
 ################################################################################
 def find_param(pos):
 
@@ -90,19 +106,31 @@ if __name__ == '__main__':
     output_file_name = path.join(BD_caves_folder, BD_caves_folder + ".bd")
     output_file = open(output_file_name, "w")
 
-    ### Process each cave file (e.g. A, B, C) in the folder
+    ### Caves from the group files (e.g. ArnoDash01-1 and ArnoDash01-2) written by BDcavegen.py if the folder has them
+    group_caves = {}
+    for i, group_letters in enumerate(CAVE_GROUPS):
+        group_filepath = path.join(BD_caves_folder, f"{CAVE_FILE_FOLDER}-{i+1}")
+        if path.isfile(group_filepath):
+            group_caves.update(read_cave_group(group_filepath, group_letters))
+
+    ### Process each cave (e.g. A, B, C) from the group files, or the cave file of that letter in the folder
     n = 1
     for cavefile in cave_letters:
 
-        if path.isfile(path.join(BD_caves_folder, cavefile)) and cavefile in cave_letters:
-
+        if cavefile in group_caves:
+            cave_bytes = group_caves[cavefile]
+        elif path.isfile(path.join(BD_caves_folder, cavefile)):
             input_cave_file = open(path.join(BD_caves_folder, cavefile), "rb")  #Open the cave file as binary
             cave_bytes = input_cave_file.read()
             input_cave_file.close()
+        else:
+            continue
 
-            #Use the BD file contents to generate caves
-            print(f"Generating definition file from cave in {CAVE_FILE_FOLDER}: {cavefile}")
-            generate_BD_for_cave(n, cave_bytes)
-            n += 1
+        #Use the BD file contents to generate caves
+        print(f"Generating definition file from cave in {CAVE_FILE_FOLDER}: {cavefile}")
+        generate_BD_for_cave(n, cave_bytes)
+        n += 1
 
     output_file.close()
+    if n == 1:
+        print(f"*** No cave files or group files found in {BD_caves_folder}")
@@ -0,0 +1,968 @@
+################################################################################
+# BDsim.py - Headless simulation of Boulder Dash caves
+#
+#   Usage: python BDsim.py [cave files or folders] [-levels 1,2,3,4,5] [-ticks 1000] [-keys RRDD..] [-fuzz 100]
+#   e.g. python BDsim.py ../caves_bin/BoulderDash01 -levels 1 -ticks 2000
+#   With no caves given, all caves in caves_bin are simulated. All 5 levels are used by default.
+#   Cave files are single caves (e.g. A) or the group files written by BDcavegen.py (e.g. BoulderDash01-1), a folder's
+#   group files are used if it has them, otherwise its single cave files.
+#   -fuzz plays each cave and level with the given number of random key lists and counts how the lives ended.
+#
+#   A Python port of the cave update engine in main.asm, used to test caves without an emulator,
+#   e.g. to check a converted cave is solvable with a sequence of key presses.
+#   A cave file (the 48 byte parameters and 400 byte map) is loaded and set up as play_one_life does,
+#   then each tick runs update_gameplay: the map is scanned (update_map / scan_map) with the same cell
+#   handlers, processed (top) bit marking and pseudo-random slime delay as the game.
+#   The screen, sounds, pause and demo mode are not simulated.
+#
+#   Notes:
+#   The map is 22 rows of 40 cells held in a bytearray (row stride 40 rather than the game's 64),
+#   with 2 spare rows below like tile_map_row_22 and 23. Cell values are the same as the game's.
+#   The game reveals the cave with a random dissolve effect, here all cells inside the border are
+#   revealed (top bit cleared) before the first tick. The side and bottom border cells stay hidden as they
+#   are in the game until the dissolve happens to reveal them, they are never updated by the scan.
+#   Only cells with values 4 to $7f do anything during a scan. A regular expression matches those, skipping cells
+#   their handler would leave unchanged, e.g. rocks and diamonds which are resting and can't roll off what's below
+#   them, slime with nothing to pass through. Rather than searching the map with it, before each scan the cells it
+#   matches are found all at once (the map is translated to flags held in one large integer, shifted onto each other),
+#   then the scan visits only those and the cells the handlers change ahead of it.
+#   The map for each cave and level is set up once, the lives played on it start from a copy.
+#   Simulates about 25,000 ticks per second per CPU core on the bundled caves (-fuzz), caves are simulated in parallel.
+#   Most of the time is spent in the firefly and amoeba handlers, which run for every firefly and amoeba cell each
+#   tick, caves full of butterflies or amoeba run at under 10,000 ticks per second.
+#
+
+### Imports
+import sys
+import os
+import re
+import time
+import random
+from os import path
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+### Constants
+TILES_ROWS = 22
+TILES_COLUMNS = 40
+LEVELS = 5
+CAVE_SIZE = 448  #Cave parameters (48 bytes) and map (400 bytes)
+CAVE_GROUPS = ["ABCDEFGHQR", "IJKLMNOPST"]  #Caves in each group file written by BDcavegen.py
+
+#Cell types, the lower nybble of a cell value
+MAP_SPACE = 0
+MAP_EARTH = 1
+MAP_WALL = 2
+MAP_TITANIUM_WALL = 3
+MAP_DIAMOND = 4
+MAP_ROCK = 5
+MAP_FIREFLY = 6
+MAP_AMOEBA = 7
+MAP_ROCKFORD_APPEARING_OR_END_POSITION = 8
+MAP_SLIME = 9
+MAP_EXPLOSION = 10
+MAP_BOMB = 11
+MAP_GROWING_WALL = 12
+MAP_MAGIC_WALL = 13
+MAP_BUTTERFLY = 14
+MAP_ROCKFORD = 15
+
+#Cell value bits and special values
+MAP_UNPROCESSED = 0x80  #Top bit, named as in main.asm but set when a cell has been processed in the current scan
+MAP_DEADLY = 0xc0
+MAP_ACTIVE_EXIT = 0x18
+MAP_START_LARGE_EXPLOSION = 0x46
+MAP_LARGE_EXPLOSION_STATE3 = 0x33
+
+#Symbols used to show cell types in text maps, mostly as in BDCFF
+MAP_SYMBOLS = " .wWdrqaXs*!xMcP"
+
+#Keys in keys_to_process
+KEY_RIGHT = 0x80
+KEY_LEFT = 0x40
+KEY_UP = 0x20
+KEY_DOWN = 0x10
+KEY_RETURN = 0x08
+KEY_ESCAPE = 0x01
+KEY_CODES = {"R": KEY_RIGHT, "L": KEY_LEFT, "U": KEY_UP, "D": KEY_DOWN, "r": KEY_RETURN | KEY_RIGHT, "l": KEY_RETURN | KEY_LEFT, "u": KEY_RETURN | KEY_UP, "d": KEY_RETURN | KEY_DOWN, ".": 0}
+
+#Cave parameter addresses, see cavedata.asm
+PARAM_DIAMOND_VALUE = 0
+PARAM_DIAMOND_EXTRA_VALUE = 1
+PARAM_DIAMONDS_REQUIRED = 2
+PARAM_CAVE_TIME = 7
+PARAM_AMOEBA_MAGIC_WALL_TIME = 12
+PARAM_INITIAL_FILL_TILE = 13
+PARAM_RANDOM_SEEDS = 14
+PARAM_TILE_PROBABILITY = 19
+PARAM_TILE_FOR_PROBABILITY = 23
+PARAM_ROCKFORD_START = 31
+PARAM_ROCKFORD_END = 33
+PARAM_SLIME_PERMEABILITY = 35
+PARAM_TILE_FOR_PROB_BELOW = 36
+PARAM_BOMBS = 40
+PARAM_ZERO_GRAVITY_TIME = 41
+PARAM_BORDER_TILE = 42
+
+#Map offsets of the cells around the current cell
+ABOVE = -TILES_COLUMNS
+BELOW = TILES_COLUMNS
+LEFT = -1
+RIGHT = 1
+PUSH_UP = "up"  #Special value in check_for_rock_direction_offsets used to detect rock has been pushed up
+
+################################################################################
+#region Tables from vars1.asm and vars2.asm, indexed by cell type unless noted
+
+COLLISION_FOR_CELL_TYPE = [0xff, 0xff, 0, 0, 0xff, 1, 0, 0, 0, 0, 0xff, 0, 0, 0, 0, 1]
+CELL_TYPES_THAT_ROCKS_OR_DIAMONDS_WILL_FALL_OFF = [0, 0, 1, 0, 1, 1, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0]
+UPDATE_CELL_TYPE_WHEN_BELOW_A_FALLING_ROCK_OR_DIAMOND = [0, 0, 0, 0, 0, 0, 0x46, 0, 0, 0, 0, 0x46, 0, 0x3d, 0x4e, 0x7f]
+EXPLOSION_REPLACEMENTS = [0x8f, 0x8f, 0x84, 0x00, 0xf1, 0xd1, 0xb6, 0xb1, 0x8f, 0x8f, 0xd1, 0xf1, 0xb1, 0x71, 0x00, 0x71]
+ITEMS_ALLOWED_THROUGH_SLIME = [0, 0, 0, 0, 0x84, 0x85, 0, 0, 0, 0, 0, 0x8b, 0, 0, 0, 0]
+CELL_TYPES_THAT_WILL_TURN_INTO_DIAMONDS = [0x84, 0x84, 0x84, 0, 0x84, 0x84, 0x84, 0x84, 0, 0x84, 0, 0, 0x84, 0x84, 0x84, 0xff]
+CELL_TYPES_THAT_WILL_TURN_INTO_LARGE_EXPLOSION = [0xb3, 0xb3, 0xb3, 0, 0xb3, 0xb3, 0xb3, 0xb3, 0, 0xb3, 0, 0xb3, 0xb3, 0xb3, 0xb3, 0xff]
+ITEMS_PRODUCED_BY_THE_MAGIC_WALL = [0, 0, 0, 0, 0x85, 0x84, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+
+#Indexed by firefly / butterfly direction, even offsets progress clockwise, odd offsets anti-clockwise
+FIREFLY_NEIGHBOUR_OFFSETS = [LEFT, RIGHT, ABOVE, ABOVE, RIGHT, LEFT, BELOW, BELOW]
+FIREFLY_AND_BUTTERFLY_NEXT_DIRECTION_TABLE = [2, 3, 4, 5, 6, 7, 0, 1]
+FIREFLY_AND_BUTTERFLY_CELL_VALUES = [0xb6, 0xbe, 0x86, 0x8e, 0x96, 0x9e, 0xa6, 0xae]
+
+#Indexed by rockford direction (right, left, up, down)
+NEIGHBOURING_CELL_OFFSET_FROM_DIRECTION_INDEX = [RIGHT, LEFT, ABOVE, BELOW]
+CHECK_FOR_ROCK_DIRECTION_OFFSETS = [2 * RIGHT, 2 * LEFT, 0, 2 * BELOW]
+ROCKFORD_CELL_VALUE_FOR_DIRECTION = [0xaf, 0x9f, 0, 0]
+
+#Amoeba growth direction from the amoeba state (above, left, right, below)
+AMOEBA_GROWTH_OFFSETS = [ABOVE, LEFT, RIGHT, BELOW]
+
+#endregion
+
+################################################################################
+#region Cell search patterns
+
+def byte_class(values):
+    return b"[" + re.escape(bytes(values)) + b"]"
+
+@lru_cache(maxsize=None)
+def cell_search_pattern(gravity_on, inactive_magic_wall, resting_rock):
+
+    #Regular expression matching the cells to update in a scan, those left unchanged by their handler are skipped.
+    #Cells with values 4 to $7f are updated by the scan, lower values are inactive and higher ones already processed.
+    #The other conditions are checked with lookbehind / lookahead after matching the cell, the map is 40 cells wide so
+    #39 cells after a cell is the one below left, 41 cells before it is the one above left.
+    #  Slime is only active with a rock / diamond / bomb above and a space below
+    #  Growing wall is only active with a space to the left or right
+    #  Magic wall cells with the same value as the magic wall state are inactive, unless the wall is active ($1d)
+    #  With gravity on, a resting rock or diamond (value 4 or 5) stays as it is unless the cell below is a space,
+    #  or it can roll off the cell below (not falling) into a space to the left or right and the space below that
+    #  With gravity off, diamonds and rocks already shown as the bubble (resting_rock) stay as they are
+    always_active = set(range(0x04, 0x80)) - {0x09, 0x0c, inactive_magic_wall}
+    if gravity_on:
+        always_active -= {0x04, 0x05}
+    else:
+        always_active -= {v for v in range(0x80) if v & 0x0f == MAP_DIAMOND} | {resting_rock}
+    falls_through_slime = byte_class([v for v in range(256) if ITEMS_ALLOWED_THROUGH_SLIME[v & 0x0f]])
+    spaces = byte_class([v for v in range(256) if v & 0x0f == MAP_SPACE])
+    pattern = rb"[\x04-\x7f](?:(?<=" + byte_class(sorted(always_active)) + rb")"
+    pattern += rb"|(?<=\x09)(?<=" + falls_through_slime + rb".{40})(?=.{39}\x00)"
+    pattern += rb"|(?<=\x0c)(?:(?<=" + spaces + rb".)|(?=" + spaces + rb"))"
+    if gravity_on:
+        rolls_off = byte_class([v for v in range(256) if v & 0x40 == 0 and CELL_TYPES_THAT_ROCKS_OR_DIAMONDS_WILL_FALL_OFF[v & 0x0f]])
+        pattern += rb"|(?<=[\x04\x05])(?:(?=.{39}\x00)|(?<=\x00.)(?=.{38}\x00" + rolls_off + rb")|(?=\x00.{38}" + rolls_off + rb"\x00))"
+    pattern += rb")"
+
+    return re.compile(pattern, re.DOTALL)
+
+@lru_cache(maxsize=None)
+def cell_check_tables(gravity_on, inactive_magic_wall, resting_rock):
+
+    #Tables by cell value for finding the cells the search pattern matches without searching the whole map.
+    #The kind of check when the scan reaches a cell: 0 never updated, 1 always updated, 2 updated if the pattern matches.
+    #The flags for the conditions the pattern checks, each a bit: 0 always updated, 1 slime, 2 growing wall,
+    #3 rock or diamond resting with gravity on, 4 falls through slime, 5 space ($00), 6 space type, 7 rolls off
+    always_active = set(range(0x04, 0x80)) - {0x09, 0x0c, inactive_magic_wall}
+    if gravity_on:
+        always_active -= {0x04, 0x05}
+    else:
+        always_active -= {v for v in range(0x80) if v & 0x0f == MAP_DIAMOND} | {resting_rock}
+    conditional = {0x09, 0x0c, 0x04, 0x05} if gravity_on else {0x09, 0x0c}
+    kinds = bytes([1 if v in always_active else 2 if v in conditional else 0 for v in range(256)])
+    flags = bytes([(v in always_active) | (v == 0x09) << 1 | (v == 0x0c) << 2 | (gravity_on and v in (0x04, 0x05)) << 3
+        | (ITEMS_ALLOWED_THROUGH_SLIME[v & 0x0f] != 0) << 4 | (v == 0) << 5 | (v & 0x0f == MAP_SPACE) << 6
+        | (v & 0x40 == 0 and CELL_TYPES_THAT_ROCKS_OR_DIAMONDS_WILL_FALL_OFF[v & 0x0f] == 1) << 7 for v in range(256)])
+    return kinds, flags
+
+CLEAR_TOP_BIT = bytes([v & 0x7f for v in range(256)])
+
+#Map positions inside the border which are updated by the scan (rows 1-20, columns 1-38), the scan ends after row 20
+SCANNED_CELLS = bytes([1 if 0 < row < TILES_ROWS-1 and 0 < column < TILES_COLUMNS-1 else 0 for row in range(TILES_ROWS + 2) for column in range(TILES_COLUMNS)])
+END_OF_SCAN = TILES_COLUMNS * (TILES_ROWS-1) - 1
+
+#The map down to the bottom border as an integer with a byte for each cell, with one bit set in every byte (by bit number)
+#to pick out a flag from cell_check_tables for all the cells
+FLAGGED_CELLS = TILES_COLUMNS * TILES_ROWS
+CELL_FLAG_BITS = [int.from_bytes(bytes([1 << bit]) * FLAGGED_CELLS, "little") for bit in range(8)]
+
+#endregion
+
+################################################################################
+#region Helper functions
+
+def pseudo_random(random_seed1, random_seed2):
+
+    #The pseudo_random routine in main.asm, used to fill caves and for the slime delay
+    temp_rand1 = (random_seed1 & 0x01) << 7
+    temp_rand2 = random_seed2 >> 1
+    result = random_seed2 + ((random_seed2 & 0x01) << 7)
+    result = (result & 0xff) + (result >> 8) + 0x13
+    random_seed2 = result & 0xff
+    result = random_seed1 + (result >> 8) + temp_rand1
+    random_seed1 = ((result & 0xff) + (result >> 8) + temp_rand2) & 0xff
+
+    return random_seed1, random_seed2
+
+def load_cave_file(cave_filepath):
+
+    #Caves in a cave file or a group file as (name, data), a group file holds the caves of its group (by the -1 or -2
+    #at the end of its name) unless it starts with a "BDCG" index header naming them
+    with open(cave_filepath, "rb") as f:
+        cave_data = f.read()
+    folder_name = path.basename(path.dirname(path.abspath(cave_filepath)))
+    filename = path.basename(cave_filepath)
+    if len(cave_data) == CAVE_SIZE:
+        return [(f"{folder_name} {filename}", cave_data)]
+
+    if cave_data[0:4] == b"BDCG":
+        cave_letters = cave_data[5:5+cave_data[4]].decode("ascii")
+        cave_data = cave_data[5+cave_data[4]:]
+    elif filename[-2:] in ["-1", "-2"]:
+        cave_letters = CAVE_GROUPS[int(filename[-1]) - 1]
+    else:
+        cave_letters = ""
+    if len(cave_letters) == 0 or len(cave_data) != CAVE_SIZE * len(cave_letters):
+        raise ValueError(f"{cave_filepath} is not a cave or group file, size is {len(cave_data)} bytes not {CAVE_SIZE}")
+    return [(f"{folder_name} {c}", cave_data[i*CAVE_SIZE:(i+1)*CAVE_SIZE]) for i, c in enumerate(cave_letters)]
+
+def keys_from_text(text):
+
+    #Key presses for each tick from a string, e.g. "RRRDD..L" for right x3, down x2, 2 ticks of no keys, left
+    #Lower case directions also press return, to pick up or dig without moving
+    return [KEY_CODES[c] for c in text]
+
+#endregion
+
+################################################################################
+class Cave:
+    initial_maps = {}  #The map set up for each cave data and level, copied for each life played on it
+
+    def __init__(self, cave_data, level=1):
+
+        #Set up the cave as play_one_life does, level is the difficulty level 1-5
+        params = cave_data[0:48]
+        self.params = params
+        self.level = level
+        self.grid = bytearray(TILES_COLUMNS * (TILES_ROWS + 2))
+        self.cells_to_check = bytearray(len(self.grid))
+        self.cell_kinds = bytearray(256)
+        self.cell_search_args = None
+
+        #Variables from initial_values_of_variables_from_0x50
+        self.magic_wall_state = 0x0d
+        self.rockford_cell_value = 0x9f
+        self.delay_trying_to_push_rock = 4
+        self.amoeba_replacement = 0
+        self.number_of_amoeba_cells_found = 0
+        self.amoeba_counter = 1
+        self.ticks_since_last_direction_key_pressed = 240
+        self.current_rockford_sprite = 0
+        self.sub_second_ticks = 12
+        self.rockford_explosion_cell_type = 0
+
+        #Other variables used during play, the tick counter is left at $ff by the screen dissolve effect
+        self.tick_counter = 0xff
+        self.bomb_delay = 0
+        self.current_amoeba_cell_type = 0
+        self.neighbour_cell_contents = 0
+        self.keys_to_process = 0
+        self.random_seed1 = 0
+        self.random_seed2 = 0
+        self.diamonds_collected = 0
+        self.score = 0
+        self.ticks = 0
+        self.status = None  #Set when the life is over to "exit", "out of time" or "dead"
+
+        #The pseudo-random tiles take a while to place, so the map is set up once for each cave and level
+        grid = self.grid
+        map_key = (bytes(cave_data[0:CAVE_SIZE]), level)
+        if map_key in Cave.initial_maps:
+            grid[:] = Cave.initial_maps[map_key]
+        else:
+            self.populate_cave_from_file(cave_data[48:CAVE_SIZE])
+            self.populate_cave_tiles_pseudo_random()
+
+            #Hide all cells and draw the top and bottom borders using the border tile
+            grid[0:TILES_COLUMNS * TILES_ROWS] = bytes([v | MAP_UNPROCESSED for v in grid[0:TILES_COLUMNS * TILES_ROWS]])
+            grid[0:TILES_COLUMNS] = bytes([params[PARAM_BORDER_TILE] | MAP_UNPROCESSED]) * TILES_COLUMNS
+            grid[TILES_COLUMNS * (TILES_ROWS-1):TILES_COLUMNS * TILES_ROWS] = bytes([params[PARAM_BORDER_TILE] | MAP_UNPROCESSED]) * TILES_COLUMNS
+
+            #Reveal the cells inside the border (see notes)
+            for row in range(1, TILES_ROWS-1):
+                self.reveal_row(row)
+            Cave.initial_maps[map_key] = bytes(grid)
+
+        self.initialise_stage()
+
+        #Cell handlers by cell type, rock, diamond and bomb are updated by update_rock_or_diamond_that_can_fall
+        self.handlers = [self.handler_basics] * 4 + [self.update_rock_or_diamond_that_can_fall] * 2 + [self.handler_firefly_or_butterfly,
+            self.handler_amoeba, self.handler_rockford_intro_or_exit, self.handler_slime, self.handler_rockford_intro_or_exit,
+            self.update_rock_or_diamond_that_can_fall, self.handler_growing_wall, self.handler_magic_wall, self.handler_firefly_or_butterfly,
+            self.handler_rockford]
+
+    ################################################################################
+    #region Cave set up
+
+    def populate_cave_from_file(self, cave_map_data):
+
+        #Split map bytes into 2 nibbles, each one a tile value, for the 20 rows between the top and bottom borders
+        grid = self.grid
+        for i, b in enumerate(cave_map_data):
+            pos = TILES_COLUMNS + i * 2
+            grid[pos] = b >> 4
+            grid[pos+1] = b & 0x0f
+
+    def populate_cave_tiles_pseudo_random(self):
+
+        #Null tiles ($0f) are replaced with the cave default tile or a pseudo-random one using the seed for the level
+        #A second tile below the pseudo-random one may also be needed, which overrides the tile on the next row (BD2 caves G, K)
+        params = self.params
+        grid = self.grid
+        random_seed1 = 0
+        random_seed2 = params[PARAM_RANDOM_SEEDS + self.level - 1]
+        tile_below_store_row = [0] * TILES_COLUMNS
+        for row in range(1, TILES_ROWS-1):
+            for column in range(TILES_COLUMNS):
+                pos = row * TILES_COLUMNS + column
+                tile_override = tile_below_store_row[column]
+                tile = params[PARAM_INITIAL_FILL_TILE]
+                random_seed1, random_seed2 = pseudo_random(random_seed1, random_seed2)
+                for i in range(4):
+                    if random_seed1 < params[PARAM_TILE_PROBABILITY + i]:
+                        tile = params[PARAM_TILE_FOR_PROBABILITY + i]
+                        tile_below_store_row[column] = params[PARAM_TILE_FOR_PROB_BELOW + i]
+                if grid[pos] == 0x0f:
+                    grid[pos] = tile
+                else:
+                    tile_below_store_row[column] = 0
+                if tile_override != 0:
+                    grid[pos] = tile_override
+                    tile_below_store_row[column] = 0
+
+    def initialise_stage(self):
+        params = self.params
+        grid = self.grid
+        level_index = self.level - 1
+
+        self.amoeba_growth_interval = params[PARAM_AMOEBA_MAGIC_WALL_TIME]
+        self.magic_wall_timer = params[PARAM_AMOEBA_MAGIC_WALL_TIME]
+        self.bomb_counter = params[PARAM_BOMBS]
+        self.gravity_timer = params[PARAM_ZERO_GRAVITY_TIME]
+        self.check_for_rock_direction_offsets = CHECK_FOR_ROCK_DIRECTION_OFFSETS.copy()
+        if self.gravity_timer != 0:
+            self.check_for_rock_direction_offsets[2] = PUSH_UP
+        self.random_seed2 = 0
+
+        #Put the end tile (titanium wall until the exit opens) and the start tile on the map
+        self.end_position = params[PARAM_ROCKFORD_END] * TILES_COLUMNS + params[PARAM_ROCKFORD_END+1]
+        grid[self.end_position] = MAP_TITANIUM_WALL
+        self.rockford_position = params[PARAM_ROCKFORD_START] * TILES_COLUMNS + params[PARAM_ROCKFORD_START+1]
+        grid[self.rockford_position] = MAP_ROCKFORD_APPEARING_OR_END_POSITION
+
+        self.diamonds_required = params[PARAM_DIAMONDS_REQUIRED + level_index]
+        self.time_remaining = params[PARAM_CAVE_TIME + level_index]
+        self.diamond_value = params[PARAM_DIAMOND_VALUE]
+
+    def reveal_row(self, row):
+
+        #Clear the top bit of the cells in a row, apart from the side borders
+        start = row * TILES_COLUMNS + 1
+        end = start + TILES_COLUMNS - 2
+        self.grid[start:end] = self.grid[start:end].translate(CLEAR_TOP_BIT)
+
+    #endregion
+
+    ################################################################################
+    #region Game update
+
+    def tick(self, keys=0):
+
+        #One game tick (update_gameplay), keys are the keys_to_process bits for the tick
+        #Returns the status, None while the life continues
+        if self.status != None:
+            return self.status
+        self.start_tick(keys)
+        self.update_map()
+        return self.end_tick()
+
+    def start_tick(self, keys):
+
+        #Reset variables from gameplay_loop before the map is updated
+        self.ticks += 1
+        self.current_amoeba_cell_type = 0
+        self.neighbour_cell_contents = 0
+        if self.number_of_amoeba_cells_found == 0:
+            self.amoeba_replacement = 0
+        self.number_of_amoeba_cells_found = 0
+        self.keys_to_process = keys
+
+    def end_tick(self):
+
+        #The cell rockford is influencing, check if the end position has been reached
+        self.neighbour_cell_contents &= 0x0f
+        if self.neighbour_cell_contents == MAP_ROCKFORD_APPEARING_OR_END_POSITION:
+            self.score += self.time_remaining
+            self.status = "exit"
+            return self.status
+
+        self.update_amoeba_timing()
+
+        #Update game time once rockford has appeared, each 'second' of game time has 11 game ticks
+        if self.current_rockford_sprite != 0:
+            self.sub_second_ticks -= 1
+            if self.sub_second_ticks < 0:
+                self.sub_second_ticks = 11
+                self.time_remaining = (self.time_remaining - 1) & 0xff
+                if self.time_remaining == 0:
+                    self.status = "out of time"
+                    return self.status
+
+        if self.neighbour_cell_contents == MAP_DIAMOND:
+            self.got_diamond()
+
+        #Update the bomb, gravity and magic wall timers every 8 ticks
+        self.tick_counter = (self.tick_counter - 1) & 0xff
+        if self.tick_counter & 7 == 0:
+            if self.bomb_delay != 0:
+                self.bomb_delay -= 1
+            if self.gravity_timer != 0 and self.gravity_timer != 0xff:
+                self.gravity_timer -= 1
+                if self.gravity_timer == 0:
+                    self.check_for_rock_direction_offsets[2] = 0
+            if self.magic_wall_state == 0x1d:
+                self.magic_wall_timer = (self.magic_wall_timer - 1) & 0xff
+
+        #The life is over at the end of the death explosion sequence, escape starts the explosion
+        if self.rockford_explosion_cell_type != 0:
+            self.rockford_explosion_cell_type += 1
+            if self.rockford_explosion_cell_type >= 0x4b:
+                self.status = "dead"
+                return self.status
+        if self.keys_to_process & KEY_ESCAPE and self.rockford_explosion_cell_type == 0:
+            self.rockford_explosion_cell_type = MAP_START_LARGE_EXPLOSION
+
+        return self.status
+
+    def run(self, keys_list, max_ticks):
+
+        #Play the key presses one per tick then no keys, until the life is over or max_ticks are done
+        for i in range(max_ticks):
+            if self.tick(keys_list[i] if i < len(keys_list) else 0) != None:
+                break
+        return self.status
+
+    def update_map(self):
+
+        #Scan the 20 rows x 38 columns inside the border in order, as update_map / scan_map.
+        #Each cell updated is marked as processed by setting the top bit, anything a handler moves
+        #to the right or below is also marked so it isn't updated again in this scan.
+        #In the game the top bit of the cell above is cleared as the scan passes each cell. Here the top bits are
+        #cleared at the end of the scan, as the cells which look at the row above read it before it would be
+        #cleared anyway or only use the cell type, apart from rockford pushing a rock up which allows for it
+        self.update_cell_search()
+        self.scan_cells(TILES_COLUMNS + 1, END_OF_SCAN)
+
+        #Clear the top bits of the rows scanned, the side borders stay as they are, clear the end position too
+        grid = self.grid
+        left_border = grid[0:END_OF_SCAN:TILES_COLUMNS]
+        right_border = grid[TILES_COLUMNS-1:END_OF_SCAN+1:TILES_COLUMNS]
+        grid[0:END_OF_SCAN] = grid[0:END_OF_SCAN].translate(CLEAR_TOP_BIT)
+        grid[0:END_OF_SCAN:TILES_COLUMNS] = left_border
+        grid[TILES_COLUMNS-1:END_OF_SCAN+1:TILES_COLUMNS] = right_border
+        grid[self.end_position] &= 0x7f
+
+    def scan_cells(self, start, end):
+
+        #Update the cells to be updated from the start position up to the end position (not included) in scan order.
+        #Only the cells to check are visited, each is updated if it still matches the search pattern when it is reached,
+        #the pattern stops looking once the cells after the end position can't be needed to check a cell before it
+        grid = self.grid
+        handlers = self.handlers
+        search_end = end + TILES_COLUMNS + 1
+        cells_to_check = self.cells_to_check
+        cell_kinds = self.cell_kinds
+        find = cells_to_check.find
+        pos = find(1, start, end)
+        while pos >= 0:
+            x = grid[pos]
+            kind = cell_kinds[x]
+            if (kind == 1 or kind == 2 and self.cell_match(grid, pos, search_end)) and SCANNED_CELLS[pos]:
+
+                #Mark the current cell as processed, then update it with the handler for the cell type
+                x |= MAP_UNPROCESSED
+                x = handlers[x & 0x0f](pos, x)
+                grid[pos] = x
+
+                #A space left may let the rock or growing wall to the right be updated, an item the slime below
+                if x & 0x0f == MAP_SPACE:
+                    if cell_kinds[grid[pos+RIGHT]] == 2:
+                        cells_to_check[pos+RIGHT] = 1
+                elif ITEMS_ALLOWED_THROUGH_SLIME[x & 0x0f] != 0 and grid[pos+BELOW] == MAP_SLIME:
+                    cells_to_check[pos+BELOW] = 1
+            pos = find(1, pos+1, end)
+
+    def update_cell_search(self):
+
+        #The cells to update depend on gravity and the magic wall state, magic wall cells with the same value as the
+        #state are unchanged unless the wall is active
+        inactive_magic_wall = None if self.magic_wall_state == 0x1d else self.magic_wall_state
+        if self.gravity_timer == 0:
+            args = (True, inactive_magic_wall, None)
+        else:
+            args = (False, inactive_magic_wall, 0x15 if self.gravity_timer >= 4 else 0x25)
+        if args != self.cell_search_args:
+            self.cell_search_args = args
+            self.cell_match = cell_search_pattern(*args).match
+            kinds, self.cell_flags = cell_check_tables(*args)
+            self.cell_kinds[:] = kinds
+        self.find_cells_to_check()
+
+    def find_cells_to_check(self):
+
+        #Mark the cells the search pattern matches in the map as it is now, the handlers mark the cells ahead of the
+        #scan they make match it (or might) as they go. The map is translated to flags and held as an integer so each condition is checked for all cells at once.
+        #Shifting by 8 bits moves the flags of the cell to the right onto a cell, by 320 bits (40 cells) the cell below,
+        #and by the difference in bit number moves one flag onto another
+        grid = self.grid
+        flags = int.from_bytes(grid[0:FLAGGED_CELLS].translate(self.cell_flags), "little")
+        cells = flags & CELL_FLAG_BITS[0]
+        if self.cell_search_args[0]:
+
+            #Resting rocks and diamonds (3) with a space (5) below, or that roll off (7) the cell below into a space
+            #to the left / right with a space below that
+            space_below = flags >> 8 * BELOW + 5 - 3
+            space_and_below = flags >> 5 - 3 & space_below
+            rolls_off_below = flags >> 8 * BELOW + 7 - 3
+            cells |= (flags & (space_below | rolls_off_below & (space_and_below << 8 | space_and_below >> 8)) & CELL_FLAG_BITS[3]) >> 3
+        if MAP_SLIME in grid:
+
+            #Slime (1) with something that falls through slime (4) above and a space (5) below
+            cells |= (flags & flags << 8 * BELOW - (4 - 1) & flags >> 8 * BELOW + 5 - 1 & CELL_FLAG_BITS[1]) >> 1
+        if MAP_GROWING_WALL in grid:
+
+            #Growing wall (2) with a space type (6) to the left or right
+            cells |= (flags & (flags << 8 - (6 - 2) | flags >> 8 + 6 - 2) & CELL_FLAG_BITS[2]) >> 2
+        self.cells_to_check[0:FLAGGED_CELLS] = cells.to_bytes(FLAGGED_CELLS, "little")
+
+    def update_rock_or_diamond_that_can_fall(self, pos, x):
+
+        #Update for rock / diamond / bomb elements
+        grid = self.grid
+        cell_type = x & 0x0f
+        if cell_type == MAP_BOMB:
+            x = self.handler_bomb(pos, x)
+
+        #With gravity off a rock / diamond / bomb can float, rocks become bubbles
+        if self.gravity_timer != 0:
+            if cell_type == MAP_ROCK:
+                x = 0x95 if self.gravity_timer >= 4 else 0xa5
+            return x
+        if x == 0xa5:
+            x = 0x85
+
+        #A rock or diamond falls into a space below, setting bit 6 to show it has moved this scan
+        below = grid[pos+BELOW]
+        if below == 0:
+            grid[pos+BELOW] = x | 0x40
+
+            #Slime below the cell it falls into may let it through
+            if grid[pos+2*BELOW] == MAP_SLIME:
+                self.cells_to_check[pos+2*BELOW] = 1
+            return 0x80
+
+        #A falling rock or diamond has landed, the cell below may change (e.g. a firefly explodes)
+        if x >= MAP_DEADLY:
+            new_below = UPDATE_CELL_TYPE_WHEN_BELOW_A_FALLING_ROCK_OR_DIAMOND[below & 0x0f]
+            if new_below != 0:
+                grid[pos+BELOW] = new_below
+                self.cells_to_check[pos+BELOW] = 1  #Updated when the scan reaches it
+            x &= 0xbf
+
+        #Roll off the cell below to the left or right, into the cell beside, if it and the cell below it are spaces
+        if below & 0x40 == 0 and CELL_TYPES_THAT_ROCKS_OR_DIAMONDS_WILL_FALL_OFF[below & 0x0f]:
+            if grid[pos+LEFT] == 0 and grid[pos+BELOW+LEFT] == 0:
+                grid[pos+LEFT] = x | 0x40
+                grid[pos+BELOW+LEFT] = 0x80
+                return 0x80
+            if grid[pos+RIGHT] == 0 and grid[pos+BELOW+RIGHT] == 0:
+                grid[pos+RIGHT] = x | 0x40
+                grid[pos+BELOW+RIGHT] = 0x80
+                return 0x80
+        return x
+
+    def update_amoeba_timing(self):
+
+        #When no amoeba can grow it turns into walls (that become diamonds), if there is too much it turns into rock
+        if self.number_of_amoeba_cells_found != 0:
+            if self.current_amoeba_cell_type == 0:
+                self.amoeba_replacement = 0x92
+            elif self.number_of_amoeba_cells_found >= 199:  #The game adds $38 with the carry set (left by draw_status_bar)
+                self.amoeba_replacement = 0x85
+
+        #Towards the end of the cave time the amoeba grows quickly
+        if self.time_remaining == 50 and self.sub_second_ticks == 7:
+            self.amoeba_growth_interval = 1
+            self.amoeba_counter = 0
+
+    def got_diamond(self):
+        self.diamonds_collected += 1
+        self.score += self.diamond_value
+        self.diamonds_required = (self.diamonds_required - 1) & 0xff
+        if self.diamonds_required == 0:
+
+            #Got all the diamonds, open the exit and score the extra value for each diamond from now on
+            self.grid[self.end_position] = MAP_ACTIVE_EXIT
+            self.diamond_value = self.params[PARAM_DIAMOND_EXTRA_VALUE]
+
+    #endregion
+
+    ################################################################################
+    #region Cell handlers, given the map position and cell value they return the new cell value
+
+    def handler_basics(self, pos, x):
+
+        #Cells $90-$9f are the final step of an explosion, replaced with rockford during the introduction,
+        #a space for the outro (death) explosion or a diamond. Explosion steps above that count down by $10
+        if x < 0xa0:
+            return EXPLOSION_REPLACEMENTS[x - 0x90]
+        return x - 0x90
+
+    def handler_firefly_or_butterfly(self, pos, x):
+        grid = self.grid
+        if x >= MAP_DEADLY:
+            return self.show_large_explosion(pos, x)
+
+        #Explode next to amoeba or rockford
+        if grid[pos+BELOW] & 7 == 7 or grid[pos+RIGHT] & 7 == 7 or grid[pos+LEFT] & 7 == 7 or grid[pos+ABOVE] & 7 == 7:
+            return self.show_large_explosion(pos, x)
+
+        #Move in the desired direction if it is empty, otherwise try the next direction, or turn if that isn't empty either
+        direction = (x >> 3) & 7
+        for i in range(2):
+            offset = FIREFLY_NEIGHBOUR_OFFSETS[direction]
+            if grid[pos+offset] == 0:
+                grid[pos+offset] = FIREFLY_AND_BUTTERFLY_CELL_VALUES[direction]
+                return 0
+            direction = FIREFLY_AND_BUTTERFLY_NEXT_DIRECTION_TABLE[direction]
+        return FIREFLY_AND_BUTTERFLY_CELL_VALUES[direction]
+
+    def show_large_explosion(self, pos, x):
+
+        #Replace the current and neighbour cells with a large explosion, or diamonds for butterflies
+        grid = self.grid
+        explosion_table = CELL_TYPES_THAT_WILL_TURN_INTO_DIAMONDS if x & 8 else CELL_TYPES_THAT_WILL_TURN_INTO_LARGE_EXPLOSION
+        grid[pos] = 0
+        for offset in (ABOVE+LEFT, ABOVE, ABOVE+RIGHT, LEFT, 0, RIGHT, BELOW+LEFT, BELOW, BELOW+RIGHT):
+            new_cell = explosion_table[grid[pos+offset] & 0x0f]
+            if new_cell != 0:
+                grid[pos+offset] = new_cell
+        grid[pos+ABOVE+LEFT] &= 0x7f
+
+        #Diamonds from the explosion may let slime below them be updated
+        cells_to_check = self.cells_to_check
+        cells_to_check[pos+RIGHT] = 1
+        cells_to_check[pos+BELOW+LEFT:pos+BELOW+RIGHT+1] = b"\x01" * 3
+        cells_to_check[pos+2*BELOW+LEFT:pos+2*BELOW+RIGHT+1] = b"\x01" * 3
+        return grid[pos]
+
+    def handler_amoeba(self, pos, x):
+        grid = self.grid
+        if self.amoeba_replacement != 0:
+            return self.amoeba_replacement
+
+        #Check for surrounding space or earth allowing the amoeba to grow
+        self.number_of_amoeba_cells_found = (self.number_of_amoeba_cells_found + 1) & 0xff
+        if grid[pos+ABOVE] & 0x0e and grid[pos+LEFT] & 0x0e and grid[pos+RIGHT] & 0x0e and grid[pos+BELOW] & 0x0e:
+            return x
+        self.current_amoeba_cell_type = x
+        self.amoeba_counter = (self.amoeba_counter + 1) & 0xff
+        if self.amoeba_counter != self.amoeba_growth_interval:
+            return x
+        self.amoeba_counter = 0
+
+        #Grow in the direction given by the amoeba state in the top bits, otherwise move onto the next state
+        offset = AMOEBA_GROWTH_OFFSETS[(x >> 4) & 3]
+        if (grid[pos+offset] if x >= MAP_DEADLY else grid[pos+offset] & 0x0e) != 0:
+            return (x + 0x10) & 0x7f
+        if self.tick_counter & 1:
+            x = (x + 0x10) & 0x7f
+        grid[pos+offset] = x
+        if x < MAP_UNPROCESSED:
+            self.cells_to_check[pos+offset] = 1  #Updated when the scan reaches it, if to the right or below
+        return x
+
+    def handler_rockford(self, pos, x):
+        grid = self.grid
+        self.current_rockford_sprite = x
+        if self.rockford_explosion_cell_type != 0 or x == 0xff:
+            self.rockford_explosion_cell_type = MAP_START_LARGE_EXPLOSION
+            return MAP_START_LARGE_EXPLOSION
+
+        #Player is not moving in any direction
+        direction_keys = self.keys_to_process & 0xf0
+        if direction_keys == 0:
+            self.rockford_position = pos
+            return MAP_ROCKFORD
+
+        #Use the first direction key pressed of right, left, up, down
+        self.ticks_since_last_direction_key_pressed = 0
+        direction = 8 - direction_keys.bit_length()
+        if ROCKFORD_CELL_VALUE_FOR_DIRECTION[direction] != 0:
+            self.rockford_cell_value = ROCKFORD_CELL_VALUE_FOR_DIRECTION[direction]
+        offset = NEIGHBOURING_CELL_OFFSET_FROM_DIRECTION_INDEX[direction]
+        neighbour = grid[pos+offset]
+        self.neighbour_cell_contents = neighbour
+        collision = COLLISION_FOR_CELL_TYPE[neighbour & 0x0f]
+
+        #Movement is not possible
+        if collision == 0:
+            self.rockford_position = pos
+            return self.rockford_cell_value
+
+        #Trying to move into something difficult to move (e.g. a rock), pushes after a delay
+        if collision == 1:
+            push_offset = self.check_for_rock_direction_offsets[direction]
+            if push_offset == PUSH_UP:
+                if grid[pos+2*ABOVE] & 0x7f != 0 or self.push_delay_over() == False:
+                    self.rockford_position = pos
+                    return self.rockford_cell_value
+                grid[pos+2*ABOVE] = MAP_ROCK | 0x10
+                return self.move_rockford(pos, offset)
+
+            #Don't try pushing a rock that's just fallen this tick
+            if push_offset == 0 or grid[pos+push_offset] != 0 or neighbour == 0x45 or self.push_delay_over() == False:
+                self.rockford_position = pos
+                return self.rockford_cell_value
+            grid[pos+push_offset] = neighbour | MAP_UNPROCESSED
+            self.cells_to_check[pos+push_offset+BELOW] = 1  #Slime below may let it through
+
+        #Return and direction pressed clears the cell in that direction, or places a bomb
+        if self.keys_to_process & KEY_RETURN:
+            grid[pos+offset] = self.check_if_bombs_used()
+
+            #The space or bomb may let the cells around it be updated
+            cells_to_check = self.cells_to_check
+            cells_to_check[pos+offset+ABOVE+LEFT:pos+offset+ABOVE+RIGHT+1] = b"\x01" * 3
+            cells_to_check[pos+offset+LEFT:pos+offset+RIGHT+1] = b"\x01" * 3
+            cells_to_check[pos+offset+BELOW] = 1
+            self.rockford_position = pos
+            return self.rockford_cell_value
+        return self.move_rockford(pos, offset)
+
+    def push_delay_over(self):
+        self.delay_trying_to_push_rock = (self.delay_trying_to_push_rock - 1) & 0xff
+        if self.delay_trying_to_push_rock != 0:
+            return False
+        self.delay_trying_to_push_rock = 4
+        return True
+
+    def move_rockford(self, pos, offset):
+
+        #Move rockford into the neighbour cell, leaving a space
+        self.grid[pos+offset] = self.rockford_cell_value
+        self.rockford_position = pos + offset
+        return 0 if offset == LEFT else 0x80
+
+    def check_if_bombs_used(self):
+
+        #If bombs are allowed, place a bomb in the space of the direction, otherwise just clear the space
+        if self.bomb_counter == 0 or self.neighbour_cell_contents != 0 or self.bomb_delay != 0:
+            return 0
+        self.bomb_delay = 3
+        self.bomb_counter -= 1
+        return MAP_BOMB
+
+    def handler_growing_wall(self, pos, x):
+
+        #The wall extends horizontally into empty space beside it
+        grid = self.grid
+        if grid[pos+LEFT] & 0x0f == 0:
+            grid[pos+LEFT] = MAP_UNPROCESSED | MAP_GROWING_WALL
+        if grid[pos+RIGHT] & 0x0f == 0:
+            grid[pos+RIGHT] = MAP_UNPROCESSED | MAP_GROWING_WALL
+        return x
+
+    def handler_bomb(self, pos, x):
+
+        #Count down the fuse every 8 ticks, unless falling, then explode like a firefly
+        if x >= 0xcb or self.tick_counter & 7 != 7:
+            return x
+        x += 0x10
+        if x >= 0xcb:
+            return self.show_large_explosion(pos, MAP_DEADLY)
+        return x
+
+    def handler_magic_wall(self, pos, x):
+        grid = self.grid
+        if x == 0xbd:
+
+            #Something has fallen onto the wall, it passes through changed (rocks into diamonds and vice versa)
+            #if the wall is active and the cell below is empty
+            item = ITEMS_PRODUCED_BY_THE_MAGIC_WALL[grid[pos+ABOVE] & 0x0f]
+            if item != 0:
+                grid[pos+ABOVE] = MAP_UNPROCESSED | MAP_SPACE
+            if self.magic_wall_state == 0x2d:
+                return self.magic_wall_state
+            if grid[pos+BELOW] == 0:
+                grid[pos+BELOW] = item
+                self.cells_to_check[pos+2*BELOW] = 1  #Slime below may let it through
+        elif self.magic_wall_state != 0x1d:
+            return self.magic_wall_state
+
+        #The magic wall becomes inactive once the timer has run out, the rest of the scan updates the other magic wall cells
+        magic_wall_state = 0x1d if self.magic_wall_timer != 0 else 0x2d
+        if magic_wall_state != self.magic_wall_state:
+            self.magic_wall_state = magic_wall_state
+            self.update_cell_search()
+        return magic_wall_state
+
+    def handler_slime(self, pos, x):
+
+        #Allows rocks and diamonds to pass through it after a random delay set by the slime permeability
+        grid = self.grid
+        item = ITEMS_ALLOWED_THROUGH_SLIME[grid[pos+ABOVE] & 0x0f]
+        if item == 0 or grid[pos+BELOW] != 0:
+            return x
+        slime_permeability = self.params[PARAM_SLIME_PERMEABILITY]
+        if slime_permeability != 0:
+            self.random_seed1 = 0
+            if self.random_seed2 == 0:
+                self.random_seed2 = slime_permeability
+            self.random_seed1, self.random_seed2 = pseudo_random(self.random_seed1, self.random_seed2)
+            if self.random_seed1 >= 4:
+                return x
+        grid[pos+ABOVE] = MAP_UNPROCESSED | MAP_SPACE
+        grid[pos+BELOW] = item
+        self.cells_to_check[pos+2*BELOW] = 1  #Slime below may let it through
+        return x
+
+    def handler_rockford_intro_or_exit(self, pos, x):
+
+        #Wait for the flashing rockford animation to finish then start the explosion before rockford appears
+        x &= 0x7f
+        if x == MAP_ACTIVE_EXIT:
+            return x
+        self.keys_to_process = 0
+        if (self.tick_counter - 0xf0) & 0x80 == 0:
+            return x
+        return 0x21
+
+    #endregion
+
+    ################################################################################
+    def map_text(self):
+
+        #The map as lines of symbols for each cell type
+        return ["".join([MAP_SYMBOLS[v & 0x0f] for v in self.grid[row * TILES_COLUMNS:(row+1) * TILES_COLUMNS]]) for row in range(TILES_ROWS)]
+
+################################################################################
+def cave_result(cave_name, cave):
+    return (f"{cave_name} level {cave.level}: {cave.status if cave.status != None else 'playing'} after {cave.ticks} ticks, "
+        f"diamonds {cave.diamonds_collected}, score {cave.score}, time {cave.time_remaining}")
+
+def level_result(cave_name, caves):
+
+    #Line of results for a cave and level played with one or more lists of keys, the results are counted when there is
+    #more than one
+    if len(caves) == 1:
+        return cave_result(cave_name, caves[0])
+    statuses = [cave.status if cave.status != None else "playing" for cave in caves]
+    counts = ", ".join([f"{status} {statuses.count(status)}" for status in ["exit", "dead", "out of time", "playing"] if status in statuses])
+    return f"{cave_name} level {caves[0].level}: {len(caves)} runs, {counts}"
+
+def simulate_cave(cave_name, cave_data, levels, keys_lists, max_ticks):
+
+    #Simulate a cave at each level with each list of keys, returning a line of results for each level
+    results = []
+    total_ticks = 0
+    for level in levels:
+        caves = []
+        for keys_list in keys_lists:
+            cave = Cave(cave_data, level)
+            cave.run(keys_list, max_ticks)
+            total_ticks += cave.ticks
+            caves.append(cave)
+        results.append(level_result(cave_name, caves))
+    return results, total_ticks
+
+def random_keys(seed, length):
+
+    #Reproducible random key presses, directions with or without return and no key
+    rng = random.Random(seed)
+    return keys_from_text("".join(rng.choices("RLUDrlud.", weights=[4, 4, 4, 4, 1, 1, 1, 1, 4], k=length)))
+
+################################################################################
+# Main Routine
+if __name__ == '__main__':
+
+    ### Config and file paths
+    base_path = path.dirname(path.abspath(__file__))
+    base_path = path.join(base_path, "..")
+    caves_folder = path.join(base_path, "caves_bin")
+
+    #Caves, levels (1-5), ticks and keys to simulate, or a number of random key lists to try (fuzz)
+    args = sys.argv[1:]
+    levels = list(range(1, LEVELS+1))
+    max_ticks = 1000
+    keys_lists = [[]]
+    for option in ["-levels", "-ticks", "-keys", "-fuzz"]:
+        if option in args:
+            i = args.index(option)
+            if option == "-levels":
+                levels = [int(level) for level in args[i+1].split(",")]
+            elif option == "-ticks":
+                max_ticks = int(args[i+1])
+            elif option == "-keys":
+                keys_lists = [keys_from_text(args[i+1])]
+            else:
+                keys_lists = [random_keys(seed, max_ticks) for seed in range(int(args[i+1]))]
+            del args[i:i+2]
+    if len(args) == 0:
+        args = sorted([path.join(caves_folder, f) for f in os.listdir(caves_folder) if path.isdir(path.join(caves_folder, f))])
+
+    #Cave files given, or those in the folders given (group files, or cave files named by letter) in cave letter order
+    caves = []
+    for arg in args:
+        if path.isdir(arg):
+            group_files = [path.join(arg, f"{path.basename(path.abspath(arg))}-{i+1}") for i in range(len(CAVE_GROUPS))]
+            cave_files = [f for f in group_files if path.isfile(f)] or [path.join(arg, f) for f in os.listdir(arg) if len(f) == 1]
+            caves += sorted([cave for cave_file in cave_files for cave in load_cave_file(cave_file)])
+        else:
+            caves += load_cave_file(arg)
+    cave_names = [cave_name for cave_name, cave_data in caves]
+    cave_datas = [cave_data for cave_name, cave_data in caves]
+
+    #Simulate the caves in parallel
+    start_time = time.time()
+    total_ticks = 0
+    with ProcessPoolExecutor() as executor:
+        futures = []
+        for cave_name, cave_data in zip(cave_names, cave_datas):
+            futures.append(executor.submit(simulate_cave, cave_name, cave_data, levels, keys_lists, max_ticks))
+        for future in futures:
+            results, ticks = future.result()
+            total_ticks += ticks
+            for line in results:
+                print(line)
+
+    elapsed = time.time() - start_time
+    print(f"Simulated {total_ticks} ticks in {elapsed:.1f} seconds ({total_ticks / elapsed:.0f} ticks per second)")
@@ -1,12 +1,19 @@
 ################################################################################
 # CreateMapHtml.py - Generate HTML with images given a JSON file definition
-
-JSON_CAVE_DEF = "BoulderDash02.json"
-LEVEL = 0  #Level numbers (levels are 1-5 but zero based)
+#
+#   Usage: python CreateMapHtml.py [JSON files] [-levels 1,2,3,4,5]
+#   e.g. python CreateMapHtml.py BoulderDash01.json BoulderDash02.json -levels 1
+#   With no JSON files given, all cave JSON files in bdcff_conversions/done/json are used. All 5 levels are used by default.
+#   The caves are rendered in parallel, with one HTML file per JSON file (pack) showing each cave at each level.
 
 ### Imports
+import sys
+import os
+import io
 import json
 from os import path
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import numpy
 from PIL import Image
 
@@ -15,6 +22,7 @@ TILE_HEIGHT = 16
 TILE_WIDTH = 16
 TILES_ROWS = 22
 TILES_COLUMNS = 40
+LEVELS = 5
 
 BLACK = [0, 0, 0]
 RED = [255, 0, 0]
@@ -27,81 +35,102 @@ WHITE = [255, 255, 255]
 AVAILABLE_COLOURS = [BLACK, RED, GREEN, YELLOW, BLUE, PURPLE, CYAN, WHITE]
 
 ################################################################################
-def generate_cave_image(image_file_name, map, pallette, row_col_dimensions, random_type, tile_prob, tile_name_for_prob, below_tile_name_for_prob, initial_tile_name, border_tile_name):
-
-#TODO: Need to use border tile parameter
-
-    #For each tile in each of the lines of a map:
-    #  Find the sprite pixel map for the tile
-    #  Plot each pixel on each pixel line using the colour represented by the pixel number
-
-    data = numpy.zeros((TILE_HEIGHT * row_col_dimensions[0], TILE_WIDTH * row_col_dimensions[1], 3), dtype=numpy.uint8)
-    random_seed1 = 0
-    random_seed2 = seed
-    row_below = [""] * row_col_dimensions[1]
-
-    y_pos = 0
-    for l, line in enumerate(map):  #Loop through all map lines
-        x_pos = 0
-        t = 0  #Reset counter each line (maximum is the number of columns in the cave)
-        for tile in line:  #Loop through all tiles in a line
-
-            #Determine the sprite definition to use
-            sprite_name = element_map[tile]["sprite"]
-            if sprite_name == "INBOX":  #Replace inbox with rockford for sprite lookup
-                sprite_name = "ROCKFORD"
-            pixel_sprite = sprite_json[sprite_name]
-
-            #Replace the border top and bottom lines where null tile is used
-            if border_tile_name != "" and tile == "-" and (l in [0, row_col_dimensions[0]-1]):
-                pixel_sprite = sprite_json[object_element_map[border_tile_name]["sprite"]]
-
-            #elif row_below[t] != "" and l == row_col_dimensions[0]-2:
-            #    pixel_sprite = sprite_json[object_element_map[row_below[t]]["sprite"]]
-
-            #For pseudo-random tile generation, determine the replacement for the null tile
-            elif random_type and l > 0 and l < row_col_dimensions[0]-1:
-
-                #Sometimes 2 tiles are plotted, the second one below the first. See BD2 caves G, K
-                #The second tile may override the calculated random tile
-                override_tile = row_below[t]
-
-                #Determine the random tile
-                random_tile_name = initial_tile_name  #Assume is the initial fill tile to begin with
-                random_seed1, random_seed2 = next_random(random_seed1, random_seed2)  #Get random seed values
-                for i in range(len(tile_prob)):  #Check the random seed values against the probabilities for plotting each tile
-                    if random_seed1 < tile_prob[i]:
-                        #Make the random tile the tile for the probability in range (The random tile may change a few times in this loop)
-                        random_tile_name = tile_name_for_prob[i]
-                        if below_tile_name_for_prob != []:
-                            row_below[t] = below_tile_name_for_prob[i]  #Also keep the tile to plot below (usually this is just "")
-
-                #If there is an override tile from the previous row, use it as the sprite
-                if override_tile != "":
-                    pixel_sprite = sprite_json[object_element_map[override_tile]["sprite"]]
-                    row_below[t] = ""
-
-                #Only replace the cave tile with the random one if the cave tile is null
-                #This occurs at this late stage to preserve the ongoing random seed calculations
-                else:
-                    if tile == "-":
-                        pixel_sprite = sprite_json[object_element_map[random_tile_name]["sprite"]]
-                    else:
-                        row_below[t] = ""
-
-            #Set each pixel colour for the sprite
-            for y, pixel_line in enumerate(pixel_sprite):
-                for x, px in enumerate(pixel_line):
-                    data[y_pos + y, x_pos + x] = pallette[int(px)-1]
-
-            x_pos += TILE_WIDTH
-            t += 1
-
-        y_pos += TILE_HEIGHT
-
-    image = Image.fromarray(data)
-    #image.show()
-    image.save(image_file_name)
+def load_config(base_path):
+
+    #Read the config file and sprites, also the initializer of each worker process rendering caves
+    global element_map, parameter_list, colour_map, colour_schemes, object_element_map, sprite_index, sprite_pixels, symbol_sprites
+
+    config_file = open(path.join(base_path, "config", "config.json"))
+    config_settings = json.load(config_file)
+    element_map = config_settings["element_map"]
+    parameter_list = config_settings["parameters"]
+    colour_map = config_settings["colour_map"]
+    colour_schemes = config_settings["colour_schemes"]
+    config_file.close()
+
+    #Create object_element_map from element_map by making the element name the key, using substitute values if available
+    object_element_map = {}
+    for e in element_map:
+        new_key = element_map[e]["element"]
+        object_element_map[new_key] = {}
+        object_element_map[new_key]["sprite"] = element_map[e]["sprite"]
+
+    #Decode the sprites once into an array of pixel numbers (zero based pallette index) per sprite, indexed by sprite name
+    #Pixel number 0 wraps around to the last colour of the pallette
+    sprite_json = json.load(open(path.join(base_path, "sprites", "Text_sprites.json")))
+    sprite_index = {}
+    sprite_pixels = numpy.zeros((len(sprite_json), TILE_HEIGHT, TILE_WIDTH), dtype=numpy.uint8)
+    for i, sprite_name in enumerate(sprite_json):
+        sprite_index[sprite_name] = i
+        sprite_pixels[i] = (numpy.array([list(pixel_line) for pixel_line in sprite_json[sprite_name]], dtype=numpy.uint8) + 3) % 4
+
+    #Sprite for each map tile symbol code, e.g. ord("r") for a boulder
+    symbol_sprites = numpy.zeros(256, dtype=numpy.uint8)
+    for e in element_map:
+        sprite_name = element_map[e]["sprite"]
+        if sprite_name == "INBOX":  #Replace inbox with rockford for sprite lookup
+            sprite_name = "ROCKFORD"
+        symbol_sprites[ord(e)] = sprite_index[sprite_name]
+
+################################################################################
+def cave_fixed_layer(map, border_tile_name):
+
+    #Find the sprite for each tile in each of the lines of a map, these are the same for every level
+    tile_codes = numpy.frombuffer("".join(map).encode("latin-1"), dtype=numpy.uint8).reshape(len(map), -1)
+    sprite_grid = symbol_sprites[tile_codes]
+
+    #Replace the border top and bottom lines where null tile is used
+    if border_tile_name != "":
+        border_lines = [0, len(map)-1]
+        border_sprite = sprite_index[object_element_map[border_tile_name]["sprite"]]
+        sprite_grid[border_lines] = numpy.where(tile_codes[border_lines] == ord("-"), border_sprite, sprite_grid[border_lines])
+
+    return tile_codes, sprite_grid
+
+def cave_random_layer(tile_codes, sprite_grid, seed, tile_prob, tile_name_for_prob, below_tile_name_for_prob, initial_tile_name):
+
+    #For pseudo-random tile generation, determine the replacement for the null tile in the lines between the top and bottom lines
+    #The sprites of the fixed layer are copied, so the fixed layer can be used for each level
+    sprite_grid = sprite_grid.copy()
+    rows, columns = sprite_grid.shape
+    random_values = numpy.frombuffer(random_sequence(seed), dtype=numpy.uint8)[0:(rows-2) * columns].reshape(rows-2, columns)
+
+    #Determine the random tile for each random value, checking the values against the probabilities for plotting each tile
+    #The random tile is the one for the last probability in range, or the initial fill tile if none are
+    random_sprites = numpy.full((rows-2, columns), sprite_index[object_element_map[initial_tile_name]["sprite"]], dtype=numpy.uint8)
+    below_sprites = numpy.full((rows-2, columns), -2, dtype=numpy.int16)  #Tile to plot below, -2 for none in range, -1 for ""
+    for i in range(len(tile_prob)):
+        in_range = random_values < tile_prob[i]
+        random_sprites[in_range] = sprite_index[object_element_map[tile_name_for_prob[i]]["sprite"]]
+        if below_tile_name_for_prob != []:
+            below_tile_name = below_tile_name_for_prob[i]
+            below_sprites[in_range] = sprite_index[object_element_map[below_tile_name]["sprite"]] if below_tile_name != "" else -1
+
+    #Sometimes 2 tiles are plotted, the second one below the first. See BD2 caves G, K
+    #The second tile overrides the random tile on the next line, so lines are done in turn with the tiles to plot below
+    row_below = numpy.full(columns, -1, dtype=numpy.int16)
+    null_tiles = tile_codes == ord("-")
+    for l in range(1, rows-1):
+        override_tiles = row_below.copy()
+        row_below = numpy.where(below_sprites[l-1] != -2, below_sprites[l-1], row_below)
+
+        #If there is an override tile from the previous row, use it as the sprite
+        #Otherwise only replace the cave tile with the random one if the cave tile is null
+        override = override_tiles != -1
+        replace = ~override & null_tiles[l]
+        sprite_grid[l, override] = override_tiles[override]
+        sprite_grid[l, replace] = random_sprites[l-1, replace]
+        row_below[~replace] = -1
+
+    return sprite_grid
+
+def cave_image(sprite_grid, pallette):
+
+    #Look up the pixel numbers of each tile's sprite, arrange the sprite rows and columns into image rows and columns,
+    #then look up the colour of each pixel number
+    rows, columns = sprite_grid.shape
+    pixels = sprite_pixels[sprite_grid].transpose(0, 2, 1, 3).reshape(TILE_HEIGHT * rows, TILE_WIDTH * columns)
+    return Image.fromarray(numpy.array(pallette, dtype=numpy.uint8)[pixels])
 
 def next_random(random_seed1, random_seed2):
     temp_rand1 = (random_seed1 & 0x0001) * 0x0080
@@ -120,8 +149,71 @@ def next_random(random_seed1, random_seed2):
 
     return random_seed1, random_seed2
 
+#Pseudo-random generator state transitions for every state (seed1 * 256 + seed2), as used to fill caves
+random_states = numpy.arange(65536)
+random_seed1, random_seed2 = next_random(random_states >> 8, random_states & 0xFF)
+RANDOM_TRANSITIONS = ((random_seed1 << 8) | random_seed2).tolist()
+
+@lru_cache(maxsize=256)
+def random_sequence(seed):
+
+    #The first 880 (22 lines x 40 tiles) random values (seed1) generated from a cave's random seed, starting with seed1 = 0
+    state = seed
+    sequence = bytearray(880)
+    for i in range(880):
+        state = RANDOM_TRANSITIONS[state]
+        sequence[i] = state >> 8
+
+    return bytes(sequence)
+
+def generate_cave_images(json_cave, levels, image_file_names):
+
+    #Create the image of a cave for each level
+    #TODO: Need to use border tile parameter
+
+    #Get colour pallette for the cave
+    pallette = [BLACK]  #Black (0) is always present
+    for colour in json_cave["Colors"]:
+        if colour_map.get(colour.lower()) != None:  #Attempt to map the colour text values e.g. "red" becomes 1
+            c = colour_map[colour.lower()]
+            pallette.append(AVAILABLE_COLOURS[c])
+    if len(pallette) != 4:  #Were all 4 colours mapped for the pallette? If not, use the predefined pallette for the cave
+        pallette = [BLACK]
+        for c in colour_schemes[str(json_cave["CaveNumber"])]['code']:
+            pallette.append(AVAILABLE_COLOURS[c])
+
+    #For border tile when used
+    border_tile_name = ""
+    if "BorderTile" in json_cave:
+        border_tile_name = json_cave["BorderTile"]
+
+    tile_codes, sprite_grid = cave_fixed_layer(json_cave["Map"], border_tile_name)
+
+    #Pseudo-random tile-plotting parameters, only the random seed is different for each level
+    if "RandSeed" in json_cave:
+        tile_prob = json_cave["TileProbability"]
+        tile_name_for_prob = json_cave["TileForProbability"]
+        below_tile_name_for_prob = []
+        if "RandomFillBelow" in json_cave:
+            below_tile_name_for_prob = json_cave["RandomFillBelow"]
+        initial_tile_name = "DIRT"
+        if "InitialFill" in json_cave:
+            initial_tile_name = json_cave["InitialFill"]
+
+        for level, image_file_name in zip(levels, image_file_names):
+            random_sprite_grid = cave_random_layer(tile_codes, sprite_grid, json_cave["RandSeed"][level], tile_prob, tile_name_for_prob, below_tile_name_for_prob, initial_tile_name)
+            cave_image(random_sprite_grid, pallette).save(image_file_name)
+
+    #Without pseudo-random tiles the image is the same for every level
+    else:
+        image_bytes = io.BytesIO()
+        cave_image(sprite_grid, pallette).save(image_bytes, format="PNG")
+        for image_file_name in image_file_names:
+            with open(image_file_name, "wb") as image_file:
+                image_file.write(image_bytes.getvalue())
+
 ################################################################################
-def create_table_of_params(param_list):
+def create_table_of_params(html_file, json_cave, param_list, level):
     i = 0
     for param_name in param_list:
         if param_name in json_cave:
@@ -130,120 +222,97 @@ def create_table_of_params(param_list):
 
             html_file.write("<tr>")
             if type(json_cave[param_name]) == list:
-                add_param_to_html_td(parameter_list[param_name]["label"], json_cave[param_name][LEVEL])
+                add_param_to_html_td(html_file, parameter_list[param_name]["label"], json_cave[param_name][level])
             else:
-                add_param_to_html_td(parameter_list[param_name]["label"], json_cave[param_name])
+                add_param_to_html_td(html_file, parameter_list[param_name]["label"], json_cave[param_name])
             html_file.write("</tr>\n")
             i += 1
     if i > 0:
         html_file.write("</table>\n")
 
-def add_param_to_html_td(label, value):
+def add_param_to_html_td(html_file, label, value):
     html_file.write(f"<td>{label}</td><td style='padding-left:30px; text-align:right'>{value}</td>")
 
-################################################################################
-# Main Routine
-if __name__ == '__main__':
+def cave_image_name(title, json_cave, level):
+    return f'{title}_cave{json_cave["CaveLetter"]}_level{level+1}.png'
 
-    ### Config and file paths
-    base_path = path.dirname(path.abspath(__file__))
-    base_path = path.join(base_path, "..")
-    config_file = open(path.join(base_path, "config", "config.json"))
-    config_settings = json.load(config_file)
-    element_map = config_settings["element_map"]
-    parameter_list = config_settings["parameters"]
-    colour_map = config_settings["colour_map"]
-    colour_schemes = config_settings["colour_schemes"]
-    config_file.close()
-
-    #Create object_element_map from element_map by making the element name the key, using substitute values if available
-    object_element_map = {}
-    for e in element_map:
-        new_key = element_map[e]["element"]
-        object_element_map[new_key] = {}
-        object_element_map[new_key]["sprite"] = element_map[e]["sprite"]
+def create_html(html_file_name, title, json_cave_list, levels):
 
     #Parameters to output
     core_params = ["DiamondValue", "DiamondExtraValue", "DiamondsRequired", "CaveTime"]
     other_params = ["AmoebaTime", "MagicWallTime", "SlimePermeability", "Bombs", "ZeroGravityTime"]
 
-    #Add files / folders needed
-    html_folder = path.join(base_path, "bdcff_conversions", "done", "html")
-    images_folder = path.join(html_folder, "images")
-    json_cave_list = json.load(open(path.join(base_path, "bdcff_conversions", "done", "json", JSON_CAVE_DEF)))
-    sprite_json = json.load(open(path.join(base_path, "sprites", "Text_sprites.json")))
-
-    title = JSON_CAVE_DEF.split('.')[0]
-    html_file = open(path.join(html_folder, title + ".html"), "w")
+    html_file = open(html_file_name, "w")
     html_file.write(f"<!DOCTYPE html><html lang='en'><head><title>{title}</title></head><body style='font-family:arial; max-width:max-content; margin:auto;'>\n")
 
     bonus_count = 0
     for json_cave in json_cave_list:
 
-        print(f'Generating html and images for cave: {json_cave["CaveLetter"]}')
-
-        html_file.write("<br/><br/><br/>\n")
-        html_file.write("<table>\n")
-        #Assign dimensions and html headings
-        row_col_dimensions = [22, 40]  #Normal cave rows, columns
-        if "Intermission" in json_cave:
-            if json_cave["Intermission"] == True:
-                row_col_dimensions = [12, 20]  #Intermission rows, columns
-                bonus_count += 1
-                label = f"Intermission {bonus_count}"
-                html_file.write(f"<tr><td colspan=2 style='padding-left:10px'><b>{label}&nbsp;&nbsp;&nbsp;level {LEVEL+1}</b></td></tr>\n")
+        #Assign html headings
+        if json_cave.get("Intermission") == True:
+            bonus_count += 1
+            label = f"Intermission {bonus_count}"
         else:
             label = f'Cave {json_cave["CaveLetter"]}'
-            html_file.write(f'<tr><td colspan=2 style="padding-left:10px"><b>{label}&nbsp;&nbsp;&nbsp;level {LEVEL+1}</b></td></tr>\n')
-
-        #Add html image reference
-        image_file_name = f'{title}_cave{json_cave["CaveLetter"]}.png'
-        html_file.write(f"<tr><td colspan=2><img src='images/{image_file_name}' alt='{label}'/></td></tr>\n")
-
-        #Add core parameters (always present) and others which may not be present. Two separate tables are created
-        html_file.write("<tr><td style='width:40%; vertical-align:top'>")
-        create_table_of_params(core_params)
-        html_file.write("</td><td style='width:40%; vertical-align:top'>")
-        create_table_of_params(other_params)
-        html_file.write("</td></tr></table>\n")
-
-        #Get colour pallette for the cave
-        pallette = [BLACK]  #Black (0) is always present
-        for colour in json_cave["Colors"]:
-            if colour_map.get(colour.lower()) != None:  #Attempt to map the colour text values e.g. "red" becomes 1
-                c = colour_map[colour.lower()]
-                pallette.append(AVAILABLE_COLOURS[c])
-        if len(pallette) != 4:  #Were all 4 colours mapped for the pallette? If not, use the predefined pallette for the cave
-            pallette = [BLACK]
-            for c in colour_schemes[str(json_cave["CaveNumber"])]['code']:
-                pallette.append(AVAILABLE_COLOURS[c])
-
-        #For border tile when used
-        border_tile_name = ""
-        if "BorderTile" in json_cave:
-            border_tile_name = json_cave["BorderTile"]
-
-        #Pseudo-random tile-plotting parameters
-        random_type = False
-        seed = 0
-        tile_prob = []
-        tile_name_for_prob = []
-        below_tile_name_for_prob = []
-        initial_tile_name = "DIRT"
-        if "RandSeed" in json_cave:
-            random_type = True
-            seed = json_cave["RandSeed"][LEVEL]
-            tile_prob = json_cave["TileProbability"]
-            tile_name_for_prob = json_cave["TileForProbability"]
-            if "RandomFillBelow" in json_cave:
-                below_tile_name_for_prob = json_cave["RandomFillBelow"]
-            if "InitialFill" in json_cave:
-                initial_tile_name = json_cave["InitialFill"]
-
-        #Create cave image
-        #if json_cave["CaveLetter"] == "K":  #For debug
-        image_file_name = path.join(images_folder, image_file_name)
-        generate_cave_image(image_file_name, json_cave["Map"], pallette, row_col_dimensions, random_type, tile_prob, tile_name_for_prob, below_tile_name_for_prob, initial_tile_name, border_tile_name)
+
+        for level in levels:
+            html_file.write("<br/><br/><br/>\n")
+            html_file.write("<table>\n")
+            html_file.write(f"<tr><td colspan=2 style='padding-left:10px'><b>{label}&nbsp;&nbsp;&nbsp;level {level+1}</b></td></tr>\n")
+
+            #Add html image reference
+            html_file.write(f"<tr><td colspan=2><img src='images/{cave_image_name(title, json_cave, level)}' alt='{label}'/></td></tr>\n")
+
+            #Add core parameters (always present) and others which may not be present. Two separate tables are created
+            html_file.write("<tr><td style='width:40%; vertical-align:top'>")
+            create_table_of_params(html_file, json_cave, core_params, level)
+            html_file.write("</td><td style='width:40%; vertical-align:top'>")
+            create_table_of_params(html_file, json_cave, other_params, level)
+            html_file.write("</td></tr></table>\n")
 
     html_file.write("</body></html>\n")
     html_file.close()
+
+################################################################################
+# Main Routine
+if __name__ == '__main__':
+
+    ### Config and file paths
+    base_path = path.dirname(path.abspath(__file__))
+    base_path = path.join(base_path, "..")
+    load_config(base_path)
+
+    #Add files / folders needed
+    json_folder = path.join(base_path, "bdcff_conversions", "done", "json")
+    html_folder = path.join(base_path, "bdcff_conversions", "done", "html")
+    images_folder = path.join(html_folder, "images")
+    if not path.exists(images_folder):
+        os.makedirs(images_folder)
+
+    #JSON files and levels (1-5 but zero based) to render
+    args = sys.argv[1:]
+    levels = list(range(LEVELS))
+    if "-levels" in args:
+        i = args.index("-levels")
+        levels = [int(level) - 1 for level in args[i+1].split(",")]
+        del args[i:i+2]
+    json_files = args
+    if len(json_files) == 0:
+        json_files = sorted([f for f in os.listdir(json_folder) if f.endswith(".json")])
+
+    #Create the html for each pack, and the images for each cave in worker processes
+    with ProcessPoolExecutor(initializer=load_config, initargs=(base_path,)) as executor:
+        futures = []
+        for json_file in json_files:
+
+            title = path.basename(json_file).split('.')[0]
+            print(f"Generating html and images for {title}")
+            json_cave_list = json.load(open(path.join(json_folder, json_file)))
+            create_html(path.join(html_folder, title + ".html"), title, json_cave_list, levels)
+
+            for json_cave in json_cave_list:
+                image_file_names = [path.join(images_folder, cave_image_name(title, json_cave, level)) for level in levels]
+                futures.append(executor.submit(generate_cave_images, json_cave, levels, image_file_names))
+
+        for future in futures:
+            future.result()
@@ -0,0 +1,163 @@
+################################################################################
+# bench_image.py - Time image.py insert and compact against the original byte loops
+#
+#   Usage: python bench_image.py [-runs 20]
+#
+#   The original image.py copied inserted files into the disk data a byte at a time, and compact made a
+#   byte by byte copy of the whole side before moving each file a byte at a time. DiskImage now uses slice
+#   assignment and memoryview moves. The original loops are reproduced here and timed against DiskImage
+#   on the same disk images, each timing covers scan, update and write. The resulting images are compared
+#   to check both give the same result.
+#   The disk images are ssd/BoulderDash.ssd with three files deleted, and an 80 track dsd with 31 files
+#   on each side and every other file deleted.
+#
+
+### Imports
+import sys
+import time
+import random
+import shutil
+import tempfile
+from os import path
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), ".."))
+import image
+
+################################################################################
+#region Original byte loops
+
+def original_compact(disk_image):
+
+    #Compact as the original image.py did, on a disk image already scanned
+    new_file_sector = []
+    s = 2
+    for entry in reversed(disk_image.files):
+        new_file_sector.append(s)
+        s += -(-entry.length // 256) # round up
+    new_file_sector.reverse()
+
+    #Make copy of disk data
+    disk_copy = bytearray()
+    for b in disk_image._disk_data:
+        disk_copy.append(b)
+
+    #Compact
+    for i, entry in enumerate(disk_image.files):
+        source = entry.sector * 256
+        target = new_file_sector[i] * 256
+        for b in range(0, entry.length):
+            disk_image._disk_data[target + b] = disk_copy[source + b]
+        entry.sector = new_file_sector[i]
+
+    disk_image.disk_cycle += 1
+    disk_image._disk_data[0x104] = disk_image.disk_cycle
+    disk_image._update_catalogue()
+
+def original_insert(disk_image, file_data, start_sector):
+
+    #Insert file data as the original image.py did
+    i = 0
+    for b in file_data:
+        disk_image._disk_data[start_sector * 256 + i] = b
+        i += 1
+
+#endregion
+
+################################################################################
+#region Disk images
+
+def fragmented_ssd(folder):
+
+    #The game SSD with three files deleted
+    disk = path.join(folder, "frag.ssd")
+    shutil.copyfile(path.join(path.dirname(path.abspath(__file__)), "..", "ssd", "BoulderDash.ssd"), disk)
+    disk_image = image.DiskImage()
+    disk_image.set_disk(disk)
+    with disk_image.batch():
+        for entry in list(disk_image.files)[1:7:2]:
+            disk_image.delete(entry.name, ignore_lock=True)
+    return disk
+
+def fragmented_dsd(folder):
+
+    #80 track dsd with 31 files on each side, every other file deleted
+    disk = path.join(folder, "frag.dsd")
+    rnd = random.Random(1)
+    files = [(f"F{i}", 0x1900, 0x8023, " ", bytes(rnd.randrange(256) for _ in range(rnd.randrange(1000, 9000)))) for i in range(31)]
+    disk_image = image.DiskImage()
+    disk_image.create(disk, "BENCH", 0, 80, files, files)
+    for side in ["0", "2"]:
+        disk_image.set_side(side)
+        with disk_image.batch():
+            for file in files[::2]:
+                disk_image.delete(file[0])
+    return disk
+
+def time_compact(disk, side, original, runs):
+
+    #Best time of a number of runs, the disk image is restored before each one
+    backup = disk + ".bak"
+    shutil.copyfile(disk, backup)
+    best = None
+    for _ in range(runs):
+        shutil.copyfile(backup, disk)
+        disk_image = image.DiskImage()
+        disk_image.set_disk(disk)
+        disk_image.set_side(side)
+        start = time.perf_counter()
+        if original:
+            disk_image._scan()
+            original_compact(disk_image)
+            disk_image._write_to_disk()
+        else:
+            disk_image.compact()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    with open(disk, 'rb') as f:
+        result = f.read()
+    shutil.copyfile(backup, disk)
+    return best, result
+
+def time_insert(file_data, original, runs):
+
+    #Copying a file into the disk data only, the rest of insert is the same for both
+    disk_image = image.DiskImage()
+    disk_image._disk_data = bytearray(800 * 256)
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        if original:
+            original_insert(disk_image, file_data, 2)
+        else:
+            disk_image._disk_data[2 * 256 : 2 * 256 + len(file_data)] = file_data
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, bytes(disk_image._disk_data)
+
+#endregion
+
+################################################################################
+# Main Routine
+if __name__ == '__main__':
+
+    runs = 20
+    if "-runs" in sys.argv:
+        runs = int(sys.argv[sys.argv.index("-runs") + 1])
+
+    with tempfile.TemporaryDirectory() as folder:
+
+        tests = [("compact BoulderDash.ssd, 3 files deleted", fragmented_ssd(folder), ["0"]),
+                 ("compact 80 track dsd, every other file deleted", fragmented_dsd(folder), ["0", "2"])]
+        for name, disk, sides in tests:
+            for side in sides:
+                old_time, old_result = time_compact(disk, side, True, runs)
+                new_time, new_result = time_compact(disk, side, False, runs)
+                same = "same result" if old_result == new_result else "DIFFERENT RESULT"
+                print(f"{name} (side {side}): {old_time * 1000:.2f} ms -> {new_time * 1000:.2f} ms ({old_time / new_time:.1f}x, {same})")
+
+        file_data = bytes(random.Random(2).randrange(256) for _ in range(20000))
+        old_time, old_result = time_insert(file_data, True, runs)
+        new_time, new_result = time_insert(file_data, False, runs)
+        same = "same result" if old_result == new_result else "DIFFERENT RESULT"
+        print(f"insert copy of a 20000 byte file: {old_time * 1000:.2f} ms -> {new_time * 1000:.3f} ms ({old_time / new_time:.0f}x, {same})")
@@ -1,20 +1,29 @@
-copy /b ..\caves_bin\BoulderDash01\Q ..\caves_bin\BoulderBonus\A
-copy /b ..\caves_bin\BoulderDash01\R ..\caves_bin\BoulderBonus\B
-copy /b ..\caves_bin\BoulderDash01\S ..\caves_bin\BoulderBonus\C
-copy /b ..\caves_bin\BoulderDash01\T ..\caves_bin\BoulderBonus\D
-copy /b ..\caves_bin\BoulderDash02\Q ..\caves_bin\BoulderBonus\E
-copy /b ..\caves_bin\BoulderDash02\R ..\caves_bin\BoulderBonus\F
-copy /b ..\caves_bin\BoulderDash02\S ..\caves_bin\BoulderBonus\G
-copy /b ..\caves_bin\BoulderDash02\T ..\caves_bin\BoulderBonus\H
-copy /b ..\caves_bin\BoulderDash03\Q ..\caves_bin\BoulderBonus\I
-copy /b ..\caves_bin\BoulderDash03\R ..\caves_bin\BoulderBonus\J
-copy /b ..\caves_bin\BoulderDash03\S ..\caves_bin\BoulderBonus\K
-copy /b ..\caves_bin\BoulderDash03\T ..\caves_bin\BoulderBonus\L
-copy /b ..\caves_bin\BoulderDashP1\Q ..\caves_bin\BoulderBonus\M
-copy /b ..\caves_bin\BoulderDashP1\R ..\caves_bin\BoulderBonus\N
-copy /b ..\caves_bin\BoulderDashP1\S ..\caves_bin\BoulderBonus\O
-copy /b ..\caves_bin\BoulderDashP1\T ..\caves_bin\BoulderBonus\P
-copy /b ..\caves_bin\ArnoDash01\Q ..\caves_bin\BoulderBonus\Q
-copy /b ..\caves_bin\ArnoDash01\R ..\caves_bin\BoulderBonus\R
-copy /b ..\caves_bin\ArnoDash01\S ..\caves_bin\BoulderBonus\S
-copy /b ..\caves_bin\ArnoDash01\T ..\caves_bin\BoulderBonus\T
\ No newline at end of file
+@echo off
+rem Copy the intermission caves Q, R, S, T of each cave set into BoulderBonus as caves A to T
+rem Caves are taken from the set's group files when it has them (BDcavegen.py output), Q and R are the last
+rem two of the 10 caves in <set>-1 and S and T the last two in <set>-2, otherwise from the individual cave files
+call :bonus BoulderDash01 A B C D
+call :bonus BoulderDash02 E F G H
+call :bonus BoulderDash03 I J K L
+call :bonus BoulderDashP1 M N O P
+call :bonus ArnoDash01 Q R S T
+goto :eof
+
+:bonus
+if exist ..\caves_bin\%1\%1-1 (
+    call :extract ..\caves_bin\%1\%1-1 8 ..\caves_bin\BoulderBonus\%2
+    call :extract ..\caves_bin\%1\%1-1 9 ..\caves_bin\BoulderBonus\%3
+    call :extract ..\caves_bin\%1\%1-2 8 ..\caves_bin\BoulderBonus\%4
+    call :extract ..\caves_bin\%1\%1-2 9 ..\caves_bin\BoulderBonus\%5
+) else (
+    copy /b ..\caves_bin\%1\Q ..\caves_bin\BoulderBonus\%2
+    copy /b ..\caves_bin\%1\R ..\caves_bin\BoulderBonus\%3
+    copy /b ..\caves_bin\%1\S ..\caves_bin\BoulderBonus\%4
+    copy /b ..\caves_bin\%1\T ..\caves_bin\BoulderBonus\%5
+)
+goto :eof
+
+:extract
+rem Write the 448 byte cave at a position in a group file, after the "BDCG" index header if it has one
+powershell -NoProfile -Command "$b = [IO.File]::ReadAllBytes('%1'); $o = 0; if ([Text.Encoding]::ASCII.GetString($b, 0, 4) -eq 'BDCG') { $o = 5 + $b[4] }; $o += %2 * 448; [IO.File]::WriteAllBytes('%3', $b[$o..($o + 447)])"
+goto :eof
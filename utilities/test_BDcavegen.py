@@ -0,0 +1,83 @@
+################################################################################
+# test_BDcavegen.py - Tests for the line drawing in BDcavegen.py
+#
+#   Usage: python -m unittest test_BDcavegen (or pytest) from the utilities folder
+#
+
+### Imports
+import unittest
+from fractions import Fraction
+import numpy as np
+
+from BDcavegen import plot_line
+
+################################################################################
+#region Helper functions
+
+def line_points(row1, col1, row2, col2):
+
+    #Points plot_line should draw, each step along the longer axis with the other axis rounded to the nearest tile,
+    #halves rounded down the cave (to the higher row or column)
+    steps = max(abs(row2 - row1), abs(col2 - col1))
+    if steps == 0:
+        return {(row1, col1)}
+    points = set()
+    for t in range(steps + 1):
+        row = row1 + Fraction((row2 - row1) * t, steps)
+        col = col1 + Fraction((col2 - col1) * t, steps)
+        points.add((int(np.floor(row + Fraction(1, 2))), int(np.floor(col + Fraction(1, 2)))))
+    return points
+
+def drawn_points(row1, col1, row2, col2, shape=(22, 40)):
+
+    object_cave_map = np.zeros(shape, dtype = np.uint8)
+    plot_line(object_cave_map, row1, col1, row2, col2, 1)
+    return {(int(r), int(c)) for r, c in zip(*np.nonzero(object_cave_map))}
+
+#endregion
+
+################################################################################
+#region Tests
+
+class PlotLineTest(unittest.TestCase):
+
+    #Row and column steps ending in each octant, shallow and steep in every direction
+    OCTANTS = [(2, 7), (7, 2), (7, -2), (2, -7), (-2, -7), (-7, -2), (-7, 2), (-2, 7)]
+
+    def test_octants(self):
+        for d_row, d_col in self.OCTANTS:
+            with self.subTest(d_row = d_row, d_col = d_col):
+                row1, col1 = 10, 20
+                row2, col2 = row1 + d_row, col1 + d_col
+                points = drawn_points(row1, col1, row2, col2)
+                self.assertEqual(points, line_points(row1, col1, row2, col2))
+                self.assertIn((row1, col1), points)
+                self.assertIn((row2, col2), points)
+                self.assertEqual(len(points), max(abs(d_row), abs(d_col)) + 1)  #One point per step along the longer axis
+
+    def test_octants_either_end(self):
+        for d_row, d_col in self.OCTANTS:
+            with self.subTest(d_row = d_row, d_col = d_col):
+                self.assertEqual(drawn_points(10, 20, 10 + d_row, 20 + d_col), drawn_points(10 + d_row, 20 + d_col, 10, 20))
+
+    def test_shallow_line(self):
+        self.assertEqual(drawn_points(1, 1, 3, 7), {(1, 1), (1, 2), (2, 3), (2, 4), (2, 5), (3, 6), (3, 7)})
+
+    def test_axes_and_diagonals(self):
+        self.assertEqual(drawn_points(5, 3, 5, 8), {(5, c) for c in range(3, 9)})
+        self.assertEqual(drawn_points(9, 4, 2, 4), {(r, 4) for r in range(2, 10)})
+        self.assertEqual(drawn_points(2, 2, 6, 6), {(2 + i, 2 + i) for i in range(5)})
+        self.assertEqual(drawn_points(6, 2, 2, 6), {(6 - i, 2 + i) for i in range(5)})
+
+    def test_single_point(self):
+        self.assertEqual(drawn_points(4, 9, 4, 9), {(4, 9)})
+
+    def test_outside_cave_not_drawn(self):
+        self.assertEqual(drawn_points(9, 15, 13, 25, shape = (12, 20)), line_points(9, 15, 13, 25) & {(r, c) for r in range(12) for c in range(20)})
+        self.assertEqual(drawn_points(-3, -3, 2, 2), {(i, i) for i in range(3)})  #Negative rows and columns don't wrap
+        self.assertEqual(drawn_points(30, 50, 30, 50), set())
+
+#endregion
+
+if __name__ == '__main__':
+    unittest.main()